@@ -1,156 +1,192 @@
-import pandas as pd
-import matplotlib.pyplot as plt
+import threading
+import weakref
+
+from memo import LRUCache, input_key
+from population_stats import PopulationStats, input_value
+from tracing import span
+from utils import ANALYSIS_CATEGORICAL_COLS, ANALYSIS_COLUMN_SOURCES, ANALYSIS_NUMERIC_COLS
+
+# Comparisons kept per PopulationStats object (dropped together with it)
+COMPARISON_CACHE_SIZE = 1024
+
+TEXTS = {
+    "vi": {
+        "header": "BÁO CÁO PHÂN TÍCH NGƯỜI DÙNG VS CỘNG ĐỒNG",
+        "section1": "1. CHỈ SỐ ĐỊNH LƯỢNG (NUMERICAL)",
+        "section2": "2. ĐẶC ĐIỂM ĐỊNH DANH (CATEGORICAL)",
+        "you": "Bạn",
+        "avg": "Trung bình cộng đồng",
+        "higher": "Bạn cao hơn",
+        "students": "sinh viên khác",
+        "same_trait": "sinh viên có cùng đặc điểm này với bạn",
+        "rare": "(Đây là một đặc điểm hiếm gặp/thiểu số)",
+        "chart_you": "Bạn",
+        "chart_avg": "Trung bình cộng đồng"
+    },
+    "en": {
+        "header": "USER VS POPULATION ANALYSIS REPORT",
+        "section1": "1. NUMERICAL METRICS",
+        "section2": "2. CATEGORICAL CHARACTERISTICS",
+        "you": "You",
+        "avg": "Community Average",
+        "higher": "You are higher than",
+        "students": "of other students",
+        "same_trait": "of students share this trait with you",
+        "rare": "(This is a rare/minority trait)",
+        "chart_you": "You",
+        "chart_avg": "Community Avg"
+    }
+}
+
+_comparisons = weakref.WeakKeyDictionary()
+_comparisons_lock = threading.Lock()
+
+
+def comparison_key(user_input):
+    """Hash chuẩn hóa của các cột mà phép so sánh đọc tới."""
+    columns = ANALYSIS_NUMERIC_COLS + ANALYSIS_CATEGORICAL_COLS + list(ANALYSIS_COLUMN_SOURCES.values())
+    return input_key(user_input, ANALYSIS_NUMERIC_COLS, columns)
+
+
+def _comparison_cache(stats):
+    with _comparisons_lock:
+        cache = _comparisons.get(stats)
+        if cache is None:
+            cache = _comparisons[stats] = LRUCache(COMPARISON_CACHE_SIZE)
+        return cache
+
 
+def clear_comparison_cache():
+    """Bỏ toàn bộ memo của compare_user_vs_population (mọi `stats`), ví dụ để đo đường không cache."""
+    with _comparisons_lock:
+        _comparisons.clear()
 
-def analyze_user_vs_population(user_input, df, language="vi"):
+
+def compare_user_vs_population(user_input, stats):
     """
-    So sánh input của user với dataset và vẽ biểu đồ.
-    Trả về:
-        - report_text (str): Văn bản báo cáo để gửi cho LLM.
-        - fig (matplotlib.figure): Biểu đồ radar để hiển thị trên UI.
-        - comparison_data (dict): Dữ liệu so sánh để hiển thị UI tùy chỉnh.
+    Số liệu so sánh (không phụ thuộc ngôn ngữ): {"numerical": [...], "categorical": [...]}.
+    Được memo theo comparison_key(user_input) cho từng `stats`; kết quả dùng chung giữa các
+    lần gọi nên không được sửa.
     """
-
-    # Define text templates based on language
-    texts = {
-        "vi": {
-            "header": "BÁO CÁO PHÂN TÍCH NGƯỜI DÙNG VS CỘNG ĐỒNG",
-            "section1": "1. CHỈ SỐ ĐỊNH LƯỢNG (NUMERICAL)",
-            "section2": "2. ĐẶC ĐIỂM ĐỊNH DANH (CATEGORICAL)",
-            "you": "Bạn",
-            "avg": "Trung bình cộng đồng",
-            "higher": "Bạn cao hơn",
-            "students": "sinh viên khác",
-            "same_trait": "sinh viên có cùng đặc điểm này với bạn",
-            "rare": "(Đây là một đặc điểm hiếm gặp/thiểu số)",
-            "chart_you": "Bạn",
-            "chart_avg": "Trung bình cộng đồng"
-        },
-        "en": {
-            "header": "USER VS POPULATION ANALYSIS REPORT",
-            "section1": "1. NUMERICAL METRICS",
-            "section2": "2. CATEGORICAL CHARACTERISTICS",
-            "you": "You",
-            "avg": "Community Average",
-            "higher": "You are higher than",
-            "students": "of other students",
-            "same_trait": "of students share this trait with you",
-            "rare": "(This is a rare/minority trait)",
-            "chart_you": "You",
-            "chart_avg": "Community Avg"
+    cache = _comparison_cache(stats)
+    key = comparison_key(user_input)
+    with span("analysis.compare") as sp:
+        comparison_data = cache.get(key)
+        sp.set(cached=comparison_data is not None)
+        if comparison_data is not None:
+            return comparison_data
+
+        comparison_data = {
+            "numerical": [],
+            "categorical": []
         }
-    }
 
-    t = texts.get(language, texts["en"])
+        # PHẦN 1: SO SÁNH SỐ HỌC (NUMERICAL) - Dùng Percentile
+        with span("analysis.percentiles"):
+            for col in ANALYSIS_NUMERIC_COLS:
+                if stats.has(col) and col in user_input:
+                    user_val = float(user_input[col])
+                    comparison_data["numerical"].append({
+                        "metric": col,
+                        "user": user_val,
+                        "avg": stats.mean(col),
+                        # Binary search on the sorted column
+                        "percentile": stats.percentile_below(col, user_val)
+                    })
+
+        # PHẦN 2: SO SÁNH ĐỊNH DANH (CATEGORICAL)
+        # Always reported under the analysis name (e.g. "Suicidal Thoughts"), whichever key the input used
+        with span("analysis.categories"):
+            for col in ANALYSIS_CATEGORICAL_COLS:
+                present, user_val = input_value(user_input, col)
+                if stats.has(col) and present:
+                    comparison_data["categorical"].append({
+                        "feature": col,
+                        "value": user_val,
+                        "percentage": stats.category_percentage(col, user_val)
+                    })
+
+        return cache.put(key, comparison_data)
+
+
+def format_report(comparison_data, language="vi"):
+    """Văn bản báo cáo (gửi cho LLM) từ kết quả của compare_user_vs_population."""
+    t = TEXTS.get(language, TEXTS["en"])
 
     report_text = ""
     report_text += "\n" + "=" * 40 + "\n"
     report_text += f" {t['header']}\n"
     report_text += "=" * 40 + "\n\n"
 
-    # ---------------------------------------------------------
-    # PHẦN 1: SO SÁNH SỐ HỌC (NUMERICAL) - Dùng Percentile
-    # ---------------------------------------------------------
-    numeric_cols = ['Age', 'Academic Pressure', 'CGPA', 'Study Satisfaction',
-                    'Work/Study Hours', 'Financial Stress']
-
-    comparison_data = {
-        "numerical": [],
-        "categorical": []
-    }
-
     report_text += f"--- {t['section1']} ---\n"
-    for col in numeric_cols:
-        if col in df.columns and col in user_input:
-            user_val = float(user_input[col])
-            pop_mean = df[col].mean()
-
-            # Tính Percentile
-            percentile = (df[col] < user_val).mean() * 100
-
-            report_text += f"- {col}:\n"
-            report_text += f"  + {t['you']}: {user_val} | {t['avg']}: {pop_mean:.2f}\n"
-            report_text += f"  + {t['higher']} {percentile:.1f}% {t['students']}.\n"
-            report_text += "-" * 30 + "\n"
-
-            comparison_data["numerical"].append({
-                "metric": col,
-                "user": user_val,
-                "avg": pop_mean,
-                "percentile": percentile
-            })
-
-    # ---------------------------------------------------------
-    # PHẦN 2: SO SÁNH ĐỊNH DANH (CATEGORICAL)
-    # ---------------------------------------------------------
-    categorical_cols = ['Gender', 'Sleep Duration', 'Dietary Habits', 'Degree',
-                        'Suicidal Thoughts', 'Family History of Mental Illness']
+    for item in comparison_data["numerical"]:
+        report_text += f"- {item['metric']}:\n"
+        report_text += f"  + {t['you']}: {item['user']} | {t['avg']}: {item['avg']:.2f}\n"
+        report_text += f"  + {t['higher']} {item['percentile']:.1f}% {t['students']}.\n"
+        report_text += "-" * 30 + "\n"
 
     report_text += f"\n--- {t['section2']} ---\n"
-    for col in categorical_cols:
-        if col in df.columns and col in user_input:
-            user_val = user_input[col]
+    for item in comparison_data["categorical"]:
+        report_text += f"- {item['feature']}: '{item['value']}'\n"
+        report_text += f"  + {item['percentage']:.1f}% {t['same_trait']}.\n"
+        if item["percentage"] < 10:
+            report_text += f"  => {t['rare']}\n"
 
-            count = df[df[col] == user_val].shape[0]
-            total = df.shape[0]
-            percentage = (count / total) * 100
+    return report_text
 
-            report_text += f"- {col}: '{user_val}'\n"
-            report_text += f"  + {percentage:.1f}% {t['same_trait']}.\n"
 
-            if percentage < 10:
-                report_text += f"  => {t['rare']}\n"
+def chart_labels(language="vi"):
+    """(nhãn của user, nhãn trung bình) trên biểu đồ radar."""
+    t = TEXTS.get(language, TEXTS["en"])
+    return t["chart_you"], t["chart_avg"]
 
-            comparison_data["categorical"].append({
-                "feature": col,
-                "value": user_val,
-                "percentage": percentage
-            })
+
+def analyze_user_vs_population(user_input, df=None, language="vi", stats=None, chart="figure", renderer=None):
+    """
+    So sánh input của user với dataset và vẽ biểu đồ.
+    Truyền `stats` (PopulationStats build sẵn) để tránh quét lại `df` mỗi request;
+    nếu không có, stats được build từ `df`.
+    `chart` chọn dạng biểu đồ: "figure" (Figure matplotlib), "png" (bytes, cache trong
+    `renderer`), "spec" (dict) hoặc None. Truyền `renderer` (RadarChart dùng chung)
+    để tái sử dụng lớp nền đã vẽ sẵn.
+    Số liệu so sánh được memo theo input (compare_user_vs_population); chỉ phần text và
+    nhãn biểu đồ phụ thuộc `language`.
+    Trả về:
+        - report_text (str): Văn bản báo cáo để gửi cho LLM.
+        - fig: Biểu đồ radar theo dạng `chart` để hiển thị trên UI.
+        - comparison_data (dict): Dữ liệu so sánh để hiển thị UI tùy chỉnh.
+    """
+    if stats is None:
+        with span("analysis.build_stats", rows=len(df)):
+            stats = PopulationStats.from_dataframe(df)
+
+    comparison_data = compare_user_vs_population(user_input, stats)
+    report_text = format_report(comparison_data, language)
 
     # Create a modern radar chart
-    fig = plt.figure(figsize=(8, 8), facecolor='white')
-    ax = fig.add_subplot(111, polar=True)
-    ax.set_facecolor('#fafbfc')
-
-    categories = numeric_cols
-    user_values = [float(user_input[col]) for col in categories]
-    pop_means = [df[col].mean() for col in categories]
-
-    # Normalize values to 0-10 scale for better visualization
-    max_vals = [df[col].max() for col in categories]
-    user_values_norm = [user_values[i] / max_vals[i] * 10 if max_vals[i] > 0 else 0 for i in range(len(user_values))]
-    pop_means_norm = [pop_means[i] / max_vals[i] * 10 if max_vals[i] > 0 else 0 for i in range(len(pop_means))]
-
-    angles = [n / float(len(categories)) * 2 * 3.14159 for n in range(len(categories))]
-    angles += angles[:1]
-    user_values_norm += user_values_norm[:1]
-    pop_means_norm += pop_means_norm[:1]
-
-    # Plot with better styling
-    ax.plot(angles, user_values_norm, linewidth=2.5, linestyle='solid', label=t['chart_you'], color='#3b82f6',
-            marker='o', markersize=6)
-    ax.plot(angles, pop_means_norm, linewidth=2.5, linestyle='solid', label=t['chart_avg'], color='#ef4444', marker='s',
-            markersize=6)
-    ax.fill(angles, user_values_norm, color='#3b82f6', alpha=0.15)
-    ax.fill(angles, pop_means_norm, color='#ef4444', alpha=0.15)
-
-    # Styling
-    ax.set_ylim(0, 10)
-    ax.set_xticks(angles[:-1])
-    ax.set_xticklabels(categories, size=10, weight='bold', color='#374151')
-    ax.set_yticks([2, 4, 6, 8, 10])
-    ax.set_yticklabels(['2', '4', '6', '8', '10'], size=9, color='#6b7280')
-    ax.grid(color='#d1d5db', linestyle='--', linewidth=0.7, alpha=0.7)
-    ax.spines['polar'].set_color('#9ca3af')
-    ax.spines['polar'].set_linewidth(1.5)
-
-    plt.legend(loc='upper right', bbox_to_anchor=(1.15, 1.1), frameon=True, shadow=True, fontsize=11)
-    plt.tight_layout()
+    fig = None
+    if chart is not None:
+        with span("analysis.chart", kind=chart):
+            if renderer is None:
+                # matplotlib is only imported when a chart is actually requested
+                from radar_chart import RadarChart
+                renderer = RadarChart(stats)
+            you_label, avg_label = chart_labels(language)
+            if chart == "figure":
+                fig = renderer.create_figure(user_input, you_label, avg_label)
+            elif chart == "png":
+                fig = renderer.render_png(user_input, you_label, avg_label)
+            elif chart == "spec":
+                fig = renderer.spec(user_input, you_label, avg_label)
+            else:
+                raise ValueError(f"Unknown chart type: {chart}")
 
     return report_text, fig, comparison_data
 
 
 if "__main__" == __name__:
+    from dataset_store import load_dataset
+
     user_input = {
         'Gender': "Male",
         'Age': 18,
@@ -165,7 +201,7 @@ if "__main__" == __name__:
         'Financial Stress': 3,
         'Family History of Mental Illness': "Yes"
     }
-    df = pd.read_csv('data/clean_df.csv')
+    df = load_dataset('data/clean_df.csv')
     report_text, fig, data = analyze_user_vs_population(user_input, df, language="en")
     print(report_text)
 
@@ -0,0 +1,74 @@
+"""
+Thời gian tới lời khuyên đầu tiên mà người dùng thấy, khi server LLM có đuôi chậm:
+gọi thẳng (stream_chat_llm) so với stream_advice_with_deadline (hedge + fallback).
+
+    python benchmarks/bench_advice_deadline.py --requests 100 --slow-rate 0.1 --slow-latency 5 --budget 2
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from analysis import analyze_user_vs_population  # noqa: E402
+from fake_llm_server import FakeLLMServer  # noqa: E402
+from integrate_llm import AdvisorClient, advice_stats, stream_advice_with_deadline, stream_chat_llm  # noqa: E402
+from population_stats import PopulationStats  # noqa: E402
+
+USER_INPUT = {
+    'Gender': "Male", 'Age': 20, 'Academic Pressure': 5, 'CGPA': 8.5, 'Study Satisfaction': 2,
+    'Sleep Duration': "5-6 hours", 'Dietary Habits': "Unhealthy", 'Degree': "BCA", 'Have you ever had suicidal thoughts ?': "No",
+    'Work/Study Hours': 10, 'Financial Stress': 4, 'Family History of Mental Illness': "No"
+}
+
+
+def first_visible(stream):
+    start = time.perf_counter()
+    first = None
+    for _ in stream:
+        if first is None:
+            first = time.perf_counter() - start
+    return first
+
+
+def summarize(name, samples):
+    samples = sorted(samples)
+    print(f"{name:<10} first advice p50={statistics.median(samples):6.3f}s "
+          f"p95={samples[int(len(samples) * 0.95)]:6.3f}s max={samples[-1]:6.3f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--latency", type=float, default=0.1)
+    parser.add_argument("--slow-rate", type=float, default=0.1)
+    parser.add_argument("--slow-latency", type=float, default=5.0)
+    parser.add_argument("--budget", type=float, default=2.0)
+    parser.add_argument("--hedge-after", type=float, default=0.3)
+    args = parser.parse_args()
+
+    report_text, _, comparison_data = analyze_user_vs_population(
+        USER_INPUT, language="en", stats=PopulationStats.from_csv(), chart=None)
+
+    with FakeLLMServer(latency=args.latency, slow_rate=args.slow_rate, slow_latency=args.slow_latency) as server:
+        client = AdvisorClient("fake", base_url=server.base_url, max_retries=0, max_concurrency=16)
+        direct = [first_visible(stream_chat_llm(report_text, "Yes", language="en", llm=client.llm, use_cache=False))
+                  for _ in range(args.requests)]
+        summarize("direct", direct)
+
+        for name, hedge_after in (("deadline", None), ("hedged", args.hedge_after)):
+            samples = [first_visible(stream_advice_with_deadline(
+                report_text, "Yes", comparison_data, language="en", budget=args.budget, hedge_after=hedge_after,
+                llm=client.llm, use_cache=False)) for _ in range(args.requests)]
+            summarize(name, samples)
+        client.close()
+
+    stats = advice_stats()
+    print(f"timeouts {stats['timeouts']} | fallbacks {stats['fallbacks']} | hedges {stats['hedges']} | "
+          f"hedge wins {stats['hedge_wins']} | errors {stats['errors']}")
+
+
+if __name__ == "__main__":
+    main()
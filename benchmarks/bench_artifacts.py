@@ -0,0 +1,168 @@
+"""
+Pickle sklearn vs artifact đã export (models/artifacts, mmap): kích thước trên disk, thời
+gian load tới dự đoán đầu tiên, bộ nhớ của một process và của nhiều worker chạy song song (RSS/PSS từ
+/proc/<pid>/smaps_rollup), và độ khớp dự đoán trên data/clean_df.csv.
+
+    python model_artifacts.py export
+    python benchmarks/bench_artifacts.py --runs 5 --workers 4
+
+PSS chia các trang dùng chung (file .npy mmap trong page cache) cho số process đang map
+chúng, nên tổng PSS của các worker là bộ nhớ thực sự bị chiếm.
+"""
+import argparse
+import json
+import os
+import pickle
+import statistics
+import subprocess
+import sys
+import tempfile
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from model_artifacts import ARTIFACT_FORMAT_VERSION, ArtifactBundle, _export_model, verify_against_pickles  # noqa: E402
+from utils import ARTIFACT_DIR, MODEL_PATHS  # noqa: E402
+
+WORKER = """
+import json, os, sys, time
+os.environ["MODEL_FORMAT"] = {model_format!r}
+t0 = time.perf_counter()
+import pandas as pd
+from model_registry import get_model, get_preprocessor
+preprocessor = get_preprocessor()
+models = {{name: get_model(name) for name in {models!r}}}
+t1 = time.perf_counter()
+df = pd.read_csv("data/clean_df.csv", nrows={rows}).drop(columns=["Depression"], errors="ignore")
+X = preprocessor.transform(df)
+X = X.toarray() if hasattr(X, "toarray") else X
+for model in models.values():
+    model.predict_proba(X)
+t2 = time.perf_counter()
+print(json.dumps({{"pid": os.getpid(), "load": t1 - t0, "first_predict": t2 - t1,
+                   "sklearn": "sklearn" in sys.modules}}), flush=True)
+if {hold}:
+    sys.stdin.read()  # keep the mappings alive until the parent has measured every worker
+"""
+
+
+def _worker_code(model_format, models, rows, hold):
+    return WORKER.format(model_format=model_format, models=models, rows=rows, hold=hold)
+
+
+def _memory(pid):
+    """(rss_mb, pss_mb) từ /proc/<pid>/smaps_rollup."""
+    fields = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if parts[0] in ("Rss:", "Pss:"):
+                fields[parts[0][:-1]] = int(parts[1]) / 1024
+    return fields["Rss"], fields["Pss"]
+
+
+def disk_size(models):
+    """Kích thước .pkl so với tổng các .npy đã export của từng model."""
+    manifest = ArtifactBundle.load(ARTIFACT_DIR).manifest
+    sizes = {}
+    for name in models:
+        arrays = manifest["components"][name]["arrays"].values()
+        exported = sum(os.path.getsize(os.path.join(ARTIFACT_DIR, a["file"])) for a in arrays)
+        sizes[name] = {"pickle": os.path.getsize(MODEL_PATHS[name]), "artifact": exported}
+        print(f"{name:<8} pickle {sizes[name]['pickle'] / 2**20:7.2f} MB | artifact {exported / 2**20:7.2f} MB")
+    return sizes
+
+
+def cold_load(model_format, models, rows, runs):
+    samples = []
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, "-c", _worker_code(model_format, models, rows, False)],
+                             cwd=ROOT, capture_output=True, text=True, check=True).stdout
+        samples.append(json.loads(out))
+    load = statistics.median(s["load"] for s in samples)
+    predict = statistics.median(s["first_predict"] for s in samples)
+    print(f"{model_format:<8} load {load * 1e3:7.1f} ms | first predict ({rows} rows) {predict * 1e3:7.1f} ms "
+          f"| sklearn imported: {samples[-1]['sklearn']}")
+    return {"load": load, "first_predict": predict}
+
+
+def workers_memory(model_format, models, rows, n_workers):
+    procs = [subprocess.Popen([sys.executable, "-c", _worker_code(model_format, models, rows, True)],
+                              cwd=ROOT, stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+             for _ in range(n_workers)]
+    try:
+        pids = [json.loads(p.stdout.readline())["pid"] for p in procs]
+        usage = [_memory(pid) for pid in pids]
+    finally:
+        for p in procs:
+            p.stdin.close()
+            p.wait()
+    rss = sum(u[0] for u in usage)
+    pss = sum(u[1] for u in usage)
+    print(f"{model_format:<8} {n_workers} workers: RSS {rss:7.1f} MB total ({rss / n_workers:6.1f}/worker) "
+          f"| PSS {pss:7.1f} MB total ({pss / n_workers:6.1f}/worker)")
+    return {"rss_mb": rss, "pss_mb": pss}
+
+
+def forest_parity(seed=0):
+    """RF.pkl chưa có trên disk: fit một RandomForest tạm trên dữ liệu thật để kiểm tra export cây."""
+    import pandas as pd
+    from sklearn.ensemble import RandomForestClassifier
+
+    from model_registry import registry
+    from utils import PREPROCESSOR_PATH
+
+    df = pd.read_csv(os.path.join(ROOT, "data/clean_df.csv"))
+    X = registry.get(PREPROCESSOR_PATH).transform(df.drop(columns=["Depression"]))
+    X = X.toarray() if hasattr(X, "toarray") else X
+    rf = RandomForestClassifier(n_estimators=100, random_state=seed, n_jobs=-1).fit(X, df["Depression"])
+
+    with tempfile.TemporaryDirectory() as tmp:
+        meta, arrays = _export_model(rf)
+        for name, array in arrays.items():
+            np.save(os.path.join(tmp, f"RF.{name}.npy"), array)
+        meta["arrays"] = {name: {"file": f"RF.{name}.npy"} for name in arrays}
+        meta["source"] = {"path": ""}
+        bundle = ArtifactBundle(tmp, {"format_version": ARTIFACT_FORMAT_VERSION, "components": {"RF": meta}})
+        pickled_size = len(pickle.dumps(rf))
+        exported_size = sum(a.nbytes for a in arrays.values())
+        exported = bundle.get("RF").predict_proba(X)
+    reference = rf.predict_proba(X)
+    print(f"RF (temporary, 100 trees): max |proba diff| {np.abs(exported - reference).max():.2e} | "
+          f"label agreement {(exported.argmax(1) == reference.argmax(1)).mean():.4%} | "
+          f"pickle {pickled_size / 2**20:.1f} MB vs arrays {exported_size / 2**20:.1f} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--rows", type=int, default=1000, help="Số dòng dự đoán trong mỗi process")
+    parser.add_argument("--models", nargs="+", default=["LR", "KNN"])
+    parser.add_argument("--skip-rf", action="store_true", help="Bỏ qua kiểm tra export RandomForest tạm")
+    args = parser.parse_args()
+
+    if not os.path.exists(os.path.join(ROOT, ARTIFACT_DIR, "manifest.json")):
+        sys.exit("No exported artifacts; run `python model_artifacts.py export` first")
+
+    os.chdir(ROOT)
+    print("parity vs pickles on data/clean_df.csv:")
+    for component, result in verify_against_pickles().items():
+        print(f"  {component:<13} " + " | ".join(f"{k} {v:.3g}" for k, v in result.items()))
+    if not args.skip_rf:
+        forest_parity()
+
+    print()
+    disk_size(args.models)
+    print()
+    for model_format in ("pickle", "auto"):
+        cold_load(model_format, args.models, args.rows, args.runs)
+    print()
+    for model_format in ("pickle", "auto"):
+        workers_memory(model_format, args.models, args.rows, args.workers)
+
+
+if __name__ == "__main__":
+    main()
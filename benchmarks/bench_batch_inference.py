@@ -0,0 +1,52 @@
+"""
+So sánh throughput (rows/sec) giữa việc gọi make_inference trong vòng lặp
+và make_inference_batch trên data/clean_df.csv.
+
+    python benchmarks/bench_batch_inference.py --model LR --loop-rows 2000
+"""
+import argparse
+import os
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from make_inference import make_inference, make_inference_batch  # noqa: E402
+from model_registry import preload_all  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model", default="LR", choices=["LR", "KNN", "RF"])
+    parser.add_argument("--data", default="data/clean_df.csv")
+    parser.add_argument("--loop-rows", type=int, default=2000,
+                        help="Số dòng chạy theo kiểu vòng lặp (chậm, nên chỉ lấy mẫu)")
+    parser.add_argument("--chunk-size", type=int, default=50_000)
+    args = parser.parse_args()
+
+    df = pd.read_csv(args.data).drop(columns=["Depression"], errors="ignore")
+    preload_all()
+
+    rows = df.head(args.loop_rows).to_dict(orient="records")
+    start = time.perf_counter()
+    loop_preds = [make_inference(args.model, row) for row in rows]
+    loop_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    result = make_inference_batch(args.model, df, chunk_size=args.chunk_size)
+    batch_seconds = time.perf_counter() - start
+
+    mismatches = sum(a != b for a, b in zip(loop_preds, result["prediction"]))
+    loop_rps = len(rows) / loop_seconds
+    batch_rps = len(df) / batch_seconds
+
+    print(f"model={args.model}")
+    print(f"loop : {len(rows):>7} rows in {loop_seconds:8.3f}s -> {loop_rps:12.1f} rows/sec")
+    print(f"batch: {len(df):>7} rows in {batch_seconds:8.3f}s -> {batch_rps:12.1f} rows/sec")
+    print(f"speedup: {batch_rps / loop_rps:.1f}x | mismatches on overlap: {mismatches}")
+
+
+if __name__ == "__main__":
+    main()
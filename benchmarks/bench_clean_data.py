@@ -0,0 +1,113 @@
+"""
+Thời gian và bộ nhớ làm sạch raw: luồng notebook (đọc cả file, lọc, drop, to_csv) so với
+clean_data.py (theo chunk, song song), trên file raw được nhân bản tới --rows dòng; sau đó
+append thêm --append-rows dòng vào raw và đo lần chạy tăng dần.
+
+    python benchmarks/bench_clean_data.py --rows 2000000 --workers 4
+    python benchmarks/bench_clean_data.py --rows 0                      # chỉ file raw thật
+
+Mỗi lần chạy trong một process riêng; "peak MB" là VmHWM của process đó (với pool là
+process chính, mỗi worker chỉ giữ vài chunk). ru_maxrss không dùng được ở đây vì trên
+Linux nó giữ nguyên giá trị của process cha qua fork + exec.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from utils import RAW_DATA_PATH  # noqa: E402
+
+PEAK_MB = """
+def peak_mb():
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) / 1024
+"""
+
+NOTEBOOK_FLOW = PEAK_MB + """
+import json, time
+import pandas as pd
+t0 = time.perf_counter()
+df = pd.read_csv({raw!r})
+df_clean = df[df["Profession"] == "Student"].drop(columns=["id", "City", "Job Satisfaction", "Profession", "Work Pressure"])
+df_clean.to_csv({out!r}, index=False)
+print(json.dumps({{"seconds": time.perf_counter() - t0, "rows": len(df_clean), "peak_mb": peak_mb()}}))
+"""
+
+STAGE = PEAK_MB + """
+import json
+from clean_data import clean_data
+summary = clean_data([{raw!r}], {out!r}, {stats!r}, chunk_size={chunk_size}, workers={workers}, columnar=False,
+                     cube_path={cube!r})
+print(json.dumps(dict(summary, rows=summary["total_rows"], peak_mb=peak_mb())))
+"""
+
+
+def run(code):
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True).stdout
+    return json.loads(out)
+
+
+def write_raw(path, rows):
+    """Raw thật được lặp lại tới đủ `rows` dòng dữ liệu."""
+    with open(RAW_DATA_PATH, encoding="utf-8") as f:
+        header, *lines = f.readlines()
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(header)
+        written = 0
+        while written < rows:
+            batch = lines[:rows - written]
+            f.writelines(batch)
+            written += len(batch)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=2_000_000, help="Số dòng raw (0: file raw thật)")
+    parser.add_argument("--append-rows", type=int, default=100_000)
+    parser.add_argument("--chunk-size", type=int, default=100_000)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    workers = args.workers or os.cpu_count() or 1
+    with tempfile.TemporaryDirectory() as tmp:
+        raw = os.path.join(tmp, "raw.csv")
+        if args.rows:
+            write_raw(raw, args.rows)
+        else:
+            with open(RAW_DATA_PATH, "rb") as src, open(raw, "wb") as dst:
+                dst.write(src.read())
+        stage = dict(raw=raw, out=os.path.join(tmp, "stage.csv"), stats=os.path.join(tmp, "stats.npz"),
+                     cube=os.path.join(tmp, "peer_cube.npz"), chunk_size=args.chunk_size, workers=workers)
+        print(f"raw {os.path.getsize(raw) / 2**20:.1f} MB | workers {workers} | chunk {args.chunk_size:,}")
+
+        results = {
+            "notebook (read_csv + filter)": run(NOTEBOOK_FLOW.format(raw=raw, out=os.path.join(tmp, "notebook.csv"))),
+            "clean_data.py, full": run(STAGE.format(**stage)),
+        }
+        with open(os.path.join(tmp, "notebook.csv"), "rb") as a, open(stage["out"], "rb") as b:
+            identical = a.read() == b.read()
+
+        if args.append_rows:
+            with open(RAW_DATA_PATH, encoding="utf-8") as f:
+                lines = f.readlines()[1:args.append_rows + 1]
+            with open(raw, "a", encoding="utf-8") as f:
+                f.writelines(lines)
+            results[f"clean_data.py, +{len(lines):,} rows"] = run(STAGE.format(**stage))
+        results["clean_data.py, unchanged"] = run(STAGE.format(**stage))
+
+    baseline = results["notebook (read_csv + filter)"]["seconds"]
+    for label, result in results.items():
+        print(f"{label:<32} {result['seconds']:8.2f}s ({baseline / result['seconds']:7.1f}x) | "
+              f"peak {result['peak_mb']:8.1f} MB | {int(result['rows']):,} clean rows")
+    print(f"output identical to notebook flow: {identical}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Chạy cohort_advice end-to-end trên server Groq giả lập (có lỗi 429/500 ngẫu nhiên):
+so sánh throughput theo max-in-flight, rồi giả lập crash giữa chừng và resume.
+
+    python benchmarks/bench_cohort_advice.py --rows 400 --latency 0.05 --error-rate 0.05 --rate-limit-rate 0.05
+"""
+import argparse
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cohort_advice import CohortAdvisor, generate_cohort_advice, load_results  # noqa: E402
+from fake_llm_server import FakeLLMServer  # noqa: E402
+from integrate_llm import AdvisorClient  # noqa: E402
+from population_stats import PopulationStats  # noqa: E402
+from synthetic import write_synthetic_csv  # noqa: E402
+
+
+def run(server, args, stats, input_path, output_path, max_in_flight, limit=None, resume=True):
+    client = AdvisorClient("fake", base_url=server.base_url, max_concurrency=max_in_flight, max_retries=0)
+    advisor = CohortAdvisor(client.chain, language="en", rate=args.rate, max_retries=args.max_retries,
+                            backoff_base=0.01, backoff_cap=0.2, use_cache=False)
+    try:
+        return generate_cohort_advice(input_path, output_path, model=args.model, language="en", stats=stats,
+                                      advisor=advisor, max_in_flight=max_in_flight, resume=resume,
+                                      limit=limit, progress=False)
+    finally:
+        client.close()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=400)
+    parser.add_argument("--model", default="LR", choices=["LR", "KNN", "RF"])
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--error-rate", type=float, default=0.05)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.05)
+    parser.add_argument("--rate", type=float, default=None, help="Token bucket (request/giây)")
+    parser.add_argument("--max-retries", type=int, default=8)
+    parser.add_argument("--workdir", default=None)
+    args = parser.parse_args()
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="cohort_bench_")
+    os.makedirs(workdir, exist_ok=True)
+    input_path = write_synthetic_csv(os.path.join(workdir, "cohort.csv"), args.rows)
+    output_path = os.path.join(workdir, "cohort_advice.jsonl")
+    stats = PopulationStats.from_csv()
+
+    server_kwargs = dict(latency=args.latency, error_rate=args.error_rate, rate_limit_rate=args.rate_limit_rate)
+    for max_in_flight in (1, 8, 32):
+        with FakeLLMServer(**server_kwargs) as server:
+            result = run(server, args, stats, input_path, output_path, max_in_flight, resume=False)
+            print(f"max_in_flight={max_in_flight:<3} {result['rows_per_sec']:7.1f} rows/sec | ok {result['ok']} | "
+                  f"error {result['error']} | LLM requests {server.stats()['requests']} | "
+                  f"max in flight at server {server.stats()['max_in_flight']}")
+
+    # Crash after half the rows, then resume: finished rows must not be sent again
+    with FakeLLMServer(**server_kwargs) as server:
+        first = run(server, args, stats, input_path, output_path, 8, limit=args.rows // 2, resume=False)
+        first_requests = server.stats()["requests"]
+        second = run(server, args, stats, input_path, output_path, 8)
+        results = load_results(output_path)
+        ok = sum(r["status"] == "ok" for r in results.values())
+        print(f"resume: first run ok {first['ok']}, second run skipped {second['skipped']} and did "
+              f"{second['ok'] + second['error']} rows | {ok}/{args.rows} rows ok | "
+              f"LLM requests {first_requests} + {server.stats()['requests'] - first_requests} "
+              f"(attempts recorded {first['attempts'] + second['attempts']})")
+
+
+if __name__ == "__main__":
+    main()
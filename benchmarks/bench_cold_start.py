@@ -0,0 +1,141 @@
+"""
+Cold start: thời gian import (python -X importtime) của các entry point và thời gian
+từ lúc khởi động process tới dự đoán đầu tiên (chỉ số chính).
+
+    python benchmarks/bench_cold_start.py --runs 5
+    python benchmarks/bench_cold_start.py --profile submit_pipeline --top 15
+
+Thoát với mã 1 nếu một module vượt ngân sách import (IMPORT_BUDGET_MS x --tolerance)
+hoặc kéo theo một dependency nặng không được phép (HEAVY_FORBIDDEN), để dùng như
+một check regression.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Cumulative import time allowed for each entry point (ms, this dev machine; ~3x headroom)
+IMPORT_BUDGET_MS = {
+    "make_inference": 250,
+    "analysis": 250,
+    "integrate_llm": 150,
+    "submit_pipeline": 300,
+    "cohort_advice": 400,
+}
+
+# Heavy packages an entry point must not pull in at import time
+HEAVY = ["pandas", "matplotlib", "sklearn", "langchain_groq", "langchain_core", "httpx", "streamlit"]
+HEAVY_FORBIDDEN = {
+    "make_inference": HEAVY,
+    "analysis": HEAVY,
+    "integrate_llm": HEAVY,
+    "submit_pipeline": HEAVY,
+    "cohort_advice": HEAVY,
+}
+
+USER_INPUT = {
+    'Gender': "Male", 'Age': 18, 'Academic Pressure': 2, 'CGPA': 5, 'Study Satisfaction': 3,
+    'Sleep Duration': "5-6 hours", 'Dietary Habits': "Healthy", 'Degree': "BCA",
+    'Have you ever had suicidal thoughts ?': "Yes", 'Work/Study Hours': 9, 'Financial Stress': 3,
+    'Family History of Mental Illness': "Yes"
+}
+
+FIRST_PREDICTION = """
+import json, sys, time
+t0 = time.perf_counter()
+from make_inference import make_inference
+t1 = time.perf_counter()
+make_inference({model!r}, {user_input!r})
+t2 = time.perf_counter()
+print(json.dumps({{"import": t1 - t0, "predict": t2 - t1,
+                   "heavy": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+def _python(args, **kwargs):
+    return subprocess.run([sys.executable, *args], cwd=ROOT, capture_output=True, text=True, check=True, **kwargs)
+
+
+def importtime_profile(module):
+    """[(self_us, cumulative_us, depth, name)] từ `python -X importtime -c "import module"`."""
+    rows = []
+    for line in _python(["-X", "importtime", "-c", f"import {module}"]).stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        name = name[1:]  # one separator space, the rest is nesting
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((int(self_us), int(cumulative_us), depth, name.strip()))
+    return rows
+
+
+def check_imports(modules, tolerance):
+    failures = []
+    for module in modules:
+        rows = importtime_profile(module)
+        total_ms = next(c for _, c, _, name in reversed(rows) if name == module) / 1000
+        loaded = {name.split(".")[0] for _, _, _, name in rows}
+        heavy = sorted(set(HEAVY_FORBIDDEN.get(module, [])) & loaded)
+        budget = IMPORT_BUDGET_MS.get(module)
+        status = "ok"
+        if heavy:
+            status = "FAIL heavy: " + ", ".join(heavy)
+        elif budget is not None and total_ms > budget * tolerance:
+            status = f"FAIL > {budget * tolerance:.0f} ms"
+        if status != "ok":
+            failures.append(module)
+        print(f"import {module:<16} {total_ms:7.1f} ms  (budget {budget} ms)  {status}")
+    return failures
+
+
+def print_profile(module, top):
+    rows = importtime_profile(module)
+    total = next(c for _, c, _, name in reversed(rows) if name == module)
+    print(f"\n-X importtime {module}: {total / 1000:.1f} ms total, top {top} by cumulative time")
+    for _, cumulative, depth, name in sorted(rows, key=lambda r: -r[1])[:top]:
+        print(f"  {cumulative / 1000:8.1f} ms  {'  ' * depth}{name}")
+
+
+def cold_first_prediction(model, runs):
+    samples = []
+    code = FIRST_PREDICTION.format(model=model, user_input=USER_INPUT, heavy=HEAVY)
+    for _ in range(runs):
+        start = time.perf_counter()
+        out = json.loads(_python(["-c", code]).stdout)
+        out["wall"] = time.perf_counter() - start
+        samples.append(out)
+    med = {key: statistics.median(s[key] for s in samples) for key in ("wall", "import", "predict")}
+    print(f"cold start -> first {model} prediction: {med['wall'] * 1e3:7.1f} ms "
+          f"(import {med['import'] * 1e3:.1f} ms, first predict {med['predict'] * 1e3:.1f} ms, "
+          f"heavy loaded by then: {', '.join(samples[-1]['heavy']) or '-'})")
+    return med
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--models", nargs="+", default=["LR", "KNN"])
+    parser.add_argument("--tolerance", type=float, default=1.0, help="Hệ số nhân cho IMPORT_BUDGET_MS")
+    parser.add_argument("--profile", default=None, help="In chi tiết -X importtime cho module này")
+    parser.add_argument("--top", type=int, default=12)
+    args = parser.parse_args()
+
+    failures = check_imports(list(IMPORT_BUDGET_MS), args.tolerance)
+    if args.profile:
+        print_profile(args.profile, args.top)
+    print()
+    for model in args.models:
+        cold_first_prediction(model, args.runs)
+
+    if failures:
+        print(f"\nimport regression in: {', '.join(failures)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Kích thước prompt (token ước lượng) và latency trên server LLM giả lập:
+báo cáo đầy đủ của analyze_user_vs_population so với compact_report.
+
+    python benchmarks/bench_compact_report.py --rows 500 --requests 50 --prompt-token-latency 0.0005
+
+Không có tokenizer thật trong môi trường offline; số token dùng compact_report.estimate_tokens.
+Server giả lập có thời gian prefill tỉ lệ với độ dài prompt (--prompt-token-latency giây/token).
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from analysis import analyze_user_vs_population  # noqa: E402
+from compact_report import REPORT_TOKEN_BUDGET, estimate_tokens, render_compact_report  # noqa: E402
+from fake_llm_server import FakeLLMServer  # noqa: E402
+from integrate_llm import PROMPTS, AdvisorClient, prompt_input  # noqa: E402
+from population_stats import PopulationStats  # noqa: E402
+
+
+def prompt_tokens(report_text, prediction, language):
+    return estimate_tokens(PROMPTS[language].replace("{report_text}",
+                                                     prompt_input(report_text, prediction, language)["report_text"]))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=500)
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--budget", type=int, default=REPORT_TOKEN_BUDGET)
+    parser.add_argument("--latency", type=float, default=0.02)
+    parser.add_argument("--prompt-token-latency", type=float, default=0.0005)
+    args = parser.parse_args()
+
+    df = pd.read_csv("data/clean_df.csv")
+    stats = PopulationStats.from_dataframe(df)
+    # Same input shape as the app: the suicidal answer only under its dataset column
+    rows = df.drop(columns=["Depression"]).sample(args.rows, random_state=0).to_dict(orient="records")
+
+    for language in ("vi", "en"):
+        reports = []
+        for row in rows:
+            report_text, _, comparison_data = analyze_user_vs_population(row, language=language, stats=stats,
+                                                                         chart=None)
+            reports.append((report_text, render_compact_report(comparison_data, language, args.budget)))
+
+        full = [estimate_tokens(r) for r, _ in reports]
+        compact = [estimate_tokens(c) for _, c in reports]
+        full_prompt = [prompt_tokens(r, "Yes", language) for r, _ in reports]
+        compact_prompt = [prompt_tokens(c, "Yes", language) for _, c in reports]
+        truncated = sum("+" in c.splitlines()[-1] for _, c in reports)
+        print(f"[{language}] report tokens   full {statistics.mean(full):6.0f} -> compact "
+              f"{statistics.mean(compact):6.0f} (max {max(compact)}, budget {args.budget}, truncated {truncated})")
+        print(f"[{language}] prompt tokens   full {statistics.mean(full_prompt):6.0f} -> compact "
+              f"{statistics.mean(compact_prompt):6.0f} ({1 - sum(compact_prompt) / sum(full_prompt):.0%} smaller)")
+
+        with FakeLLMServer(latency=args.latency, prompt_token_latency=args.prompt_token_latency) as server:
+            client = AdvisorClient("fake", base_url=server.base_url, max_retries=0)
+            chain = client.chain(language)
+            for name, pick in (("full", 0), ("compact", 1)):
+                samples = []
+                for report in reports[:args.requests]:
+                    start = time.perf_counter()
+                    chain.invoke(prompt_input(report[pick], "Yes", language))
+                    samples.append(time.perf_counter() - start)
+                print(f"[{language}] stub latency    {name:<8} p50={statistics.median(samples) * 1e3:7.1f}ms")
+            client.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Thời gian load và bộ nhớ: pd.read_csv so với load_dataset (Parquet, category + kiểu số
+nhỏ) và load_dataset khi chỉ có CSV (fallback, cùng dtype), trên data thật và trên bản
+mở rộng giả lập (synthetic.py, mặc định 10M dòng).
+
+    python dataset_store.py convert data/clean_df.csv "data/Student Depression Dataset.csv"
+    python benchmarks/bench_dataset_store.py --runs 5 --rows 10000000
+    python benchmarks/bench_dataset_store.py --rows 0          # chỉ data thật
+
+Mỗi lần load chạy trong một process riêng: "peak MB" là ru_maxrss tăng thêm so với
+lúc bắt đầu load (sau khi đã import pandas/pyarrow), "frame MB" là
+DataFrame.memory_usage(deep=True).
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from dataset_store import columnar_path, convert  # noqa: E402
+from synthetic import write_synthetic_csv  # noqa: E402
+
+LOADER = """
+import json, resource, sys, time
+import pandas as pd
+import pyarrow.parquet
+from dataset_store import load_dataset
+before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+t0 = time.perf_counter()
+df = pd.read_csv({path!r}) if {plain} else load_dataset({path!r})
+seconds = time.perf_counter() - t0
+peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({{"seconds": seconds, "peak_mb": (peak - before) / 1024,
+                   "frame_mb": df.memory_usage(deep=True).sum() / 2**20, "rows": len(df)}}))
+"""
+
+
+def measure(path, plain, runs):
+    samples = []
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, "-c", LOADER.format(path=path, plain=plain)],
+                             cwd=ROOT, capture_output=True, text=True, check=True).stdout
+        samples.append(json.loads(out))
+    return {key: statistics.median(s[key] for s in samples) for key in samples[0]}
+
+
+def report(label, csv_path, runs, tmp):
+    if not os.path.exists(columnar_path(csv_path)):
+        convert(csv_path)
+    # Fallback: same CSV without a columnar copy next to it
+    fallback_path = os.path.join(tmp, "fallback_" + os.path.basename(csv_path))
+    shutil.copyfile(csv_path, fallback_path)
+
+    print(f"{label}: CSV {os.path.getsize(csv_path) / 2**20:.1f} MB, "
+          f"parquet {os.path.getsize(columnar_path(csv_path)) / 2**20:.1f} MB")
+    baseline = None
+    for name, path, plain in [("pd.read_csv", csv_path, True),
+                              ("load_dataset (parquet)", csv_path, False),
+                              ("load_dataset (csv fallback)", fallback_path, False)]:
+        result = measure(path, plain, runs)
+        baseline = baseline or result
+        print(f"  {name:<28} {result['seconds'] * 1e3:9.1f} ms ({baseline['seconds'] / result['seconds']:5.1f}x) | "
+              f"peak {result['peak_mb']:8.1f} MB | frame {result['frame_mb']:8.1f} MB | {int(result['rows']):,} rows")
+    os.remove(fallback_path)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--rows", type=int, default=10_000_000, help="Số dòng giả lập (0: bỏ qua)")
+    parser.add_argument("--large-runs", type=int, default=2)
+    args = parser.parse_args()
+
+    os.chdir(ROOT)
+    with tempfile.TemporaryDirectory() as tmp:
+        report("data/clean_df.csv", "data/clean_df.csv", args.runs, tmp)
+        report("raw dataset", "data/Student Depression Dataset.csv", args.runs, tmp)
+        if args.rows:
+            path = os.path.join(tmp, f"synthetic_{args.rows}.csv")
+            start = time.perf_counter()
+            write_synthetic_csv(path, args.rows)
+            written = time.perf_counter() - start
+            start = time.perf_counter()
+            convert(path)
+            print(f"\nsynthetic {args.rows:,} rows: written in {written:.1f}s, "
+                  f"converted in {time.perf_counter() - start:.1f}s")
+            report("synthetic", path, args.large_runs, tmp)
+
+
+if __name__ == "__main__":
+    main()
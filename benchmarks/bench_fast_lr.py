@@ -0,0 +1,63 @@
+"""
+Đo latency một request (p50/p99) của LR: DataFrame + ColumnTransformer + predict
+so với CompiledLogisticRegression, và kiểm tra kết quả khớp trên data/clean_df.csv.
+
+    python benchmarks/bench_fast_lr.py --requests 2000
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fast_lr import get_compiled_lr  # noqa: E402
+from model_registry import get_model, get_preprocessor  # noqa: E402
+
+
+def _percentiles(samples):
+    samples = sorted(samples)
+    return samples[len(samples) // 2], samples[int(len(samples) * 0.99) - 1]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--data", default="data/clean_df.csv")
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+
+    df = pd.read_csv(args.data).drop(columns=["Depression"], errors="ignore")
+    rows = df.to_dict(orient="records")
+    preprocessor, model = get_preprocessor(), get_model("LR")
+    compiled = get_compiled_lr()
+
+    # Parity on the whole dataset
+    expected = model.decision_function(preprocessor.transform(df))
+    got = np.array([compiled.decision_function(r) for r in rows])
+    labels_match = (np.array([compiled.predict_one(r) for r in rows]) == model.predict(preprocessor.transform(df))).all()
+    print(f"parity: labels match={labels_match} | max |decision diff|={np.abs(got - expected).max():.2e}")
+
+    sample = rows[:args.requests]
+    generic, fast = [], []
+    for row in sample:
+        start = time.perf_counter()
+        model.predict(preprocessor.transform(pd.DataFrame([row])))
+        generic.append(time.perf_counter() - start)
+    for row in sample:
+        start = time.perf_counter()
+        compiled.predict_one(row)
+        fast.append(time.perf_counter() - start)
+
+    g50, g99 = _percentiles(generic)
+    f50, f99 = _percentiles(fast)
+    print(f"generic : p50={g50 * 1e6:9.1f}us p99={g99 * 1e6:9.1f}us")
+    print(f"compiled: p50={f50 * 1e6:9.1f}us p99={f99 * 1e6:9.1f}us")
+    print(f"p50 speedup: {g50 / f50:.0f}x (mean {statistics.mean(generic) / statistics.mean(fast):.0f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+So sánh KNeighborsClassifier (brute force như KNN.pkl) với KNNIndex (IVF) ở nhiều
+kích thước train: latency theo batch query, recall@k và độ khớp dự đoán theo n_probe.
+
+    python benchmarks/bench_knn_index.py --sizes 27000,1000000,10000000 --queries 2000
+
+Vector train được transform theo chunk và ghi thẳng ra memmap float32, nên cỡ 10M
+(~2 GB vector) không cần giữ DataFrame trong RAM. Ở cỡ lớn, thời gian của
+KNeighborsClassifier chỉ đo trên --exact-queries query để không mất hàng giờ.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from knn_index import build_index  # noqa: E402
+from model_registry import get_preprocessor  # noqa: E402
+from synthetic import iter_synthetic_chunks  # noqa: E402
+
+
+def _encode(preprocessor, chunk):
+    X = preprocessor.transform(chunk)
+    return np.asarray(X.toarray() if hasattr(X, "toarray") else X, dtype=np.float32)
+
+
+def _materialize(preprocessor, n_rows, path, seed):
+    n_features = _encode(preprocessor, next(iter_synthetic_chunks(1, seed=seed))).shape[1]
+    X = np.lib.format.open_memmap(path, mode="w+", dtype=np.float32, shape=(n_rows, n_features))
+    y = np.empty(n_rows, dtype=np.int8)
+    offset = 0
+    for chunk in iter_synthetic_chunks(n_rows, chunk_size=200_000, seed=seed):
+        X[offset:offset + len(chunk)] = _encode(preprocessor, chunk)
+        y[offset:offset + len(chunk)] = chunk["Depression"].to_numpy()
+        offset += len(chunk)
+    X.flush()
+    return X, y
+
+
+def main():
+    from sklearn.neighbors import KNeighborsClassifier
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="27000,1000000,10000000")
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--exact-queries", type=int, default=200)
+    parser.add_argument("--probes", default="1,4,16,64")
+    parser.add_argument("--workdir", default=None)
+    args = parser.parse_args()
+
+    preprocessor = get_preprocessor()
+    workdir = args.workdir or tempfile.mkdtemp(prefix="knn_bench_")
+    os.makedirs(workdir, exist_ok=True)
+    queries = _encode(preprocessor, next(iter_synthetic_chunks(args.queries, seed=12345)).drop(columns=["Depression"]))
+
+    for size in [int(s) for s in args.sizes.split(",")]:
+        X, y = _materialize(preprocessor, size, os.path.join(workdir, f"train_{size}.npy"), seed=size)
+
+        start = time.perf_counter()
+        index = build_index(X, y, os.path.join(workdir, f"index_{size}"))
+        build_seconds = time.perf_counter() - start
+
+        n_exact = min(args.exact_queries, len(queries)) if size > 100_000 else len(queries)
+        knn = KNeighborsClassifier(n_neighbors=5, algorithm="brute").fit(X, y)
+        start = time.perf_counter()
+        ref_dist, _ = knn.kneighbors(queries[:n_exact])
+        ref_pred = knn.predict(queries[:n_exact])
+        sk_per_query = (time.perf_counter() - start) / n_exact
+
+        print(f"\n=== {size:,} rows | index build {build_seconds:.1f}s | n_lists={index.meta['n_lists']} ===")
+        print(f"KNeighborsClassifier(brute): {sk_per_query * 1e3:9.3f} ms/query (on {n_exact} queries)")
+        probes = [int(p) for p in args.probes.split(",")] + [index.meta["n_lists"]]
+        for n_probe in sorted(set(min(p, index.meta["n_lists"]) for p in probes)):
+            start = time.perf_counter()
+            dist, _ = index.kneighbors(queries, n_probe=n_probe)
+            per_query = (time.perf_counter() - start) / len(queries)
+            pred = index.predict(queries[:n_exact], n_probe=n_probe)
+            # A returned neighbour counts as a hit if it is within the exact k-th distance
+            recall = (np.sqrt(dist[:n_exact]) <= ref_dist[:, -1:] + 1e-4).mean()
+            print(f"IVF n_probe={n_probe:>5}: {per_query * 1e3:9.3f} ms/query | "
+                  f"recall@5={recall:.4f} | prediction agreement={(pred == ref_pred).mean():.4f} | "
+                  f"speedup={sk_per_query / per_query:6.1f}x")
+        del X, knn
+
+
+if __name__ == "__main__":
+    main()
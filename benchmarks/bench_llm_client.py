@@ -0,0 +1,83 @@
+"""
+Đo overhead mỗi lời gọi LLM: dựng prompt + ChatGroq mới mỗi lần (cách cũ của chat_llm)
+so với AdvisorClient dùng chung, trên server giả lập Groq chạy local.
+
+    python benchmarks/bench_llm_client.py --calls 200 --threads 16 --max-concurrency 4
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain_core.prompts import ChatPromptTemplate  # noqa: E402
+from langchain_groq import ChatGroq  # noqa: E402
+
+from fake_llm_server import FakeLLMServer  # noqa: E402
+from integrate_llm import LLM_MAX_TOKENS, LLM_MODEL, LLM_TEMPERATURE, PROMPTS, AdvisorClient  # noqa: E402
+
+INPUTS = {"report_text": "- CGPA: 8.1 (higher than 62.0% of students)\n--- 3. DEPRESSION PREDICTION RESULT: Yes ---"}
+
+
+def per_call(base_url):
+    # What chat_llm used to do on every request
+    prompt = ChatPromptTemplate.from_template(template=PROMPTS["en"])
+    llm = ChatGroq(api_key="fake", model=LLM_MODEL, temperature=LLM_TEMPERATURE, max_tokens=LLM_MAX_TOKENS,
+                   groq_api_base=base_url)
+    return (prompt | llm).invoke(INPUTS)
+
+
+def timed(fn, n):
+    samples = []
+    for _ in range(n):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def report(name, samples, server_stats):
+    samples = sorted(samples)
+    print(f"{name:<14} p50={statistics.median(samples) * 1e3:7.2f}ms "
+          f"p99={samples[int(len(samples) * 0.99) - 1] * 1e3:7.2f}ms "
+          f"| new TCP connections={server_stats['connections']}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--max-concurrency", type=int, default=4)
+    parser.add_argument("--latency", type=float, default=0.0, help="Độ trễ giả lập của server (giây)")
+    args = parser.parse_args()
+
+    with FakeLLMServer(latency=args.latency) as server:
+        per_call(server.base_url)
+        server.connections = 0
+        report("per-call chain", timed(lambda: per_call(server.base_url), args.calls), server.stats())
+
+    with FakeLLMServer(latency=args.latency) as server:
+        advisor = AdvisorClient("fake", base_url=server.base_url, max_concurrency=args.max_concurrency)
+        advisor.chain("en").invoke(INPUTS)
+        server.connections = 0
+        report("AdvisorClient", timed(lambda: advisor.chain("en").invoke(INPUTS), args.calls), server.stats())
+        advisor.close()
+
+    # Concurrency cap: many callers, at most max_concurrency requests reach the server at once
+    with FakeLLMServer(latency=0.05) as server:
+        advisor = AdvisorClient("fake", base_url=server.base_url, max_concurrency=args.max_concurrency)
+        start = time.perf_counter()
+        with ThreadPoolExecutor(args.threads) as pool:
+            list(pool.map(lambda _: advisor.chain("en").invoke(INPUTS), range(args.threads * 4)))
+        stats = server.stats()
+        print(f"{args.threads} threads x 4 calls in {time.perf_counter() - start:.2f}s | "
+              f"max in flight at server={stats['max_in_flight']} (limit {args.max_concurrency}) | "
+              f"connections={stats['connections']}")
+        advisor.close()
+
+
+if __name__ == "__main__":
+    main()
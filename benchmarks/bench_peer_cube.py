@@ -0,0 +1,72 @@
+"""
+Thời gian build và tra cứu của PeerCube, so với việc lọc DataFrame theo segment mỗi request.
+
+    python benchmarks/bench_peer_cube.py --rows 0,1000000 --requests 300
+
+--rows 0 là data/clean_df.csv gốc; các giá trị khác dùng dữ liệu giả lập (synthetic.py).
+"""
+import argparse
+import os
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from peer_cube import PeerCube  # noqa: E402
+from synthetic import generate_synthetic  # noqa: E402
+
+SEGMENTS = ['Degree', 'Gender', 'Sleep Duration']
+
+
+def filter_and_scan(df, user_input, segment_col, cube):
+    sub = df[df[segment_col] == user_input[segment_col]]
+    for metric in cube.numeric_cols:
+        (sub[metric] < float(user_input[metric])).mean()
+        sub[metric].mean()
+    for other in cube.categorical_cols:
+        if other != segment_col:
+            (sub[other] == user_input[other]).mean()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", default="0,1000000")
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--scan-requests", type=int, default=30)
+    args = parser.parse_args()
+
+    for n in [int(x) for x in args.rows.split(",")]:
+        df = pd.read_csv("data/clean_df.csv") if n == 0 else generate_synthetic(n)
+        start = time.perf_counter()
+        cube = PeerCube.build(df)
+        build = time.perf_counter() - start
+        cube.save("/tmp/_peer_cube.npz")
+        size = os.path.getsize("/tmp/_peer_cube.npz")
+        start = time.perf_counter()
+        PeerCube.load("/tmp/_peer_cube.npz")
+        load = time.perf_counter() - start
+
+        rows = df.head(args.requests).to_dict(orient="records")
+        start = time.perf_counter()
+        for row in rows:
+            for segment in SEGMENTS:
+                cube.compare(row, segment)
+        lookup = (time.perf_counter() - start) / (len(rows) * len(SEGMENTS))
+
+        scan_rows = rows[:args.scan_requests]
+        start = time.perf_counter()
+        for row in scan_rows:
+            for segment in SEGMENTS:
+                filter_and_scan(df, row, segment, cube)
+        scan = (time.perf_counter() - start) / (len(scan_rows) * len(SEGMENTS))
+
+        print(f"{len(df):>10,} rows | {len(cube.segments)} segments | build {build:.2f}s | "
+              f"file {size / 1024:.1f} KiB | load {load * 1e3:.1f} ms")
+        print(f"    compare() {lookup * 1e6:9.1f} us/segment | filter+scan {scan * 1e6:11.1f} us/segment "
+              f"| {scan / lookup:.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+So sánh chi phí phần so sánh số liệu của analyze_user_vs_population:
+quét DataFrame (cách cũ) vs tra cứu PopulationStats (binary search + bảng tần suất).
+
+    python benchmarks/bench_population_stats.py --data data/clean_df.csv --requests 500
+"""
+import argparse
+import os
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from population_stats import PopulationStats  # noqa: E402
+from utils import ANALYSIS_CATEGORICAL_COLS, ANALYSIS_NUMERIC_COLS  # noqa: E402
+
+
+def scan(df, user_input):
+    out = []
+    for col in ANALYSIS_NUMERIC_COLS:
+        out.append(((df[col] < float(user_input[col])).mean() * 100, df[col].mean(), df[col].max()))
+    for col in ANALYSIS_CATEGORICAL_COLS:
+        if col in df.columns:
+            out.append(df[df[col] == user_input[col]].shape[0] / df.shape[0] * 100)
+    return out
+
+
+def lookup(stats, user_input):
+    out = []
+    for col in ANALYSIS_NUMERIC_COLS:
+        out.append((stats.percentile_below(col, float(user_input[col])), stats.mean(col), stats.max(col)))
+    for col in ANALYSIS_CATEGORICAL_COLS:
+        if stats.has(col):
+            out.append(stats.category_percentage(col, user_input[col]))
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--data", default="data/clean_df.csv")
+    parser.add_argument("--requests", type=int, default=500)
+    args = parser.parse_args()
+
+    df = pd.read_csv(args.data)
+    rows = df.head(args.requests).to_dict(orient="records")
+
+    start = time.perf_counter()
+    stats = PopulationStats.from_dataframe(df)
+    build = time.perf_counter() - start
+    stats.save("/tmp/_population_stats.npz")
+    start = time.perf_counter()
+    PopulationStats.load("/tmp/_population_stats.npz")
+    load = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for row in rows:
+        scan(df, row)
+    scan_per = (time.perf_counter() - start) / len(rows)
+    start = time.perf_counter()
+    for row in rows:
+        lookup(stats, row)
+    lookup_per = (time.perf_counter() - start) / len(rows)
+
+    print(f"{len(df):,} rows | build {build * 1e3:.1f} ms | load from .npz {load * 1e3:.1f} ms")
+    print(f"scan  : {scan_per * 1e6:10.1f} us/request")
+    print(f"lookup: {lookup_per * 1e6:10.1f} us/request ({scan_per / lookup_per:.0f}x faster)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""
+Load test cho prediction_service: throughput và latency (p50/p99) của POST /predict khi
+xử lý từng request một (--max-batch-size 1) so với micro-batching, cùng mức tải.
+
+    python benchmarks/bench_prediction_service.py --model KNN --concurrency 32 --duration 10
+    python benchmarks/bench_prediction_service.py --model LR --batch-sizes 1 64 --max-wait-ms 2
+
+Service chạy trong một process riêng (như khi deploy); client là --concurrency thread, mỗi
+thread giữ một kết nối keep-alive và gửi request liên tục trong --duration giây. Trước khi
+đo, kết quả của service được so với make_inference trên cùng các profile.
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import threading
+import time
+
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from make_inference import make_inference  # noqa: E402
+
+
+def start_service(max_batch_size, max_wait_ms):
+    # No direct models: the measured model goes through the batcher unless batching is off
+    cmd = [sys.executable, "prediction_service.py", "--port", "0", "--max-batch-size", str(max_batch_size),
+           "--max-wait-ms", str(max_wait_ms), "--direct-models"]
+    proc = subprocess.Popen(cmd, cwd=ROOT, stdout=subprocess.PIPE, text=True)
+    line = proc.stdout.readline()
+    if not line.startswith("listening on "):
+        proc.kill()
+        raise RuntimeError(f"service did not start: {line!r}")
+    host, port = line.split("://")[1].strip().split(":")
+    return proc, host, int(port)
+
+
+def post(conn, path, payload):
+    conn.request("POST", path, body=json.dumps(payload), headers={"Content-Type": "application/json"})
+    response = conn.getresponse()
+    body = json.loads(response.read())
+    if response.status != 200:
+        raise RuntimeError(f"{response.status}: {body}")
+    return body
+
+
+def check_parity(host, port, model, profiles):
+    conn = http.client.HTTPConnection(host, port, timeout=60)
+    served = [post(conn, "/predict", {"model": model, "profile": p})["prediction"] for p in profiles]
+    bulk = [r["prediction"] for r in post(conn, "/predict/bulk", {"model": model, "profiles": profiles})["predictions"]]
+    conn.close()
+    expected = [make_inference(model, p) for p in profiles]
+    return served == expected and bulk == expected
+
+
+def load(host, port, model, profiles, concurrency, duration):
+    latencies, errors = [], []
+    lock = threading.Lock()
+    stop_at = time.perf_counter() + duration
+
+    def client(seed):
+        rng = random.Random(seed)
+        conn = http.client.HTTPConnection(host, port, timeout=60)
+        local = []
+        while time.perf_counter() < stop_at:
+            start = time.perf_counter()
+            try:
+                post(conn, "/predict", {"model": model, "profile": rng.choice(profiles)})
+                local.append(time.perf_counter() - start)
+            except Exception as e:
+                errors.append(repr(e))
+                conn.close()
+                conn = http.client.HTTPConnection(host, port, timeout=60)
+        conn.close()
+        with lock:
+            latencies.extend(local)
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": len(errors),
+        "throughput": len(latencies) / elapsed,
+        "p50": statistics.median(latencies) if latencies else None,
+        "p99": latencies[int(len(latencies) * 0.99)] if latencies else None,
+    }
+
+
+def scrape_batches(host, port, model):
+    conn = http.client.HTTPConnection(host, port, timeout=10)
+    conn.request("GET", "/metrics")
+    text = conn.getresponse().read().decode()
+    conn.close()
+    values = {}
+    for line in text.splitlines():
+        for name in ("batches", "rows"):
+            if line.startswith(f'advisor_batcher_{name}_total{{model="{model}"}}'):
+                values[name] = int(line.split()[-1])
+    return values
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model", default="KNN", choices=["LR", "KNN", "RF"])
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--batch-sizes", nargs="+", type=int, default=[1, 64],
+                        help="max batch size của từng lần chạy (1 = xử lý từng request một)")
+    parser.add_argument("--max-wait-ms", type=float, default=5.0)
+    parser.add_argument("--data", default="data/clean_df.csv")
+    args = parser.parse_args()
+
+    os.chdir(ROOT)
+    profiles = pd.read_csv(args.data).drop(columns=["Depression"]).head(2000).to_dict(orient="records")
+
+    print(f"model {args.model} | {args.concurrency} concurrent clients | {args.duration:.0f}s per run")
+    for max_batch_size in args.batch_sizes:
+        proc, host, port = start_service(max_batch_size, args.max_wait_ms)
+        try:
+            parity = check_parity(host, port, args.model, profiles[:50])
+            result = load(host, port, args.model, profiles, args.concurrency, args.duration)
+            batches = scrape_batches(host, port, args.model)
+        finally:
+            proc.terminate()
+            proc.wait()
+        mode = "one-at-a-time" if max_batch_size <= 1 else f"batch<={max_batch_size}, wait {args.max_wait_ms:g}ms"
+        avg_batch = f" | avg batch {batches['rows'] / batches['batches']:.1f}" if batches.get("batches") else ""
+        print(f"{mode:<26} {result['throughput']:8.1f} req/s | p50 {result['p50'] * 1e3:7.1f} ms | "
+              f"p99 {result['p99'] * 1e3:7.1f} ms | errors {result['errors']}{avg_batch} | parity {parity}")
+
+
+if __name__ == "__main__":
+    main()
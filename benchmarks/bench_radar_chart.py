@@ -0,0 +1,106 @@
+"""
+Kiểm tra tăng trưởng bộ nhớ và thời gian vẽ biểu đồ radar qua nhiều lần render.
+
+    python benchmarks/bench_radar_chart.py --renders 10000 --max-growth-mb 50
+
+Mỗi chế độ (png, figure, spec) render --renders lần với input khác nhau và đo
+RSS trước/sau; script thoát với mã 1 nếu RSS tăng quá --max-growth-mb.
+Cách cũ (plt.figure không đóng) được đo trên --legacy-renders lần để so sánh.
+"""
+import argparse
+import gc
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from population_stats import PopulationStats  # noqa: E402
+from radar_chart import RadarChart  # noqa: E402
+from utils import ANALYSIS_NUMERIC_COLS  # noqa: E402
+
+
+def rss_mb():
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+
+
+def random_inputs(n, seed=0):
+    rng = np.random.default_rng(seed)
+    for _ in range(n):
+        yield {col: float(rng.uniform(0, 10)) for col in ANALYSIS_NUMERIC_COLS}
+
+
+def legacy_render(stats, user_input):
+    # Same drawing as the original analysis code: pyplot figure that is never closed
+    import matplotlib.pyplot as plt
+    fig = plt.figure(figsize=(8, 8), facecolor='white')
+    ax = fig.add_subplot(111, polar=True)
+    angles = [n / 6 * 2 * 3.14159 for n in range(6)] + [0]
+    values = [float(user_input[c]) / stats.max(c) * 10 for c in ANALYSIS_NUMERIC_COLS]
+    ax.plot(angles, values + values[:1], label="You")
+    ax.fill(angles, values + values[:1], alpha=0.15)
+    plt.legend()
+    plt.tight_layout()
+    return fig
+
+
+def measure(name, fn, inputs):
+    gc.collect()
+    before = rss_mb()
+    start = time.perf_counter()
+    for user_input in inputs:
+        fn(user_input)
+    seconds = time.perf_counter() - start
+    gc.collect()
+    growth = rss_mb() - before
+    print(f"{name:<8} {len(inputs):>6} renders | {seconds / len(inputs) * 1e3:8.2f} ms/render | "
+          f"RSS growth {growth:8.1f} MB")
+    return growth
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--renders", type=int, default=10_000)
+    parser.add_argument("--legacy-renders", type=int, default=300)
+    parser.add_argument("--max-growth-mb", type=float, default=50.0)
+    args = parser.parse_args()
+
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    plt.rcParams["figure.max_open_warning"] = 0
+
+    stats = PopulationStats.from_dataframe(pd.read_csv("data/clean_df.csv"))
+    chart = RadarChart(stats, png_cache_size=256)
+    inputs = list(random_inputs(args.renders))
+
+    # Warm up templates and fonts so one-off allocations are not counted as growth
+    chart.render_png(inputs[0])
+    chart.create_figure(inputs[0])
+
+    failures = []
+    for name, fn, n in [
+        ("png", chart.render_png, args.renders),
+        ("spec", chart.spec, args.renders),
+        ("figure", chart.create_figure, args.renders),
+    ]:
+        if measure(name, fn, inputs[:n]) > args.max_growth_mb:
+            failures.append(name)
+
+    legacy = measure("legacy", lambda u: legacy_render(stats, u), inputs[:args.legacy_renders])
+    print(f"legacy plt.figure leak ~ {legacy / args.legacy_renders * 1024:.0f} KB/render "
+          f"(~{legacy / args.legacy_renders * args.renders:.0f} MB over {args.renders} renders)")
+    print(f"png cache: {chart.cache_stats()}")
+
+    if failures:
+        print(f"FAIL: memory grew more than {args.max_growth_mb} MB for {failures}")
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Chi phí các bước tính toán của một lần submit khi chưa có memo, khi submit lại cùng input,
+và khi chỉ đổi ngôn ngữ (số liệu dùng lại, chỉ dựng lại text + nhãn biểu đồ).
+
+    python benchmarks/bench_submit_memo.py --profiles 50 --model KNN
+
+Các bước: report (analyze_user_vs_population, không vẽ), prediction (cached_inference) và
+chart (PNG qua RadarChart). "cold" xóa mọi memo trước mỗi profile; "repeat" gọi lại đúng
+input đó; "toggle" là localize của streamlit_demo (format_report + render_png với nhãn
+của ngôn ngữ kia, sau khi ngôn ngữ đó đã được hiển thị một lần).
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import submit_pipeline  # noqa: E402
+from analysis import analyze_user_vs_population, chart_labels, clear_comparison_cache, format_report  # noqa: E402
+from model_registry import preload_all  # noqa: E402
+from population_stats import PopulationStats  # noqa: E402
+from radar_chart import RadarChart  # noqa: E402
+from submit_pipeline import cached_inference  # noqa: E402
+
+
+def clear_memos(renderer):
+    clear_comparison_cache()
+    submit_pipeline.clear_cache()
+    renderer.clear_cache()
+
+
+def stages(row, analysis_input, stats, renderer, model, language):
+    timings = {}
+    start = time.perf_counter()
+    _, _, comparison = analyze_user_vs_population(analysis_input, language=language, stats=stats, chart=None)
+    timings["report"] = time.perf_counter() - start
+    start = time.perf_counter()
+    cached_inference(model, row)
+    timings["prediction"] = time.perf_counter() - start
+    start = time.perf_counter()
+    analyze_user_vs_population(analysis_input, language=language, stats=stats, chart="png", renderer=renderer)
+    timings["chart"] = time.perf_counter() - start
+    return timings, comparison
+
+
+def localize(comparison, analysis_input, renderer, language):
+    start = time.perf_counter()
+    format_report(comparison, language)
+    renderer.render_png(analysis_input, *chart_labels(language))
+    return {"localize": time.perf_counter() - start}
+
+
+def summarize(name, results):
+    keys = list(results[0])
+    total = [sum(r.values()) for r in results]
+    parts = [f"{key} {statistics.median(r[key] for r in results) * 1e6:9.1f}us" for key in keys]
+    print(f"{name:<8} " + " | ".join(parts) + f" | total p50 {statistics.median(total) * 1e6:9.1f}us")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--profiles", type=int, default=50)
+    parser.add_argument("--model", default="KNN", choices=["LR", "KNN", "RF"])
+    args = parser.parse_args()
+
+    os.chdir(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    preload_all()
+    stats = PopulationStats.load_fresh() or PopulationStats.from_csv()
+    renderer = RadarChart(stats)
+    df = pd.read_csv("data/clean_df.csv").drop(columns=["Depression"]).sample(args.profiles, random_state=0)
+
+    # Warm-up: matplotlib templates for both languages, model code paths
+    row = df.iloc[0].to_dict()
+    for language in ("en", "vi"):
+        stages(row, row, stats, renderer, args.model, language)
+
+    cold, repeat, toggle = [], [], []
+    for _, r in df.iterrows():
+        row = r.to_dict()
+        # Same input shape as the app: the model row, suicidal answer under its dataset column
+        analysis_input = row
+        clear_memos(renderer)
+        timings, comparison = stages(row, analysis_input, stats, renderer, args.model, "en")
+        cold.append(timings)
+        repeat.append(stages(row, analysis_input, stats, renderer, args.model, "en")[0])
+        localize(comparison, analysis_input, renderer, "vi")  # first render in the other language
+        toggle.append(localize(comparison, analysis_input, renderer, "en"))
+
+    print(f"{args.profiles} profiles | model {args.model}")
+    summarize("cold", cold)
+    summarize("repeat", repeat)
+    summarize("toggle", toggle)
+    print(f"prediction memo {submit_pipeline.cache_stats()['predictions']} | chart {renderer.cache_stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Đo latency end-to-end của một lần submit: luồng tuần tự cũ
+(analyze -> make_inference -> chat_llm) so với submit_pipeline (song song + stream).
+
+    python benchmarks/bench_submit_pipeline.py --runs 10 --llm-seconds 1.0
+
+LLM được thay bằng FakeListChatModel (offline), trả về một đoạn text dài với độ
+trễ mỗi ký tự sao cho tổng thời gian sinh xấp xỉ --llm-seconds.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain_core.language_models.fake_chat_models import FakeListChatModel  # noqa: E402
+
+from analysis import analyze_user_vs_population  # noqa: E402
+from integrate_llm import chat_llm  # noqa: E402
+from make_inference import make_inference  # noqa: E402
+from model_registry import preload_all  # noqa: E402
+from population_stats import PopulationStats  # noqa: E402
+from radar_chart import RadarChart  # noqa: E402
+from submit_pipeline import start_submit  # noqa: E402
+
+ADVICE = "Keep going, you are doing great! " * 12
+
+
+class SlowFakeChatModel(FakeListChatModel):
+    """FakeListChatModel only sleeps while streaming; make invoke() take the same total time."""
+
+    def _call(self, *args, **kwargs):
+        text = super()._call(*args, **kwargs)
+        time.sleep((self.sleep or 0) * len(text))
+        return text
+
+
+def sequential(row, df, model, llm):
+    start = time.perf_counter()
+    report_text, fig, _ = analyze_user_vs_population(row, df, language="en")
+    dashboard = time.perf_counter() - start
+    prediction = make_inference(model, row)
+    chat_llm(report_text, prediction, language="en", llm=llm, use_cache=False)
+    total = time.perf_counter() - start
+    fig.clear()
+    # The old flow only shows advice once the whole completion is back
+    return {"dashboard": dashboard, "first_token": total, "total": total}
+
+
+def pipelined(row, stats, renderer, model, llm):
+    start = time.perf_counter()
+    run = start_submit(row, row, model, "en", stats, renderer=renderer, llm=llm, use_cache=False)
+    run.report()
+    run.prediction()
+    dashboard = time.perf_counter() - start
+    first_token = None
+    for _ in run.advice_stream():
+        if first_token is None:
+            first_token = time.perf_counter() - start
+    run.chart()
+    return {"dashboard": dashboard, "first_token": first_token, "total": time.perf_counter() - start}
+
+
+def summarize(name, results):
+    parts = [f"{key} p50={statistics.median(r[key] for r in results) * 1e3:8.1f}ms"
+             for key in ("dashboard", "first_token", "total")]
+    print(f"{name:<10} " + " | ".join(parts))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--model", default="LR", choices=["LR", "KNN", "RF"])
+    parser.add_argument("--llm-seconds", type=float, default=1.0)
+    args = parser.parse_args()
+
+    df = pd.read_csv("data/clean_df.csv")
+    preload_all()
+    stats = PopulationStats.from_dataframe(df)
+    renderer = RadarChart(stats)
+    rows = df.drop(columns=["Depression"]).head(args.runs).to_dict(orient="records")
+
+    def llm():
+        return SlowFakeChatModel(responses=[ADVICE], sleep=args.llm_seconds / len(ADVICE))
+
+    # Warm-up (fonts, templates, sklearn imports)
+    sequential(rows[0], df, args.model, llm())
+    pipelined(rows[0], stats, renderer, args.model, llm())
+
+    summarize("sequential", [sequential(r, df, args.model, llm()) for r in rows])
+    summarize("pipeline", [pipelined(r, stats, renderer, args.model, llm()) for r in rows])
+
+
+if __name__ == "__main__":
+    main()
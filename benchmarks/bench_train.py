@@ -0,0 +1,125 @@
+"""
+Thời gian huấn luyện: luồng của notebook.ipynb so với train.py.
+
+    python benchmarks/bench_train.py
+    python benchmarks/bench_train.py --n-jobs 4
+
+Luồng notebook chạy lại các cell 19-26 (không vẽ hình): fit preprocessor, rồi fit cả ba
+model ở cell 23 (kèm metrics), lần nữa ở cell 24 (classification_report), lần nữa ở cell 25
+và pickle. train.py được đo hai lần: cache rỗng và cache đã có (cùng file raw).
+Mỗi luồng chạy trong một process riêng, trong một thư mục tạm (data/ trỏ về repo), nên
+models/ và preprocessor/ của repo không bị ghi đè.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from utils import TRAINING_MANIFEST_PATH  # noqa: E402
+
+NOTEBOOK_FLOW = """
+import pickle
+import pandas as pd
+from sklearn.compose import ColumnTransformer
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.impute import SimpleImputer
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import accuracy_score, classification_report, f1_score, precision_score, recall_score
+from sklearn.model_selection import train_test_split
+from sklearn.neighbors import KNeighborsClassifier
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import OneHotEncoder, StandardScaler
+
+df = pd.read_csv("data/Student Depression Dataset.csv")
+df_clean = df[df["Profession"] == "Student"].drop(columns=["id", "City", "Job Satisfaction", "Profession", "Work Pressure"])
+numerical_cols = ["Age", "Academic Pressure", "CGPA", "Study Satisfaction", "Work/Study Hours", "Financial Stress"]
+categorical_cols = ["Gender", "Degree", "Have you ever had suicidal thoughts ?", "Sleep Duration",
+                    "Family History of Mental Illness", "Dietary Habits"]
+preprocessor = ColumnTransformer(transformers=[
+    ("num", Pipeline(steps=[("imputer", SimpleImputer(strategy="median")), ("scaler", StandardScaler())]), numerical_cols),
+    ("cat", Pipeline(steps=[("imputer", SimpleImputer(strategy="most_frequent")),
+                            ("encoder", OneHotEncoder(handle_unknown="ignore"))]), categorical_cols),
+])
+X = df_clean.drop("Depression", axis=1)
+y = df_clean["Depression"]
+X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+X_train_processed = preprocessor.fit_transform(X_train)
+X_test_processed = preprocessor.transform(X_test)
+with open("preprocessor/preprocessor.pkl", "wb") as f:
+    pickle.dump(preprocessor, f)
+
+
+def make_models():
+    return {"LR": LogisticRegression(), "KNN": KNeighborsClassifier(n_neighbors=5),
+            "RF": RandomForestClassifier(n_estimators=100, random_state=42)}
+
+
+# Cell 23: fit + metrics
+for name, clf in make_models().items():
+    clf.fit(X_train_processed, y_train)
+    y_pred = clf.predict(X_test_processed)
+    precision_score(y_test, y_pred), recall_score(y_test, y_pred), f1_score(y_test, y_pred), accuracy_score(y_test, y_pred)
+# Cell 24: fit again + classification_report
+for name, clf in make_models().items():
+    clf.fit(X_train_processed, y_train)
+    classification_report(y_test, clf.predict(X_test_processed))
+# Cells 25-26: fit a third time and pickle
+models = make_models()
+for name, model in models.items():
+    model.fit(X_train_processed, y_train)
+for name, model in models.items():
+    with open(f"models/{name}.pkl", "wb") as f:
+        pickle.dump(model, f)
+"""
+
+
+def _workdir(tmp):
+    os.symlink(os.path.join(ROOT, "data"), os.path.join(tmp, "data"))
+    for name in ("models", "preprocessor"):
+        os.makedirs(os.path.join(tmp, name))
+
+
+def _run(cmd, cwd):
+    start = time.perf_counter()
+    subprocess.run(cmd, cwd=cwd, check=True, stdout=subprocess.DEVNULL)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--n-jobs", type=int, default=None)
+    parser.add_argument("--skip-notebook", action="store_true")
+    args = parser.parse_args()
+
+    train_cmd = [sys.executable, os.path.join(ROOT, "train.py")]
+    if args.n_jobs:
+        train_cmd += ["--n-jobs", str(args.n_jobs)]
+    print(f"cpu_count {os.cpu_count()} | n_jobs {args.n_jobs or os.cpu_count()}")
+    with tempfile.TemporaryDirectory() as tmp:
+        _workdir(tmp)
+        results = {}
+        if not args.skip_notebook:
+            results["notebook (cells 19-26)"] = _run([sys.executable, "-c", NOTEBOOK_FLOW], tmp)
+        results["train.py, cold cache"] = _run(train_cmd, tmp)
+        with open(os.path.join(tmp, TRAINING_MANIFEST_PATH), encoding="utf-8") as f:
+            cold = json.load(f)["timings"]
+        results["train.py, warm cache"] = _run(train_cmd, tmp)
+        with open(os.path.join(tmp, TRAINING_MANIFEST_PATH), encoding="utf-8") as f:
+            warm = json.load(f)["timings"]
+
+    baseline = results.get("notebook (cells 19-26)")
+    for label, seconds in results.items():
+        speedup = f" ({baseline / seconds:.2f}x)" if baseline else ""
+        print(f"{label:<24} {seconds:7.2f}s{speedup}")
+    for label, timings in [("cold", cold), ("warm", warm)]:
+        print(f"  {label}: " + " | ".join(f"{stage} {s:.2f}s" for stage, s in timings.items()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,530 @@
+"""
+Bộ benchmark tổng hợp (kiểu asv) cho các đường inference, analysis và LLM, lưu kết quả
+ra JSON để so sánh giữa các lần chạy và đánh dấu regression.
+
+    python benchmarks/suite.py run                                  # data/clean_df.csv
+    python benchmarks/suite.py run --datasets clean 1m 10m --bench preprocess analyze
+    python benchmarks/suite.py run --compare benchmarks/results/<baseline>.json
+    python benchmarks/suite.py compare OLD.json NEW.json --threshold 0.2
+    python benchmarks/suite.py list
+
+Dataset "1m"/"10m" được sinh trong bộ nhớ bằng synthetic.iter_synthetic_chunks (bootstrap
+từ clean_df, cột categorical giữ ở dtype category để 10M dòng vừa RAM); thời gian sinh
+không tính vào kết quả. Mỗi benchmark trả về một hàm được đo: chạy 1 lần warm-up, tự
+chọn `number` để mỗi mẫu dài ít nhất --min-time, rồi lấy --repeat mẫu (dừng sớm khi quá
+--max-time). Benchmark "cold" tự đo trong một process Python mới.
+
+Memo theo input (so sánh của analysis, dự đoán của cached_inference, PNG của RadarChart) bị
+xóa trước mỗi lần gọi của analyze, submit.e2e và tracing.request, nên các benchmark đó luôn
+đo việc tính thật, không phụ thuộc số lần lặp hay thứ tự input. Phần memo tiết kiệm được
+đo riêng ở analyze.memo / submit.memo (miss: memo trống, hit: input đã được memo).
+
+Regression: median mới > median cũ x (1 + threshold) và chênh lệch lớn hơn 2 lần độ lệch
+chuẩn của mẫu (để bỏ qua nhiễu). `run --compare` và `compare` thoát với mã 1 nếu có.
+"""
+import argparse
+import fnmatch
+import itertools
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from utils import MODEL_PATHS  # noqa: E402
+
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+DATASETS = {"clean": None, "1m": 1_000_000, "10m": 10_000_000}
+MODELS = list(MODEL_PATHS)
+CHUNK_SIZE = 100_000
+
+BENCHMARKS = []
+
+
+class Skip(Exception):
+    """Benchmark không chạy được trong môi trường hiện tại (ví dụ thiếu models/RF.pkl)."""
+
+
+def benchmark(name, datasets=(None,), params=(None,), timer="wall", throughput=False):
+    """
+    Đăng ký một benchmark. Hàm nhận (ctx, dataset, param) và trả về callable cần đo.
+    timer="self": callable tự trả về thời gian (giây) của nó, dùng cho benchmark cold.
+    throughput=True: mỗi lần gọi xử lý toàn bộ dataset, kết quả có thêm rows_per_second.
+    """
+    def register(fn):
+        BENCHMARKS.append({"name": name, "fn": fn, "datasets": datasets, "params": params, "timer": timer,
+                           "throughput": throughput})
+        return fn
+    return register
+
+
+# ---------------------------------------------------------
+# Dataset và trạng thái dùng chung giữa các benchmark
+# ---------------------------------------------------------
+class Context:
+    def __init__(self):
+        self._frames = {}
+        self._stats = {}
+
+    def frame(self, dataset):
+        """DataFrame đầy đủ (có cột Depression) cho dataset; sinh một lần rồi cache."""
+        import pandas as pd
+
+        if dataset not in self._frames:
+            base = pd.read_csv(os.path.join(ROOT, "data/clean_df.csv"))
+            n_rows = DATASETS[dataset]
+            if n_rows is None:
+                df = base
+            else:
+                from synthetic import iter_synthetic_chunks
+
+                categories = {col: sorted(base[col].dropna().unique()) for col in base.columns
+                              if base[col].dtype == object}
+                chunks = []
+                for chunk in iter_synthetic_chunks(n_rows, chunk_size=CHUNK_SIZE,
+                                                   source=os.path.join(ROOT, "data/clean_df.csv")):
+                    for col, cats in categories.items():
+                        chunk[col] = pd.Categorical(chunk[col], categories=cats)
+                    chunks.append(chunk)
+                df = pd.concat(chunks, ignore_index=True)
+            self._frames[dataset] = df
+        return self._frames[dataset]
+
+    def features(self, dataset):
+        return self.frame(dataset).drop(columns=["Depression"], errors="ignore")
+
+    def stats(self, dataset):
+        from population_stats import PopulationStats
+
+        if dataset not in self._stats:
+            self._stats[dataset] = PopulationStats.from_dataframe(self.frame(dataset))
+        return self._stats[dataset]
+
+    def rows(self, n=200):
+        """Các profile thật (dict) để gửi lần lượt như request của user."""
+        return self.features("clean").head(n).to_dict(orient="records")
+
+
+def _require_model(model):
+    if not os.path.exists(os.path.join(ROOT, MODEL_PATHS[model])):
+        raise Skip(f"{MODEL_PATHS[model]} not found")
+
+
+def _clear_memos(renderer=None):
+    """Xóa memo theo input (so sánh, dự đoán, PNG) để lần gọi sau làm lại toàn bộ việc tính."""
+    import submit_pipeline
+    from analysis import clear_comparison_cache
+
+    clear_comparison_cache()
+    submit_pipeline.clear_cache()
+    if renderer is not None:
+        renderer.clear_cache()
+
+
+# ---------------------------------------------------------
+# Benchmark
+# ---------------------------------------------------------
+COLD_INFERENCE = """
+import json, time
+t0 = time.perf_counter()
+from make_inference import make_inference
+make_inference({model!r}, {row!r})
+print(json.dumps({{"seconds": time.perf_counter() - t0}}))
+"""
+
+
+@benchmark("make_inference.cold", params=MODELS, timer="self")
+def bench_inference_cold(ctx, dataset, model):
+    _require_model(model)
+    code = COLD_INFERENCE.format(model=model, row=ctx.rows(1)[0])
+
+    def run():
+        out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True)
+        return json.loads(out.stdout.strip().splitlines()[-1])["seconds"]
+    return run
+
+
+@benchmark("make_inference.warm", params=MODELS)
+def bench_inference_warm(ctx, dataset, model):
+    from make_inference import make_inference
+
+    _require_model(model)
+    rows = itertools.cycle(ctx.rows())
+    return lambda: make_inference(model, next(rows))
+
+
+@benchmark("make_inference_batch", datasets=tuple(DATASETS), params=MODELS, throughput=True)
+def bench_inference_batch(ctx, dataset, model):
+    from make_inference import make_inference_batch
+
+    _require_model(model)
+    if model != "LR" and dataset != "clean":
+        # Brute-force KNN / RF over millions of rows takes hours on one core
+        raise Skip("only LR is benchmarked on synthetic datasets")
+    df = ctx.features(dataset)
+    return lambda: make_inference_batch(model, df, chunk_size=CHUNK_SIZE)
+
+
+@benchmark("preprocess.one")
+def bench_preprocess_one(ctx, dataset, param):
+    import pandas as pd
+
+    from model_registry import get_preprocessor
+
+    preprocessor = get_preprocessor()
+    frames = itertools.cycle([pd.DataFrame([row]) for row in ctx.rows()])
+    return lambda: preprocessor.transform(next(frames))
+
+
+@benchmark("preprocess", datasets=tuple(DATASETS), throughput=True)
+def bench_preprocess(ctx, dataset, param):
+    from model_registry import get_preprocessor
+
+    preprocessor = get_preprocessor()
+    df = ctx.features(dataset)
+
+    def run():
+        for start in range(0, len(df), CHUNK_SIZE):
+            preprocessor.transform(df.iloc[start:start + CHUNK_SIZE])
+    return run
+
+
+@benchmark("population_stats.build", datasets=tuple(DATASETS), throughput=True)
+def bench_population_stats(ctx, dataset, param):
+    from population_stats import PopulationStats
+
+    df = ctx.frame(dataset)
+    return lambda: PopulationStats.from_dataframe(df)
+
+
+@benchmark("analyze", datasets=tuple(DATASETS), params=("none", "png", "figure", "spec"))
+def bench_analyze(ctx, dataset, chart):
+    from analysis import analyze_user_vs_population
+    from radar_chart import RadarChart
+
+    stats = ctx.stats(dataset)
+    chart = None if chart == "none" else chart
+    renderer = RadarChart(stats) if chart else None
+    inputs = itertools.cycle(ctx.rows())
+
+    def run():
+        _clear_memos(renderer)
+        analyze_user_vs_population(next(inputs), language="en", stats=stats, chart=chart, renderer=renderer)
+    return run
+
+
+@benchmark("submit.e2e", params=MODELS)
+def bench_submit(ctx, dataset, model):
+    from langchain_core.language_models.fake_chat_models import FakeListChatModel
+
+    from radar_chart import RadarChart
+    from submit_pipeline import start_submit
+
+    _require_model(model)
+    stats = ctx.stats("clean")
+    renderer = RadarChart(stats)
+    # Stubbed LLM: instant canned completion, so this measures the pipeline itself
+    llm = FakeListChatModel(responses=["Keep going, you are doing great! " * 12])
+    rows = itertools.cycle(ctx.rows())
+
+    def run():
+        row = next(rows)
+        _clear_memos(renderer)
+        submit = start_submit(row, row, model, "en", stats, renderer=renderer, llm=llm,
+                              use_cache=False)
+        submit.advice()
+        submit.chart()
+    return run
+
+
+@benchmark("analyze.memo", params=("miss", "hit"))
+def bench_analyze_memo(ctx, dataset, state):
+    """
+    analyze + PNG của cùng một profile: "miss" xóa memo trước mỗi lần gọi, "hit" là submit lại
+    đúng profile đó (so sánh và PNG lấy từ memo). Chênh lệch giữa hai bên là phần memo tiết kiệm.
+    """
+    from analysis import analyze_user_vs_population
+    from radar_chart import RadarChart
+
+    stats = ctx.stats("clean")
+    renderer = RadarChart(stats)
+    row = ctx.rows(1)[0]
+
+    def run():
+        if state == "miss":
+            _clear_memos(renderer)
+        analyze_user_vs_population(row, language="en", stats=stats, chart="png", renderer=renderer)
+    return run
+
+
+@benchmark("submit.memo", params=("miss", "hit"))
+def bench_submit_memo(ctx, dataset, state):
+    """Như analyze.memo cho cả lần submit (KNN, LLM giả lập): thêm memo dự đoán của cached_inference."""
+    from langchain_core.language_models.fake_chat_models import FakeListChatModel
+
+    from radar_chart import RadarChart
+    from submit_pipeline import start_submit
+
+    _require_model("KNN")
+    stats = ctx.stats("clean")
+    renderer = RadarChart(stats)
+    llm = FakeListChatModel(responses=["Keep going, you are doing great! " * 12])
+    row = ctx.rows(1)[0]
+
+    def run():
+        if state == "miss":
+            _clear_memos(renderer)
+        submit = start_submit(row, row, "KNN", "en", stats, renderer=renderer, llm=llm, use_cache=False)
+        submit.advice()
+        submit.chart()
+    return run
+
+
+@benchmark("tracing.request", params=("off", "on"))
+def bench_tracing(ctx, dataset, mode):
+    """analyze (không vẽ) + make_inference LR, không trace vs trong một trace: chi phí của span."""
+    import tracing
+    from analysis import analyze_user_vs_population
+    from make_inference import make_inference
+
+    stats = ctx.stats("clean")
+    rows = itertools.cycle(ctx.rows())
+
+    def request():
+        row = next(rows)
+        _clear_memos()
+        analyze_user_vs_population(row, language="en", stats=stats, chart=None)
+        make_inference("LR", row)
+
+    if mode == "off":
+        return request
+
+    def traced():
+        tr = tracing.Trace("bench")
+        with tr.activate():
+            request()
+    return traced
+
+
+# ---------------------------------------------------------
+# Đo và lưu kết quả
+# ---------------------------------------------------------
+def measure(fn, timer, repeat, min_time, max_time):
+    if timer == "self":
+        samples, number = [], 1
+        deadline = time.perf_counter() + max_time
+        for _ in range(repeat):
+            samples.append(fn())
+            if time.perf_counter() > deadline:
+                break
+        return samples, number
+
+    start = time.perf_counter()
+    fn()  # warm-up (lazy loads, caches), also used to calibrate `number`
+    first = time.perf_counter() - start
+    number = max(1, int(min_time / first)) if first > 0 else 1
+    samples = []
+    deadline = time.perf_counter() + max_time
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        samples.append((time.perf_counter() - start) / number)
+        if time.perf_counter() > deadline:
+            break
+    return samples, number
+
+
+def _summary(samples, number, rows=None, throughput=False):
+    result = {
+        "status": "ok",
+        "unit": "seconds",
+        "median": statistics.median(samples),
+        "min": min(samples),
+        "max": max(samples),
+        "stdev": statistics.stdev(samples) if len(samples) > 1 else 0.0,
+        "repeat": len(samples),
+        "number": number,
+        "samples": samples,
+    }
+    if rows:
+        result["rows"] = rows
+        if throughput:
+            result["rows_per_second"] = rows / result["median"]
+    return result
+
+
+def _key(name, dataset, param):
+    return name + "".join(f"[{part}]" for part in (param, dataset) if part is not None)
+
+
+def selected(patterns, datasets):
+    """(key, spec, dataset, param) của các benchmark khớp --bench và --datasets."""
+    for spec in BENCHMARKS:
+        for dataset in spec["datasets"]:
+            if dataset is not None and dataset not in datasets:
+                continue
+            for param in spec["params"]:
+                key = _key(spec["name"], dataset, param)
+                # "[" is literal in keys like analyze[png][clean], not a glob character class
+                if not patterns or any(key.startswith(p) or fnmatch.fnmatchcase(key, p.replace("[", "[[]"))
+                                       for p in patterns):
+                    yield key, spec, dataset, param
+
+
+def _git_commit():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                                text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=ROOT,
+                               capture_output=True, text=True, check=True).stdout.strip()
+        return commit + ("-dirty" if dirty else "")
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def _environment():
+    import numpy
+    import pandas
+    import sklearn
+
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "numpy": numpy.__version__,
+        "pandas": pandas.__version__,
+        "sklearn": sklearn.__version__,
+        "model_format": os.getenv("MODEL_FORMAT", "auto"),
+    }
+
+
+def run_suite(patterns, datasets, repeat, min_time, max_time, quiet=False):
+    ctx = Context()
+    results = {}
+    for key, spec, dataset, param in selected(patterns, datasets):
+        try:
+            fn = spec["fn"](ctx, dataset, param)
+            samples, number = measure(fn, spec["timer"], repeat, min_time, max_time)
+        except Skip as e:
+            results[key] = {"status": "skipped", "reason": str(e)}
+        except Exception as e:  # keep the rest of the suite running, record the failure
+            results[key] = {"status": "failed", "reason": f"{type(e).__name__}: {e}"}
+        else:
+            rows = len(ctx.frame(dataset)) if dataset is not None else None
+            results[key] = _summary(samples, number, rows, spec["throughput"])
+        if not quiet:
+            print(_format_result(key, results[key]), flush=True)
+    return {
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "commit": _git_commit(),
+        "environment": _environment(),
+        "settings": {"datasets": list(datasets), "repeat": repeat, "min_time": min_time, "max_time": max_time},
+        "results": results,
+    }
+
+
+def _fmt_seconds(seconds):
+    if seconds >= 1:
+        return f"{seconds:8.2f} s "
+    if seconds >= 1e-3:
+        return f"{seconds * 1e3:8.2f} ms"
+    return f"{seconds * 1e6:8.1f} us"
+
+
+def _format_result(key, result):
+    if result["status"] != "ok":
+        return f"{key:<44} {result['status']}: {result['reason']}"
+    line = f"{key:<44} {_fmt_seconds(result['median'])} ± {_fmt_seconds(result['stdev']).strip()}"
+    if "rows_per_second" in result:
+        line += f"  ({result['rows_per_second']:,.0f} rows/s)"
+    return line
+
+
+def compare(base, new, threshold):
+    """In bảng so sánh median; trả về danh sách key bị regression."""
+    if base.get("environment", {}).get("platform") != new.get("environment", {}).get("platform"):
+        print("warning: results come from different platforms; ratios may not be meaningful")
+    regressions = []
+    print(f"{'benchmark':<44} {'before':>11} {'after':>11}  ratio")
+    for key, after in new["results"].items():
+        before = base["results"].get(key)
+        if before is None or before["status"] != "ok" or after["status"] != "ok":
+            continue
+        ratio = after["median"] / before["median"]
+        noise = 2 * max(before["stdev"], after["stdev"])
+        flag = ""
+        if ratio > 1 + threshold and after["median"] - before["median"] > noise:
+            flag = "REGRESSION"
+            regressions.append(key)
+        elif ratio < 1 / (1 + threshold) and before["median"] - after["median"] > noise:
+            flag = "improved"
+        print(f"{key:<44} {_fmt_seconds(before['median'])} {_fmt_seconds(after['median'])}  {ratio:5.2f}x {flag}")
+    return regressions
+
+
+def _load(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark suite with JSON results")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run_p = sub.add_parser("run")
+    run_p.add_argument("--bench", nargs="*", default=[], help="Tên/glob benchmark, ví dụ analyze 'make_inference.*'")
+    run_p.add_argument("--datasets", nargs="+", default=["clean"], choices=list(DATASETS))
+    run_p.add_argument("--repeat", type=int, default=7)
+    run_p.add_argument("--min-time", type=float, default=0.05, help="Thời gian tối thiểu của một mẫu (giây)")
+    run_p.add_argument("--max-time", type=float, default=60.0, help="Ngừng lấy thêm mẫu sau chừng này giây")
+    run_p.add_argument("--output", default=None, help="Mặc định benchmarks/results/<thời gian>-<commit>.json")
+    run_p.add_argument("--compare", default=None, help="File kết quả cũ để so sánh")
+    run_p.add_argument("--threshold", type=float, default=0.2)
+
+    cmp_p = sub.add_parser("compare")
+    cmp_p.add_argument("base")
+    cmp_p.add_argument("new")
+    cmp_p.add_argument("--threshold", type=float, default=0.2)
+
+    list_p = sub.add_parser("list")
+    list_p.add_argument("--datasets", nargs="+", default=list(DATASETS), choices=list(DATASETS))
+    args = parser.parse_args()
+
+    os.chdir(ROOT)
+    if args.command == "list":
+        for key, *_ in selected([], args.datasets):
+            print(key)
+        return
+
+    if args.command == "compare":
+        regressions = compare(_load(args.base), _load(args.new), args.threshold)
+    else:
+        report = run_suite(args.bench, args.datasets, args.repeat, args.min_time, args.max_time)
+        output = args.output
+        if output is None:
+            os.makedirs(RESULTS_DIR, exist_ok=True)
+            stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+            output = os.path.join(RESULTS_DIR, f"{stamp}-{report['commit']}.json")
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nsaved {output}")
+        regressions = []
+        if args.compare:
+            print()
+            regressions = compare(_load(args.compare), report, args.threshold)
+
+    if regressions:
+        print(f"\n{len(regressions)} regression(s): {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
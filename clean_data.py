@@ -0,0 +1,287 @@
+"""
+Làm sạch dữ liệu raw thành data/clean_df.csv (thay cho clean_df của notebook) và tính
+luôn data/population_stats.npz cho analysis và data/peer_cube.npz cho so sánh theo nhóm.
+
+    python clean_data.py                                  # data/Student Depression Dataset.csv
+    python clean_data.py raw/2024.csv raw/2025.csv --workers 4
+    python clean_data.py --full                           # bỏ qua state, làm lại từ đầu
+
+File raw được đọc theo chunk, chỉ các cột cần thiết (projection ngay lúc parse); mỗi chunk
+được chuẩn hóa kiểu, lọc Profession == "Student" và đếm thống kê trong một process của
+pool, rồi ghi nối vào output theo đúng thứ tự. Số chunk đang xử lý bị giới hạn nên bộ nhớ
+không phụ thuộc vào kích thước raw.
+
+Chạy tăng dần: <out>.state.json ghi lại các file raw đã xử lý (size/mtime/sha256), kích
+thước output và thống kê cộng dồn. Nếu lần chạy sau chỉ thêm file raw mới vào cuối danh
+sách, hoặc chỉ có thêm dòng được append vào cuối file raw cuối cùng, thì chỉ phần mới được
+đọc và ghi nối vào output; mọi thay đổi khác thì làm lại toàn bộ (ghi ra file tạm rồi thay).
+Peer cube cần phân bố đầy đủ của từng segment nên luôn được build lại từ output (nhỏ hơn raw
+nhiều), mỗi khi output đổi hoặc cube không còn khớp với nó.
+"""
+import argparse
+import hashlib
+import io
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from dataset_store import convert, source_info
+from model_artifacts import _sha256
+from peer_cube import PeerCube
+from population_stats import PopulationStatsBuilder
+from utils import CLEAN_DATA_PATH, PEER_CUBE_PATH, POPULATION_STATS_PATH, RAW_DATA_PATH
+
+# 2: stats state keyed by analysis name (population_stats.source_column)
+STATE_VERSION = 2
+CHUNK_SIZE = 100_000
+
+RAW_DROP_COLS = ["id", "City", "Job Satisfaction", "Profession", "Work Pressure"]
+TARGET_COL = "Depression"
+KEEP_PROFESSION = "Student"
+
+# Output schema, in the column order of data/clean_df.csv
+CLEAN_COLUMNS = ["Gender", "Age", "Academic Pressure", "CGPA", "Study Satisfaction", "Sleep Duration",
+                 "Dietary Habits", "Degree", "Have you ever had suicidal thoughts ?", "Work/Study Hours",
+                 "Financial Stress", "Family History of Mental Illness", TARGET_COL]
+NUMERIC_COLS = ["Age", "Academic Pressure", "CGPA", "Study Satisfaction", "Work/Study Hours", "Financial Stress"]
+TEXT_COLS = [col for col in CLEAN_COLUMNS if col not in NUMERIC_COLS and col != TARGET_COL]
+# The only raw columns the stage parses
+RAW_COLUMNS = CLEAN_COLUMNS + ["Profession"]
+
+
+def clean_df(df):
+    """Như notebook: chỉ giữ sinh viên và bỏ các cột không dùng."""
+    df = df[df["Profession"] == KEEP_PROFESSION]
+    return df.drop(columns=RAW_DROP_COLS)
+
+
+def normalize(df):
+    """Ép kiểu cố định cho một chunk raw (không phụ thuộc pandas đoán kiểu ra sao ở từng chunk)."""
+    import pandas as pd
+
+    df = df.copy()
+    for col in TEXT_COLS + ["Profession"]:
+        if col in df.columns and df[col].dtype.kind not in "iufb" and df[col].dtype != "category":
+            df[col] = df[col].str.strip()
+    for col in NUMERIC_COLS:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors="coerce").astype(np.float64)
+    if TARGET_COL in df.columns:
+        target = pd.to_numeric(df[TARGET_COL], errors="coerce")
+        # A row without a valid label cannot be used for training or analysis
+        df = df[target.notna()].assign(**{TARGET_COL: target[target.notna()].astype(np.int64)})
+    return df
+
+
+def clean_chunk(chunk):
+    """Chunk raw -> (chunk sạch theo CLEAN_COLUMNS, thống kê của chunk đó)."""
+    clean = normalize(chunk)
+    clean = clean.loc[clean["Profession"] == KEEP_PROFESSION, CLEAN_COLUMNS]
+    return clean, PopulationStatsBuilder().update(clean)
+
+
+def _clean_chunk_csv(chunk):
+    # to_csv is most of the per-chunk cost, so workers render the text and the parent only appends it
+    clean, partial = clean_chunk(chunk)
+    return clean.to_csv(index=False, header=False), len(clean), partial
+
+
+# ---------------------------------------------------------
+# Input / state
+# ---------------------------------------------------------
+def _prefix_sha256(path, nbytes):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        remaining = nbytes
+        while remaining:
+            block = f.read(min(1 << 20, remaining))
+            if not block:
+                break
+            digest.update(block)
+            remaining -= len(block)
+    return digest.hexdigest()
+
+
+def _iter_raw_chunks(path, chunk_size, start=0):
+    """Chunk raw của path; start > 0: chỉ đọc phần bắt đầu từ byte đó (dòng được append sau lần trước)."""
+    import pandas as pd
+
+    if not start:
+        yield from pd.read_csv(path, usecols=RAW_COLUMNS, chunksize=chunk_size)
+        return
+    header = pd.read_csv(path, nrows=0).columns
+    with open(path, "rb") as f:
+        f.seek(start)
+        stream = io.TextIOWrapper(f, encoding="utf-8")
+        yield from pd.read_csv(stream, header=None, names=header, usecols=RAW_COLUMNS, chunksize=chunk_size)
+
+
+def state_path(out_path):
+    return os.path.splitext(out_path)[0] + ".state.json"
+
+
+def load_state(out_path):
+    path = state_path(out_path)
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        state = json.load(f)
+    return state if state.get("version") == STATE_VERSION else None
+
+
+def _save_state(out_path, state):
+    path = state_path(out_path)
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def plan(inputs, out_path, state):
+    """
+    Phần việc cần làm: list (path, start byte) hoặc None nếu phải làm lại từ đầu.
+    [] nghĩa là output đã khớp với mọi input.
+    """
+    if state is None or not os.path.exists(out_path) or os.path.getsize(out_path) != state["output_size"]:
+        return None
+    done = state["inputs"]
+    if [item["path"] for item in done] != inputs[:len(done)]:
+        return None
+    work = []
+    for item in done:
+        st = os.stat(item["path"])
+        if st.st_size == item["size"] and (st.st_mtime_ns == item["mtime_ns"] or _sha256(item["path"]) == item["sha256"]):
+            continue
+        # Only the last processed file may have grown, and only by appending whole lines
+        if item is not done[-1] or st.st_size < item["size"] or \
+                _prefix_sha256(item["path"], item["size"]) != item["sha256"] or not item.get("ends_with_newline"):
+            return None
+        work.append((item["path"], item["size"]))
+    return work + [(path, 0) for path in inputs[len(done):]]
+
+
+def _input_record(path, rows):
+    info = source_info(path)
+    with open(path, "rb") as f:
+        f.seek(max(info["size"] - 1, 0))
+        info["ends_with_newline"] = f.read(1) == b"\n"
+    info["rows"] = rows
+    return info
+
+
+def _write_peer_cube(out_path, cube_path):
+    if cube_path is not None and PeerCube.load_fresh(cube_path, out_path) is None:
+        PeerCube.from_csv(out_path).save(cube_path)
+
+
+# ---------------------------------------------------------
+# Stage
+# ---------------------------------------------------------
+def clean_data(inputs=(RAW_DATA_PATH,), out_path=CLEAN_DATA_PATH, stats_path=POPULATION_STATS_PATH,
+               chunk_size=CHUNK_SIZE, workers=None, max_pending=None, full=False, columnar=True,
+               cube_path=PEER_CUBE_PATH):
+    """
+    Làm sạch inputs (theo thứ tự) vào out_path, ghi stats_path, cube_path (None: bỏ qua) và
+    state; trả về dict tóm tắt (mode: "full" / "incremental" / "up to date", rows đọc / ghi, seconds).
+    """
+    inputs = list(inputs)
+    start_time = time.perf_counter()
+    state = None if full else load_state(out_path)
+    work = plan(inputs, out_path, state)
+    if work == []:
+        _write_peer_cube(out_path, cube_path)
+        return {"mode": "up to date", "raw_rows": 0, "clean_rows": 0, "total_rows": state["stats"]["total"],
+                "seconds": time.perf_counter() - start_time}
+
+    incremental = work is not None
+    if incremental:
+        builder = PopulationStatsBuilder.from_state(state["stats"])
+        records = {item["path"]: item for item in state["inputs"]}
+        target = out_path
+    else:
+        work = [(path, 0) for path in inputs]
+        builder = PopulationStatsBuilder()
+        records = {}
+        target = f"{out_path}.tmp-{os.getpid()}"
+        open(target, "w").close()
+
+    workers = workers or os.cpu_count() or 1
+    max_pending = max_pending or workers * 2
+    raw_rows = clean_rows = 0
+    pending = deque()
+    out = open(target, "a", encoding="utf-8", newline="")
+    if out.tell() == 0:
+        out.write(",".join(CLEAN_COLUMNS) + "\n")
+
+    def write(text, rows, partial):
+        nonlocal clean_rows
+        out.write(text)
+        builder.merge(partial)
+        clean_rows += rows
+
+    def drain(block_all=False):
+        while pending and (block_all or len(pending) >= max_pending or pending[0].done()):
+            write(*pending.popleft().result())
+
+    # One worker: clean in-process, a pool would only add pickling
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    try:
+        for path, start in work:
+            file_rows = records[path]["rows"] if path in records else 0
+            for chunk in _iter_raw_chunks(path, chunk_size, start):
+                file_rows += len(chunk)
+                raw_rows += len(chunk)
+                if pool is None:
+                    write(*_clean_chunk_csv(chunk))
+                else:
+                    pending.append(pool.submit(_clean_chunk_csv, chunk))
+                    drain()
+            drain(block_all=True)
+            records[path] = _input_record(path, file_rows)
+    finally:
+        out.close()
+        if pool is not None:
+            pool.shutdown()
+
+    if not incremental:
+        os.replace(target, out_path)
+    stats = builder.build()
+    stats.save(stats_path, source=source_info(out_path))
+    _save_state(out_path, {
+        "version": STATE_VERSION,
+        "inputs": [records[path] for path in inputs],
+        "output_size": os.path.getsize(out_path),
+        "stats": builder.to_state(),
+    })
+    if columnar:
+        convert(out_path)
+    # After convert, so the cube is built from the fresh Parquet copy
+    _write_peer_cube(out_path, cube_path)
+    return {"mode": "incremental" if incremental else "full", "raw_rows": raw_rows, "clean_rows": clean_rows,
+            "total_rows": stats.total, "seconds": time.perf_counter() - start_time}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Clean the raw survey export(s) into data/clean_df.csv")
+    parser.add_argument("inputs", nargs="*", default=[RAW_DATA_PATH], help="File raw, theo thứ tự")
+    parser.add_argument("--out", default=CLEAN_DATA_PATH)
+    parser.add_argument("--stats", default=POPULATION_STATS_PATH)
+    parser.add_argument("--peer-cube", default=PEER_CUBE_PATH)
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--full", action="store_true", help="Bỏ qua state, làm lại toàn bộ")
+    parser.add_argument("--no-columnar", action="store_true", help="Không convert lại bản Parquet")
+    args = parser.parse_args(argv)
+
+    summary = clean_data(args.inputs, args.out, args.stats, chunk_size=args.chunk_size, workers=args.workers,
+                         full=args.full, columnar=not args.no_columnar, cube_path=args.peer_cube)
+    print(f"{summary['mode']}: {summary['raw_rows']:,} raw rows -> {summary['clean_rows']:,} clean rows "
+          f"({summary['total_rows']:,} total) in {summary['seconds']:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,327 @@
+"""
+Sinh trước lời khuyên của LLM cho cả một khóa sinh viên (hàng nghìn profile).
+
+    python cohort_advice.py profiles.csv advice.jsonl --model LR --language vi \
+        --max-in-flight 8 --rate 5 --burst 10
+
+Mỗi dòng input: báo cáo (analyze_user_vs_population, không vẽ), dự đoán theo
+batch (predict_frame), rồi gọi LLM trên thread pool với số request đồng thời bị
+giới hạn, rate limit kiểu token bucket và retry với exponential backoff cho lỗi
+tạm thời (408/409/429, 5xx, timeout, mất kết nối); mọi lỗi khác (lỗi code, request
+sai, hết quota...) được ghi lại cho dòng đó ngay, không retry.
+
+Kết quả được append vào file JSONL ngay khi từng dòng xong (flush + fsync), nên
+chạy lại cùng lệnh sẽ bỏ qua các row_id đã "ok" và chỉ làm các dòng còn thiếu
+hoặc bị lỗi. Nếu một row_id xuất hiện nhiều lần, bản ghi cuối cùng là bản đúng
+(xem load_results).
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from analysis import analyze_user_vs_population
+from compact_report import REPORT_FORMAT, llm_report_text
+from integrate_llm import LLM_MODEL, LLM_TEMPERATURE, AdvisorClient, get_api_key, prompt_input
+from llm_cache import get_llm_cache, make_cache_key
+from make_inference import get_estimator, iter_input_chunks, predict_frame
+from model_registry import get_preprocessor
+from population_stats import PopulationStats
+
+RETRYABLE_STATUS = {408, 409, 429}
+
+
+class TokenBucket:
+    """Rate limiter: trung bình `rate` request/giây, cho phép dồn tối đa `capacity` request."""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate or 0.0)
+        self._tokens = self.capacity
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if not self.rate:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait_for = (1 - self._tokens) / self.rate
+            time.sleep(wait_for)
+
+
+def _status_code(error):
+    status = getattr(error, "status_code", None)
+    if status is None and getattr(error, "response", None) is not None:
+        status = getattr(error.response, "status_code", None)
+    return status
+
+
+_transient_errors = None
+
+
+def _transient_error_types():
+    """Timeout / lỗi kết nối: request không nhận được câu trả lời nào, gửi lại có thể thành công."""
+    global _transient_errors
+    if _transient_errors is None:
+        types = [TimeoutError, ConnectionError]
+        try:
+            import httpx
+            types += [httpx.TimeoutException, httpx.NetworkError, httpx.RemoteProtocolError]
+        except ImportError:
+            pass
+        try:
+            import groq
+            # APITimeoutError is a subclass of APIConnectionError
+            types.append(groq.APIConnectionError)
+        except ImportError:
+            pass
+        _transient_errors = tuple(types)
+    return _transient_errors
+
+
+def is_retryable(error):
+    status = _status_code(error)
+    if status is not None:
+        return status in RETRYABLE_STATUS or status >= 500
+    # Client libraries may re-raise the transport error as the cause of their own
+    while error is not None:
+        if isinstance(error, _transient_error_types()):
+            return True
+        error = error.__cause__
+    return False
+
+
+def _retry_after(error):
+    response = getattr(error, "response", None)
+    try:
+        return float(response.headers.get("retry-after")) if response is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt, base=0.5, cap=30.0):
+    # Full jitter: uniform in [0, min(cap, base * 2^attempt)]
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+def load_results(path):
+    """Đọc file kết quả; trả về {row_id: bản ghi cuối cùng của row đó}."""
+    results = {}
+    if not os.path.exists(path):
+        return results
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # Last line cut short by a crash; the row is simply redone
+                continue
+            results[record["row_id"]] = record
+    return results
+
+
+class _CheckpointWriter:
+    def __init__(self, path):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._file = open(path, "a", encoding="utf-8")
+        self._lock = threading.Lock()
+
+    def write(self, record):
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def close(self):
+        self._file.close()
+
+
+class CohortAdvisor:
+    """Gọi LLM cho từng profile với rate limit, retry/backoff và cache lời khuyên."""
+
+    def __init__(self, chain_for, language="vi", model_name=LLM_MODEL, temperature=LLM_TEMPERATURE,
+                 rate=None, burst=None, max_retries=5, backoff_base=0.5, backoff_cap=30.0, use_cache=True):
+        self.chain_for = chain_for
+        self.language = language
+        self.model_name = model_name
+        self.temperature = temperature
+        self.bucket = TokenBucket(rate, burst)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.cache = get_llm_cache() if use_cache else None
+
+    def advise(self, report_text, prediction):
+        """Trả về (advice, attempts, cached). Ném lại lỗi cuối cùng nếu hết lượt retry."""
+        key = make_cache_key(report_text, prediction, self.language, self.model_name, self.temperature)
+        if self.cache is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached, 0, True
+
+        chain = self.chain_for(self.language)
+        inputs = prompt_input(report_text, prediction, self.language)
+        attempt = 0
+        while True:
+            self.bucket.acquire()
+            attempt += 1
+            try:
+                advice = chain.invoke(inputs).content
+                break
+            except Exception as e:
+                if attempt > self.max_retries or not is_retryable(e):
+                    raise
+                delay = _retry_after(e)
+                time.sleep(delay if delay is not None else
+                           backoff_delay(attempt - 1, self.backoff_base, self.backoff_cap))
+
+        if self.cache is not None:
+            self.cache.set(key, advice)
+        return advice, attempt, False
+
+
+def generate_cohort_advice(input_path, output_path, model="LR", language="vi", stats=None, advisor=None,
+                           max_in_flight=8, chunk_size=1_000, resume=True, limit=None, progress=True,
+                           report_format=REPORT_FORMAT):
+    """
+    Sinh lời khuyên cho mọi dòng của input_path, ghi (append) ra output_path dạng JSONL:
+    row_id, prediction, probability, status ("ok" | "error"), advice, attempts, cached, error.
+    `advisor`: CohortAdvisor; mặc định dùng AdvisorClient với GROQ_API_KEY.
+    `limit`: chỉ xử lý tối đa bấy nhiêu dòng mới (dùng khi thử nghiệm).
+    `report_format`: "compact" (mặc định) hoặc "full", xem compact_report.
+    Trả về dict thống kê.
+    """
+    if stats is None:
+        stats = PopulationStats.load_fresh() or PopulationStats.from_csv()
+    if advisor is None:
+        # Client created here is closed here, once the whole batch is done
+        with AdvisorClient(get_api_key(), base_url=os.getenv("GROQ_API_BASE"),
+                           max_concurrency=max_in_flight, max_retries=0) as client:
+            advisor = CohortAdvisor(client.chain, language=language,
+                                    model_name=client.model_name, temperature=client.temperature)
+            return generate_cohort_advice(input_path, output_path, model=model, language=language, stats=stats,
+                                          advisor=advisor, max_in_flight=max_in_flight, chunk_size=chunk_size,
+                                          resume=resume, limit=limit, progress=progress,
+                                          report_format=report_format)
+    if not resume and os.path.exists(output_path):
+        os.remove(output_path)
+    done = {row_id for row_id, record in load_results(output_path).items() if record.get("status") == "ok"}
+
+    writer = _CheckpointWriter(output_path)
+    estimator, preprocessor = get_estimator(model), get_preprocessor()
+    counts = {"ok": 0, "error": 0, "skipped": 0, "cached": 0, "attempts": 0}
+    start_time = time.perf_counter()
+    last_report = start_time
+
+    def process(row_id, row, label, proba):
+        record = {"row_id": row_id, "prediction": label, "probability": proba}
+        try:
+            report_text, _, comparison_data = analyze_user_vs_population(row, language=language,
+                                                                         stats=stats, chart=None)
+            prompt_report = llm_report_text(report_text, comparison_data, language, report_format)
+            advice, attempts, cached = advisor.advise(prompt_report, label)
+            record.update(status="ok", advice=advice, attempts=attempts, cached=cached, error=None)
+        except Exception as e:
+            record.update(status="error", advice=None, attempts=None, cached=False, error=f"{type(e).__name__}: {e}")
+        writer.write(record)
+        return record
+
+    def collect(futures):
+        nonlocal last_report
+        for future in futures:
+            record = future.result()
+            counts[record["status"]] += 1
+            counts["cached"] += bool(record["cached"])
+            counts["attempts"] += record["attempts"] or 0
+        now = time.perf_counter()
+        if progress and now - last_report >= 1.0:
+            last_report = now
+            print(f"\rok {counts['ok']:,} | error {counts['error']:,} | skipped {counts['skipped']:,} | "
+                  f"{now - start_time:7.1f}s", end="", file=sys.stderr, flush=True)
+
+    pending = deque()
+    submitted = 0
+    with ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix="cohort") as pool:
+        offset = 0
+        for chunk in iter_input_chunks(input_path, chunk_size):
+            row_ids = range(offset, offset + len(chunk))
+            offset += len(chunk)
+            todo = [i for i, row_id in enumerate(row_ids) if row_id not in done]
+            counts["skipped"] += len(chunk) - len(todo)
+            if limit is not None:
+                todo = todo[:max(0, limit - submitted)]
+            if not todo:
+                continue
+
+            chunk = chunk.iloc[todo]
+            labels, proba = predict_frame(estimator, preprocessor, chunk.drop(columns=["Depression"], errors="ignore"))
+            for i, row, label, p in zip(todo, chunk.to_dict(orient="records"), labels, proba):
+                pending.append(pool.submit(process, row_ids[i], row, str(label), float(p)))
+                submitted += 1
+                # Keep a bounded window of queued rows so memory does not grow with the input
+                while len(pending) >= max_in_flight * 4:
+                    finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        pending.remove(future)
+                    collect(finished)
+            if limit is not None and submitted >= limit:
+                break
+        collect(list(pending))
+    writer.close()
+
+    seconds = time.perf_counter() - start_time
+    if progress:
+        print(file=sys.stderr)
+    counts.update(seconds=seconds, rows_per_sec=(counts["ok"] + counts["error"]) / seconds if seconds > 0 else 0.0)
+    return counts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate LLM advice for a whole cohort of student profiles")
+    parser.add_argument("input", help="CSV hoặc JSONL (cột như data/clean_df.csv)")
+    parser.add_argument("output", help="File kết quả .jsonl (dùng làm checkpoint khi chạy lại)")
+    parser.add_argument("--model", default="LR", choices=["LR", "KNN", "RF"])
+    parser.add_argument("--language", default="vi", choices=["vi", "en"])
+    parser.add_argument("--max-in-flight", type=int, default=8, help="Số request LLM đồng thời tối đa")
+    parser.add_argument("--rate", type=float, default=None, help="Số request LLM mỗi giây (mặc định không giới hạn)")
+    parser.add_argument("--burst", type=float, default=None, help="Dung lượng token bucket")
+    parser.add_argument("--max-retries", type=int, default=5)
+    parser.add_argument("--base-url", default=os.getenv("GROQ_API_BASE"), help="Endpoint thay cho Groq")
+    parser.add_argument("--report-format", default=REPORT_FORMAT, choices=["compact", "full"])
+    parser.add_argument("--no-cache", action="store_true", help="Không dùng cache lời khuyên trên disk")
+    parser.add_argument("--restart", action="store_true", help="Bỏ checkpoint cũ và chạy lại từ đầu")
+    parser.add_argument("--limit", type=int, default=None)
+    parser.add_argument("--quiet", action="store_true")
+    args = parser.parse_args(argv)
+
+    api_key = os.getenv("GROQ_API_KEY") or get_api_key()
+    with AdvisorClient(api_key, base_url=args.base_url, max_concurrency=args.max_in_flight, max_retries=0) as client:
+        advisor = CohortAdvisor(client.chain, language=args.language, model_name=client.model_name,
+                                temperature=client.temperature, rate=args.rate, burst=args.burst,
+                                max_retries=args.max_retries, use_cache=not args.no_cache)
+        stats = generate_cohort_advice(args.input, args.output, model=args.model, language=args.language,
+                                       advisor=advisor, max_in_flight=args.max_in_flight, resume=not args.restart,
+                                       limit=args.limit, progress=not args.quiet, report_format=args.report_format)
+    print(f"ok {stats['ok']:,} | error {stats['error']:,} | skipped {stats['skipped']:,} | "
+          f"cached {stats['cached']:,} | LLM attempts {stats['attempts']:,} | {stats['seconds']:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Báo cáo rút gọn cho prompt LLM, dựng từ `comparison_data` của analyze_user_vs_population.
+
+Báo cáo đầy đủ (banner "=====", "-----", câu chữ lặp lại cho từng chỉ số) tốn nhiều
+token đầu vào mà không thêm thông tin. Bản rút gọn mỗi chỉ số một dòng, xếp các
+chỉ số bất thường (percentile xa trung vị, đặc điểm hiếm, yếu tố nguy cơ) lên đầu
+và cắt bớt các dòng ít quan trọng nhất để vừa `token_budget`.
+
+    Academic Pressure 5 | avg 3.14 | P77 HIGH
+    Degree=BCA | 5.1% | RARE
+
+Số token được ước lượng offline (estimate_tokens), xấp xỉ tokenizer BPE.
+"""
+import math
+import re
+
+REPORT_FORMAT = "compact"
+REPORT_TOKEN_BUDGET = 256
+
+HIGH_PERCENTILE = 75.0
+LOW_PERCENTILE = 25.0
+RARE_PERCENTAGE = 10.0
+# Answers that must never be cut from the prompt
+RISK_FEATURES = ("Suicidal Thoughts", "Family History of Mental Illness")
+
+TEXTS = {
+    "vi": {
+        "header": "BÁO CÁO NGƯỜI DÙNG VS CỘNG ĐỒNG (P = % sinh viên thấp hơn; % = tỉ lệ cùng đặc điểm)",
+        "avg": "tb",
+        "high": "CAO",
+        "low": "THẤP",
+        "rare": "HIẾM",
+        "omitted": "(+{n} chỉ số ít nổi bật hơn)",
+    },
+    "en": {
+        "header": "USER VS POPULATION REPORT (P = % of students below the user; % = share with same trait)",
+        "avg": "avg",
+        "high": "HIGH",
+        "low": "LOW",
+        "rare": "RARE",
+        "omitted": "(+{n} less notable metrics)",
+    },
+}
+
+_TOKEN_RE = re.compile(r"[A-Za-z]+|\d+|[^\W\d_A-Za-z]+|\n+|[^\w\s]")
+
+
+def estimate_tokens(text):
+    """
+    Ước lượng số token BPE (kiểu cl100k) mà không cần tokenizer: từ tiếng Anh ~4 ký tự/token,
+    số ~3 chữ số/token, chữ có dấu (tiếng Việt) ~2 byte UTF-8/token, mỗi dấu câu 1 token.
+    """
+    total = 0
+    for piece in _TOKEN_RE.findall(text):
+        if piece[0].isascii() and piece[0].isalpha():
+            total += math.ceil(len(piece) / 4)
+        elif piece[0].isdigit():
+            total += math.ceil(len(piece) / 3)
+        elif piece[0] == "\n":
+            total += 1
+        elif piece[0].isalpha():
+            total += math.ceil(len(piece.encode("utf-8")) / 2)
+        else:
+            total += 1
+    return total
+
+
+def _numeric_line(item, t):
+    percentile = item["percentile"]
+    line = f"{item['metric']} {item['user']:g} | {t['avg']} {item['avg']:.2f} | P{percentile:.0f}"
+    if percentile >= HIGH_PERCENTILE:
+        line += f" {t['high']}"
+    elif percentile <= LOW_PERCENTILE:
+        line += f" {t['low']}"
+    # Distance from the median; flagged metrics always outrank unflagged ones
+    priority = abs(percentile - 50) + (50 if percentile >= HIGH_PERCENTILE or percentile <= LOW_PERCENTILE else 0)
+    return priority, line
+
+
+def _categorical_line(item, t):
+    percentage = item["percentage"]
+    line = f"{item['feature']}={item['value']} | {percentage:.1f}%"
+    if item["feature"] in RISK_FEATURES and str(item["value"]) == "Yes":
+        return math.inf, line
+    if percentage < RARE_PERCENTAGE:
+        return 100 - percentage, line + f" | {t['rare']}"
+    return (100 - percentage) / 4, line
+
+
+def render_compact_report(comparison_data, language="vi", token_budget=REPORT_TOKEN_BUDGET):
+    """
+    Báo cáo rút gọn, các dòng xếp theo mức độ bất thường giảm dần. Nếu vượt `token_budget`
+    (ước lượng bằng estimate_tokens), bỏ các dòng cuối và ghi chú số dòng đã bỏ; các yếu tố
+    nguy cơ (RISK_FEATURES = "Yes") luôn được giữ. token_budget=None: không cắt.
+    """
+    t = TEXTS.get(language, TEXTS["en"])
+    lines = [_numeric_line(item, t) for item in comparison_data.get("numerical", [])]
+    lines += [_categorical_line(item, t) for item in comparison_data.get("categorical", [])]
+    # Stable sort keeps the analysis order among equal priorities
+    lines = [line for _, line in sorted(lines, key=lambda pair: -pair[0])]
+    n_required = sum(1 for item in comparison_data.get("categorical", [])
+                     if item["feature"] in RISK_FEATURES and str(item["value"]) == "Yes")
+
+    kept = list(lines)
+    if token_budget is not None:
+        while len(kept) > n_required:
+            omitted = len(lines) - len(kept)
+            candidate = [t["header"], *kept] + ([t["omitted"].format(n=omitted)] if omitted else [])
+            if estimate_tokens("\n".join(candidate)) <= token_budget:
+                break
+            kept.pop()
+
+    omitted = len(lines) - len(kept)
+    return "\n".join([t["header"], *kept] + ([t["omitted"].format(n=omitted)] if omitted else []))
+
+
+def llm_report_text(report_text, comparison_data, language="vi", report_format=REPORT_FORMAT,
+                    token_budget=REPORT_TOKEN_BUDGET):
+    """Phần báo cáo gửi cho LLM: "compact" (mặc định) hoặc "full" (report_text gốc)."""
+    if report_format == "full":
+        return report_text
+    if report_format == "compact":
+        return render_compact_report(comparison_data, language, token_budget)
+    raise ValueError(f"Unknown report format: {report_format}")
@@ -0,0 +1,227 @@
+"""
+Lưu dataset dạng cột (Parquet) bên cạnh file CSV.
+
+Cột chữ được dictionary-encode và đọc ra thành pandas Categorical (mỗi ô là một mã nhỏ
+thay vì một string); cột số được ép về kiểu nhỏ nhất không làm mất giá trị: số nguyên
+không có NaN -> int8/int16/..., số có NaN hoặc số thực -> float32 nếu float32 giữ nguyên
+mọi giá trị, nếu không thì giữ float64 (ví dụ CGPA).
+
+    python dataset_store.py convert data/clean_df.csv      # -> data/clean_df.parquet
+    python dataset_store.py convert "data/Student Depression Dataset.csv"
+    python dataset_store.py info data/clean_df.csv
+
+load_dataset("data/clean_df.csv") đọc data/clean_df.parquet nếu file này còn khớp với CSV
+(size/mtime, rồi sha256); nếu không có hoặc đã cũ thì đọc CSV và áp cùng quy tắc kiểu dữ
+liệu, nên nơi gọi luôn nhận cùng dtype. Convert đọc CSV theo chunk (một lượt để chọn
+kiểu, một lượt để ghi) nên file lớn không cần nằm trọn trong RAM.
+"""
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+
+from model_artifacts import _sha256
+
+STORE_FORMAT_VERSION = 1
+METADATA_KEY = b"dataset_store"
+CHUNK_SIZE = 500_000
+
+_INT_TYPES = (np.int8, np.int16, np.int32, np.int64)
+
+# (csv path, size, mtime_ns) -> sha256, so an unchanged file is hashed at most once
+_fresh = {}
+
+
+def columnar_path(csv_path):
+    return os.path.splitext(csv_path)[0] + ".parquet"
+
+
+# ---------------------------------------------------------
+# Chọn kiểu dữ liệu
+# ---------------------------------------------------------
+class _ColumnStats:
+    """Thống kê cộng dồn qua các chunk để chọn kiểu cho một cột."""
+
+    def __init__(self):
+        self.text = False
+        self.integral = True
+        self.has_nan = False
+        self.float32_exact = True
+        self.min = None
+        self.max = None
+
+    def update(self, series):
+        if series.dtype.kind not in "iufb":
+            self.text = True
+            return
+        values = series.to_numpy(dtype=np.float64, na_value=np.nan) if series.dtype.kind != "f" else series.to_numpy()
+        nan = np.isnan(values)
+        self.has_nan |= bool(nan.any())
+        finite = values[~nan]
+        if not len(finite):
+            return
+        if series.dtype.kind not in "iub":
+            self.integral &= bool(np.array_equal(finite, np.round(finite)))
+            self.float32_exact &= bool(np.array_equal(finite.astype(np.float32).astype(np.float64), finite))
+        lo, hi = series.min(), series.max()
+        self.min = lo if self.min is None else min(self.min, lo)
+        self.max = hi if self.max is None else max(self.max, hi)
+
+    def dtype(self):
+        if self.text:
+            return "category"
+        if self.min is None:
+            return "float32"
+        if self.integral and not self.has_nan:
+            for dtype in _INT_TYPES:
+                info = np.iinfo(dtype)
+                if info.min <= self.min and self.max <= info.max:
+                    return np.dtype(dtype).name
+        if self.float32_exact:
+            return "float32"
+        return "float64"
+
+
+def infer_dtypes(chunks):
+    """{cột: dtype} nhỏ nhất an toàn cho toàn bộ các chunk (DataFrame)."""
+    stats = {}
+    for chunk in chunks:
+        for col in chunk.columns:
+            stats.setdefault(col, _ColumnStats()).update(chunk[col])
+    return {col: s.dtype() for col, s in stats.items()}
+
+
+def apply_dtypes(df, dtypes):
+    """Ép df về `dtypes`; category luôn có thứ tự category đã sort (giống nhau dù đọc từ đâu)."""
+    for col, dtype in dtypes.items():
+        if col not in df.columns:
+            continue
+        if dtype == "category":
+            values = df[col] if df[col].dtype == "category" else df[col].astype("category")
+            categories = sorted(values.cat.categories)
+            if list(values.cat.categories) != categories:
+                values = values.cat.reorder_categories(categories)
+            df[col] = values
+        elif df[col].dtype != dtype:
+            df[col] = df[col].astype(dtype)
+    return df
+
+
+# ---------------------------------------------------------
+# Convert / load
+# ---------------------------------------------------------
+def source_info(csv_path):
+    st = os.stat(csv_path)
+    return {"path": csv_path, "size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha256": _sha256(csv_path)}
+
+
+def matches_source(csv_path, source):
+    """csv_path hiện tại có đúng nội dung đã ghi trong `source` (source_info) không."""
+    st = os.stat(csv_path)
+    if st.st_size != source["size"]:
+        return False
+    if st.st_mtime_ns == source["mtime_ns"]:
+        return True
+    # Same size, different mtime (e.g. a fresh checkout): compare contents, once per (size, mtime)
+    key = (os.path.abspath(csv_path), st.st_size, st.st_mtime_ns)
+    if key not in _fresh:
+        _fresh[key] = _sha256(csv_path)
+    return _fresh[key] == source["sha256"]
+
+
+def convert(csv_path, out_path=None, chunk_size=CHUNK_SIZE):
+    """Ghi CSV ra Parquet (từng row group một chunk); trả về metadata đã ghi."""
+    import pandas as pd
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    out_path = out_path or columnar_path(csv_path)
+    dtypes = infer_dtypes(pd.read_csv(csv_path, chunksize=chunk_size))
+    meta = {"format_version": STORE_FORMAT_VERSION, "created_at": time.time(), "dtypes": dtypes,
+            "source": source_info(csv_path)}
+
+    # Text columns are stored as plain strings; parquet dictionary-encodes them on disk and
+    # load_dataset reads them back as dictionary arrays (-> Categorical) without materializing strings
+    fields = []
+    for col, dtype in dtypes.items():
+        fields.append(pa.field(col, pa.string() if dtype == "category" else pa.from_numpy_dtype(np.dtype(dtype))))
+    schema = pa.schema(fields, metadata={METADATA_KEY: json.dumps(meta).encode()})
+
+    rows = 0
+    tmp_path = f"{out_path}.tmp-{os.getpid()}"
+    with pq.ParquetWriter(tmp_path, schema, compression="snappy") as writer:
+        for chunk in pd.read_csv(csv_path, chunksize=chunk_size):
+            numeric = {col: dtype for col, dtype in dtypes.items() if dtype != "category"}
+            chunk = chunk.astype(numeric)
+            arrays = [pa.array(chunk[col], type=field.type, from_pandas=True) for col, field in zip(dtypes, fields)]
+            writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+            rows += len(chunk)
+    os.replace(tmp_path, out_path)
+    return dict(meta, rows=rows)
+
+
+def read_metadata(path):
+    """Metadata của file Parquet do convert() ghi, hoặc None."""
+    import pyarrow.parquet as pq
+
+    metadata = pq.read_schema(path).metadata or {}
+    if METADATA_KEY not in metadata:
+        return None
+    return json.loads(metadata[METADATA_KEY])
+
+
+def is_fresh(csv_path, parquet_path=None):
+    """Parquet có tồn tại, đúng phiên bản định dạng và được convert từ đúng nội dung CSV hiện tại."""
+    parquet_path = parquet_path or columnar_path(csv_path)
+    if not os.path.exists(parquet_path):
+        return False
+    meta = read_metadata(parquet_path)
+    if meta is None or meta.get("format_version") != STORE_FORMAT_VERSION:
+        return False
+    if not os.path.exists(csv_path):
+        # Only the columnar copy was shipped
+        return True
+    return matches_source(csv_path, meta["source"])
+
+
+def load_dataset(csv_path, columns=None):
+    """DataFrame của csv_path, đọc từ bản Parquet nếu còn mới, nếu không thì từ CSV (cùng dtype)."""
+    import pandas as pd
+
+    parquet_path = columnar_path(csv_path)
+    if is_fresh(csv_path, parquet_path):
+        import pyarrow.parquet as pq
+
+        dtypes = read_metadata(parquet_path)["dtypes"]
+        columns = list(columns) if columns is not None else None
+        categorical = [col for col, dtype in dtypes.items()
+                       if dtype == "category" and (columns is None or col in columns)]
+        table = pq.read_table(parquet_path, columns=columns, read_dictionary=categorical)
+        return apply_dtypes(table.to_pandas(), dtypes)
+
+    df = pd.read_csv(csv_path, usecols=columns)
+    return apply_dtypes(df, infer_dtypes([df]))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Columnar (Parquet) copies of the CSV datasets")
+    parser.add_argument("command", choices=["convert", "info"])
+    parser.add_argument("csv", nargs="+")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    args = parser.parse_args()
+
+    for csv_path in args.csv:
+        parquet_path = columnar_path(csv_path)
+        if args.command == "convert":
+            start = time.perf_counter()
+            meta = convert(csv_path, chunk_size=args.chunk_size)
+            print(f"{csv_path} -> {parquet_path}: {meta['rows']:,} rows in {time.perf_counter() - start:.1f}s "
+                  f"({os.path.getsize(csv_path) / 2**20:.1f} MB -> {os.path.getsize(parquet_path) / 2**20:.1f} MB)")
+        else:
+            meta = read_metadata(parquet_path) if os.path.exists(parquet_path) else None
+            print(f"{csv_path}: {'fresh' if is_fresh(csv_path) else 'missing or stale'} columnar copy")
+            if meta:
+                for col, dtype in meta["dtypes"].items():
+                    print(f"  {col:<40} {dtype}")
@@ -0,0 +1,194 @@
+"""
+Server HTTP giả lập Groq (API chat completions kiểu OpenAI) để benchmark và
+chạy thử offline, không tốn tiền và không cần mạng.
+
+    python fake_llm_server.py --port 8765 --latency 0.2
+    # rồi trỏ client tới base_url="http://127.0.0.1:8765"
+
+Hỗ trợ cả response thường và stream (SSE), độ trễ cấu hình được (kèm một tỉ lệ
+request "đuôi chậm" và thời gian prefill tỉ lệ với độ dài prompt), tỉ lệ lỗi 500
+hoặc 429 giả lập, và đếm số request / số kết nối TCP mới (để thấy connection reuse).
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_REPLY = "Hi there! You are doing great. Get some sleep, eat well and talk to someone you trust. 🌟"
+
+
+class FakeLLMServer:
+    def __init__(self, host="127.0.0.1", port=0, latency=0.0, token_latency=0.0, reply=DEFAULT_REPLY,
+                 error_rate=0.0, rate_limit_rate=0.0, slow_rate=0.0, slow_latency=0.0,
+                 prompt_token_latency=0.0, seed=0):
+        self.latency = latency
+        self.prompt_token_latency = prompt_token_latency
+        self.slow_rate = slow_rate
+        self.slow_latency = slow_latency
+        self.token_latency = token_latency
+        self.reply = reply
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.requests = 0
+        self.connections = 0
+        self.prompt_chars = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def stats(self):
+        with self._lock:
+            return {"requests": self.requests, "connections": self.connections,
+                    "prompt_chars": self.prompt_chars, "max_in_flight": self.max_in_flight}
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def setup(self):
+                super().setup()
+                with server._lock:
+                    server.connections += 1
+
+            def log_message(self, *args):
+                pass
+
+            def _json(self, status, payload, headers=None):
+                body = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                request = json.loads(self.rfile.read(length) or b"{}")
+                prompt = "".join(str(m.get("content", "")) for m in request.get("messages", []))
+                with server._lock:
+                    server.requests += 1
+                    server.prompt_chars += len(prompt)
+                    server.in_flight += 1
+                    server.max_in_flight = max(server.max_in_flight, server.in_flight)
+                    roll = server._random.random()
+                    slow = server._random.random() < server.slow_rate
+                try:
+                    # Prefill cost grows with the prompt (~4 characters per token)
+                    time.sleep((server.slow_latency if slow else server.latency)
+                               + server.prompt_token_latency * len(prompt) / 4)
+                    if roll < server.rate_limit_rate:
+                        self._json(429, {"error": {"message": "rate limited", "type": "rate_limit"}},
+                                   {"retry-after": "0"})
+                        return
+                    if roll < server.rate_limit_rate + server.error_rate:
+                        self._json(500, {"error": {"message": "fake server error", "type": "server_error"}})
+                        return
+                    if request.get("stream"):
+                        self._stream(request)
+                    else:
+                        self._complete(request, prompt)
+                except ConnectionError:
+                    # Client hung up mid-response (cancelled hedge, timeout)
+                    self.close_connection = True
+                finally:
+                    with server._lock:
+                        server.in_flight -= 1
+
+            def _complete(self, request, prompt):
+                words = server.reply.split(" ")
+                time.sleep(server.token_latency * len(words))
+                self._json(200, {
+                    "id": "chatcmpl-fake",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": request.get("model", "fake"),
+                    "choices": [{"index": 0, "finish_reason": "stop",
+                                 "message": {"role": "assistant", "content": server.reply}}],
+                    "usage": {"prompt_tokens": len(prompt) // 4, "completion_tokens": len(words),
+                              "total_tokens": len(prompt) // 4 + len(words)},
+                })
+
+            def _stream(self, request):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+
+                def send(payload):
+                    data = f"data: {payload}\n\n".encode("utf-8")
+                    self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+                    self.wfile.flush()
+
+                words = server.reply.split(" ")
+                for i, word in enumerate(words):
+                    time.sleep(server.token_latency)
+                    send(json.dumps({
+                        "id": "chatcmpl-fake", "object": "chat.completion.chunk", "created": int(time.time()),
+                        "model": request.get("model", "fake"),
+                        "choices": [{"index": 0, "delta": {"content": word + (" " if i < len(words) - 1 else "")},
+                                     "finish_reason": None}],
+                    }))
+                send(json.dumps({
+                    "id": "chatcmpl-fake", "object": "chat.completion.chunk", "created": int(time.time()),
+                    "model": request.get("model", "fake"),
+                    "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+                }))
+                send("[DONE]")
+                self.wfile.write(b"0\r\n\r\n")
+                self.wfile.flush()
+
+        return Handler
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local stand-in for the Groq chat completions API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--token-latency", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    parser.add_argument("--slow-rate", type=float, default=0.0)
+    parser.add_argument("--slow-latency", type=float, default=0.0)
+    parser.add_argument("--prompt-token-latency", type=float, default=0.0)
+    args = parser.parse_args()
+
+    fake = FakeLLMServer(args.host, args.port, latency=args.latency, token_latency=args.token_latency,
+                         error_rate=args.error_rate, rate_limit_rate=args.rate_limit_rate,
+                         slow_rate=args.slow_rate, slow_latency=args.slow_latency,
+                         prompt_token_latency=args.prompt_token_latency)
+    print(f"Fake LLM server on {fake.base_url}")
+    try:
+        fake._httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,106 @@
+"""
+Lời khuyên dựng sẵn theo luật từ `comparison_data` của analyze_user_vs_population.
+
+Dùng khi LLM chậm, lỗi hoặc không có API key: chạy trong vài micro giây, không gọi
+mạng, nên người dùng luôn nhận được lời khuyên trong giới hạn thời gian.
+"""
+
+HIGH_PERCENTILE = 70.0
+
+TEXTS = {
+    "vi": {
+        "greeting": "Chào bạn! 🌟 Mình đã xem qua kết quả của bạn rồi nè.",
+        "strength": "Điểm sáng: **{metric}** của bạn cao hơn {percentile:.0f}% sinh viên khác, đáng khen lắm! 💪",
+        "no_strength": "Việc bạn dành thời gian nhìn lại bản thân như thế này đã là một bước rất đáng quý rồi. 😊",
+        "concerns": "Một vài điều mình muốn bạn để ý:",
+        "tips": "Vài việc nhỏ bạn có thể làm ngay:",
+        "safety": ("💙 Nếu bạn đang có những suy nghĩ nặng nề, đừng ôm một mình nhé: hãy nói chuyện với người "
+                   "thân, bạn bè hoặc phòng tư vấn tâm lý của trường. Tìm sự hỗ trợ chuyên nghiệp là điều rất "
+                   "bình thường và dũng cảm."),
+        "closing": "Bạn đang làm tốt hơn bạn nghĩ đó. Từng bước nhỏ một thôi, mình tin bạn! 🌈",
+        "concern": {
+            "Academic Pressure": "Áp lực học tập của bạn cao hơn {percentile:.0f}% sinh viên khác.",
+            "Financial Stress": "Căng thẳng tài chính của bạn cao hơn {percentile:.0f}% sinh viên khác.",
+            "Work/Study Hours": "Số giờ học/làm của bạn nhiều hơn {percentile:.0f}% sinh viên khác.",
+            "Sleep Duration": "Giấc ngủ của bạn đang hơi ít ({value}).",
+            "Dietary Habits": "Chế độ ăn uống của bạn chưa thật sự lành mạnh.",
+        },
+        "tip": {
+            "Academic Pressure": "Chia việc học thành các khối 25-30 phút, xen kẽ nghỉ ngắn, và chọn ra 1-2 việc quan trọng nhất mỗi ngày.",
+            "Financial Stress": "Thử ghi lại chi tiêu trong một tuần và hỏi phòng công tác sinh viên về học bổng/hỗ trợ tài chính.",
+            "Work/Study Hours": "Đặt giờ \"tắt máy\" cố định mỗi tối và giữ ít nhất một buổi trong tuần hoàn toàn để nghỉ.",
+            "Sleep Duration": "Cố gắng ngủ đủ 7-8 tiếng: đi ngủ cùng giờ mỗi ngày và cất điện thoại 30 phút trước khi ngủ.",
+            "Dietary Habits": "Chuẩn bị sẵn vài bữa đơn giản (meal prep) cho cả tuần, vừa rẻ vừa tốt cho sức khỏe.",
+            "default": "Dành 10 phút mỗi ngày để vận động nhẹ hoặc đi dạo, và trò chuyện với một người bạn tin tưởng.",
+        },
+    },
+    "en": {
+        "greeting": "Hi there! 🌟 I've had a look at your results.",
+        "strength": "Bright spot: your **{metric}** is higher than {percentile:.0f}% of students, that's great! 💪",
+        "no_strength": "Taking the time to check in with yourself like this is already a really valuable step. 😊",
+        "concerns": "A few things worth keeping an eye on:",
+        "tips": "Small things you can start today:",
+        "safety": ("💙 If you're carrying heavy thoughts, please don't carry them alone: talk to family, a friend, "
+                   "or your university counselling service. Seeking professional support is normal and brave."),
+        "closing": "You're doing better than you think. One small step at a time, I believe in you! 🌈",
+        "concern": {
+            "Academic Pressure": "Your academic pressure is higher than {percentile:.0f}% of students.",
+            "Financial Stress": "Your financial stress is higher than {percentile:.0f}% of students.",
+            "Work/Study Hours": "You work/study more hours than {percentile:.0f}% of students.",
+            "Sleep Duration": "You're sleeping a bit too little ({value}).",
+            "Dietary Habits": "Your diet could be a little healthier.",
+        },
+        "tip": {
+            "Academic Pressure": "Break study into 25-30 minute blocks with short breaks, and pick the 1-2 most important tasks each day.",
+            "Financial Stress": "Track your spending for one week and ask student services about scholarships or financial aid.",
+            "Work/Study Hours": "Set a fixed \"switch-off\" time each evening and keep at least one block a week completely free.",
+            "Sleep Duration": "Aim for 7-8 hours: go to bed at the same time every day and put the phone away 30 minutes before.",
+            "Dietary Habits": "Prep a few simple meals for the week, it's cheaper and better for you.",
+            "default": "Take 10 minutes a day for light exercise or a walk, and talk to a friend you trust.",
+        },
+    },
+}
+
+# Higher is better for these; the others are stress indicators
+STRENGTH_METRICS = ("CGPA", "Study Satisfaction")
+STRESS_METRICS = ("Academic Pressure", "Financial Stress", "Work/Study Hours")
+SHORT_SLEEP = ("Less than 5 hours", "5-6 hours")
+
+
+def rule_based_advice(comparison_data, prediction=None, language="vi", max_tips=3):
+    """Sinh lời khuyên (markdown) từ comparison_data; không gọi LLM."""
+    t = TEXTS.get(language, TEXTS["en"])
+    numerical = {item["metric"]: item for item in comparison_data.get("numerical", [])}
+    categorical = {item["feature"]: item["value"] for item in comparison_data.get("categorical", [])}
+
+    strengths = [numerical[m] for m in STRENGTH_METRICS if m in numerical and numerical[m]["percentile"] >= 50]
+    strength = max(strengths, key=lambda item: item["percentile"], default=None)
+
+    concerns = []
+    for metric in STRESS_METRICS:
+        item = numerical.get(metric)
+        if item is not None and item["percentile"] >= HIGH_PERCENTILE:
+            concerns.append((item["percentile"], metric, t["concern"][metric].format(percentile=item["percentile"])))
+    if categorical.get("Sleep Duration") in SHORT_SLEEP:
+        concerns.append((100.0, "Sleep Duration", t["concern"]["Sleep Duration"].format(value=categorical["Sleep Duration"])))
+    if categorical.get("Dietary Habits") == "Unhealthy":
+        concerns.append((90.0, "Dietary Habits", t["concern"]["Dietary Habits"]))
+    concerns.sort(key=lambda c: -c[0])
+
+    lines = [t["greeting"], ""]
+    lines.append(t["strength"].format(metric=strength["metric"], percentile=strength["percentile"])
+                 if strength else t["no_strength"])
+
+    if concerns:
+        lines += ["", t["concerns"]] + [f"- {text}" for _, _, text in concerns]
+
+    tips = [t["tip"][metric] for _, metric, _ in concerns[:max_tips]] or [t["tip"]["default"]]
+    lines += ["", t["tips"]] + [f"{i}. {tip}" for i, tip in enumerate(tips, 1)]
+
+    at_risk = str(prediction) == "Yes" or "Yes" in (categorical.get("Suicidal Thoughts"),
+                                                    categorical.get("Family History of Mental Illness"))
+    if at_risk:
+        lines += ["", t["safety"]]
+
+    lines += ["", t["closing"]]
+    return "\n".join(lines)
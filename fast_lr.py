@@ -0,0 +1,116 @@
+"""
+Đường dự đoán nhanh cho một dòng với model LR, không cần pandas/ColumnTransformer.
+
+Các tham số đã fit (median/most_frequent của imputer, mean_/scale_ của scaler,
+categories_ của OneHotEncoder, coef_/intercept_ của LogisticRegression) được đọc
+một lần, từ pickle sklearn hoặc từ artifact đã export (model_artifacts). Với cột categorical, trọng số của từng category được gộp sẵn vào một
+bảng tra cứu, nên mỗi request chỉ còn vài phép tra dict và phép nhân.
+"""
+import math
+
+from model_artifacts import ExportedPreprocessor
+from model_registry import get_model, get_preprocessor
+
+
+def _is_missing(value):
+    return value is None or (isinstance(value, float) and math.isnan(value))
+
+
+def _column_blocks(preprocessor):
+    """
+    Các khối cột theo thứ tự output: ("numeric", columns, medians, (mean, scale)) hoặc
+    ("onehot", columns, most_frequent, categories). Nhận ColumnTransformer của sklearn
+    hoặc ExportedPreprocessor (model_artifacts).
+    """
+    if isinstance(preprocessor, ExportedPreprocessor):
+        for i, block in enumerate(preprocessor.blocks):
+            if block["kind"] == "numeric":
+                arrays = preprocessor.arrays
+                yield ("numeric", block["columns"], arrays[f"block{i}.median"],
+                       (arrays[f"block{i}.mean"], arrays[f"block{i}.scale"]))
+            else:
+                yield "onehot", block["columns"], block["most_frequent"], block["categories"]
+        return
+
+    for name, pipeline, columns in preprocessor.transformers_:
+        if name == "remainder":
+            continue
+        steps = dict(pipeline.steps)
+        imputer = steps["imputer"]
+        if "scaler" in steps:
+            yield "numeric", columns, imputer.statistics_, (steps["scaler"].mean_, steps["scaler"].scale_)
+        elif "encoder" in steps:
+            encoder = steps["encoder"]
+            if encoder.drop is not None or encoder.handle_unknown != "ignore":
+                raise ValueError("Only OneHotEncoder(handle_unknown='ignore', drop=None) is supported")
+            yield "onehot", columns, imputer.statistics_, encoder.categories_
+        else:
+            raise ValueError(f"Unsupported transformer pipeline: {name}")
+
+
+class CompiledLogisticRegression:
+    def __init__(self, preprocessor, model):
+        self.preprocessor = preprocessor
+        self.model = model
+
+        if len(model.classes_) != 2:
+            raise ValueError("CompiledLogisticRegression only supports binary LogisticRegression")
+        coef = model.coef_[0]
+        self.intercept = float(model.intercept_[0])
+        self.classes = [c.item() for c in model.classes_]
+
+        self.numeric = []      # (column, median, mean, scale, weight)
+        self.categorical = []  # (column, most_frequent, {category: weight})
+
+        offset = 0
+        for kind, columns, fill, params in _column_blocks(preprocessor):
+            if kind == "numeric":
+                mean, scale = params
+                for i, col in enumerate(columns):
+                    self.numeric.append((col, float(fill[i]), float(mean[i]), float(scale[i]),
+                                         float(coef[offset + i])))
+                offset += len(columns)
+            else:
+                for i, col in enumerate(columns):
+                    cats = params[i]
+                    table = {cat: float(coef[offset + j]) for j, cat in enumerate(cats)}
+                    offset += len(cats)
+                    self.categorical.append((col, fill[i], table))
+
+    def decision_function(self, user_input: dict) -> float:
+        score = self.intercept
+        for col, median, mean, scale, weight in self.numeric:
+            value = user_input.get(col)
+            value = median if _is_missing(value) else float(value)
+            score += (value - mean) / scale * weight
+        for col, most_frequent, table in self.categorical:
+            value = user_input.get(col)
+            if _is_missing(value):
+                value = most_frequent
+            # Unknown categories encode to all zeros (handle_unknown="ignore")
+            score += table.get(value, 0.0)
+        return score
+
+    def predict_proba_one(self, user_input: dict) -> float:
+        """Xác suất của lớp 1 (Depression = Yes)."""
+        score = self.decision_function(user_input)
+        if score >= 0:
+            return 1.0 / (1.0 + math.exp(-score))
+        z = math.exp(score)
+        return z / (1.0 + z)
+
+    def predict_one(self, user_input: dict):
+        return self.classes[1] if self.decision_function(user_input) > 0 else self.classes[0]
+
+
+_compiled = None
+
+
+def get_compiled_lr():
+    """Trả về scorer đã compile, build lại khi registry load lại preprocessor hoặc LR.pkl."""
+    global _compiled
+    preprocessor = get_preprocessor()
+    model = get_model("LR")
+    if _compiled is None or _compiled.preprocessor is not preprocessor or _compiled.model is not model:
+        _compiled = CompiledLogisticRegression(preprocessor, model)
+    return _compiled
@@ -1,10 +1,110 @@
-from langchain_groq import ChatGroq
-from langchain_core.prompts import ChatPromptTemplate
+# langchain_groq, langchain_core, httpx and streamlit (~1s together) are imported on
+# first use, so batch jobs and the deadline/fallback path start without them
 from dotenv import load_dotenv
-import streamlit as st
 import os
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from fallback_advice import rule_based_advice
+from llm_cache import get_llm_cache, make_cache_key
+from tracing import add_span, bind, span
+
+LLM_MODEL = "llama-3.3-70b-versatile"
+LLM_TEMPERATURE = 0.7
+LLM_MAX_TOKENS = 1024
+LLM_TIMEOUT = 30.0
+LLM_CONNECT_TIMEOUT = 5.0
+LLM_MAX_CONCURRENCY = 8
+# Seconds the user waits for the first advice token before the rule-based fallback is shown
+ADVICE_BUDGET = 8.0
+# Hedge delay used until enough latencies have been observed to estimate the p95
+ADVICE_HEDGE_AFTER = 3.0
+
+PROMPTS = {
+    "vi": """
+    VAI TRÒ CỦA BẠN:
+    Bạn là "Người Bạn Đồng Hành Tâm Lý" tại một trường đại học. Bạn không phải là bác sĩ khô khan, mà là 
+    một người tư vấn tâm lý cực kỳ thân thiện, vui vẻ, tích cực và thấu hiểu nỗi lòng của Gen Z.
+
+    NHIỆM VỤ:
+    Dựa vào "BÁO CÁO PHÂN TÍCH NGƯỜI DÙNG VS CỘNG ĐỒNG" được cung cấp bên dưới, hãy phân tích tình trạng của sinh 
+    viên và đưa ra lời khuyên.
+
+    DỮ LIỆU ĐẦU VÀO:
+    {report_text}
+
+    HƯỚNG DẪN PHÂN TÍCH & TRẢ LỜI:
+    1.  **Giọng điệu (Tone & Voice):**
+        -   Vui vẻ, ấm áp, dùng ngôn ngữ tự nhiên, gần gũi (có thể dùng emoji 🌟, 💪, 😊).
+        -   Tuyệt đối không phán xét hay dọa nạt.
+        -   Xưng hô: "Mình" và "Bạn" (hoặc tên nếu có).
+
+    2.  **Cấu trúc câu trả lời:**
+        -   **Chào hỏi & "Wow" Moment:** Bắt đầu bằng một lời chào năng lượng. Tìm ngay điểm sáng trong báo cáo 
+        (ví dụ: CGPA cao, sự chăm chỉ) để khen ngợi thật lòng. Hãy cho họ thấy họ giỏi thế nào so với mặt bằng chung.
+        -   **Góc nhìn thấu cảm:** Nhìn vào các chỉ số báo động (Academic Pressure, Financial
+         Stress, Sleep Duration, Diet). So sánh nhẹ nhàng với cộng đồng để họ thấy: "À, mình đang ép bản thân quá
+          mức so với mọi người".
+        -   *Ví dụ:* "Mình thấy bạn đang chịu áp lực học tập cao hơn tới 77% các bạn khác, thảo nào mà điểm GPA cao
+        chót vót (top đầu luôn!). Nhưng mà đổi lại, giấc ngủ và ăn uống đang 'biểu tình' kìa!"
+        -   **Lời khuyên "Nhỏ mà Có võ" (Actionable Tips):** Đưa ra 2-3 lời khuyên cụ thể, dễ làm ngay lập tức.
+        -   Kết hợp giải quyết vấn đề (Ví dụ: Stress tài chính + Ăn uống unhealthy -> Gợi ý meal prep giá rẻ).
+        -   Nếu có "Family History of Mental Illness" hoặc "Suicidal Thoughts", hãy nhắc nhở nhẹ nhàng nhưng
+            kiên quyết về việc tìm kiếm sự hỗ trợ chuyên nghiệp hoặc chia sẻ với người thân, đừng ôm đồm một mình.
+        -   **Lời kết (Closing):** Một câu chốt động viên tinh thần cực kỳ tích cực.
+
+    LƯU Ý QUAN TRỌNG:
+    -   Dữ liệu cho thấy bạn ấy ngủ ít (5-6h) và ăn uống Unhealthy, lại có áp lực tài chính. Hãy khéo léo lồng
+    ghép việc "Yêu bản thân" vào lời khuyên.
+    -   Đừng chỉ liệt kê số liệu, hãy biến số liệu thành câu chuyện.
+    BẮT ĐẦU CÂU TRẢ LỜI NGAY DƯỚI ĐÂY:
+    """,
+    "en": """
+    YOUR ROLE:
+    You are a "Mental Health Companion" at a university. You are not a dry doctor, but a 
+    psychological counselor who is extremely friendly, cheerful, positive, and understands Gen Z.
+
+    TASK:
+    Based on the "USER VS POPULATION ANALYSIS REPORT" provided below, analyze the student's condition 
+    and provide advice.
+
+    INPUT DATA:
+    {report_text}
+
+    ANALYSIS & RESPONSE GUIDELINES:
+    1.  **Tone & Voice:**
+        -   Cheerful, warm, use natural, relatable language (emojis allowed 🌟, 💪, 😊).
+        -   Absolutely no judging or scaring.
+        -   Address as: "I" and "You".
+
+    2.  **Response Structure:**
+        -   **Greeting & "Wow" Moment:** Start with an energetic greeting. Find a bright spot in the report 
+        (e.g., high CGPA, hard work) to genuinely praise. Show them how good they are compared to the average.
+        -   **Empathetic Perspective:** Look at alarming indicators (Academic Pressure, Financial
+         Stress, Sleep Duration, Diet). Gently compare with the community so they see: "Ah, I'm pushing myself too
+          hard compared to everyone else".
+        -   *Example:* "I see you are under 77% more academic pressure than others, no wonder your GPA is sky high! 
+        But in return, your sleep and diet are 'protesting'!"
+        -   **Actionable Tips:** Give 2-3 specific, easy-to-do advice.
+        -   Combine problem-solving (e.g., Financial Stress + Unhealthy Diet -> Suggest cheap meal prep).
+        -   If there is "Family History of Mental Illness" or "Suicidal Thoughts", gently but firmly remind 
+        them to seek professional support or share with loved ones, don't carry it alone.
+        -   **Closing:** A super positive morale-boosting closing sentence.
+
+    IMPORTANT NOTES:
+    -   Don't just list numbers, turn numbers into a story.
+
+    START YOUR ANSWER BELOW:
+    """
+}
+
 
 def get_api_key():
+    import streamlit as st
+
     if "GROQ_API_KEY" in st.secrets:
         return st.secrets["GROQ_API_KEY"]
     elif os.getenv("GROQ_API_KEY"):
@@ -13,111 +113,382 @@ def get_api_key():
         st.error("API Key not found!")
         return None
 
-def chat_llm(report_text, prediction, language="vi"):
-    api_key = get_api_key()
-
-    if not api_key:
-        return "Error: GROQ_API_KEY not found in .env file." if language == "en" else "Lỗi: Không tìm thấy GROQ_API_KEY trong file .env. Vui lòng cấu hình."
-
-    prompts = {
-        "vi": """
-        VAI TRÒ CỦA BẠN:
-        Bạn là "Người Bạn Đồng Hành Tâm Lý" tại một trường đại học. Bạn không phải là bác sĩ khô khan, mà là 
-        một người tư vấn tâm lý cực kỳ thân thiện, vui vẻ, tích cực và thấu hiểu nỗi lòng của Gen Z.
-
-        NHIỆM VỤ:
-        Dựa vào "BÁO CÁO PHÂN TÍCH NGƯỜI DÙNG VS CỘNG ĐỒNG" được cung cấp bên dưới, hãy phân tích tình trạng của sinh 
-        viên và đưa ra lời khuyên.
-
-        DỮ LIỆU ĐẦU VÀO:
-        {report_text}
-
-        HƯỚNG DẪN PHÂN TÍCH & TRẢ LỜI:
-        1.  **Giọng điệu (Tone & Voice):**
-            -   Vui vẻ, ấm áp, dùng ngôn ngữ tự nhiên, gần gũi (có thể dùng emoji 🌟, 💪, 😊).
-            -   Tuyệt đối không phán xét hay dọa nạt.
-            -   Xưng hô: "Mình" và "Bạn" (hoặc tên nếu có).
-
-        2.  **Cấu trúc câu trả lời:**
-            -   **Chào hỏi & "Wow" Moment:** Bắt đầu bằng một lời chào năng lượng. Tìm ngay điểm sáng trong báo cáo 
-            (ví dụ: CGPA cao, sự chăm chỉ) để khen ngợi thật lòng. Hãy cho họ thấy họ giỏi thế nào so với mặt bằng chung.
-            -   **Góc nhìn thấu cảm:** Nhìn vào các chỉ số báo động (Academic Pressure, Financial
-             Stress, Sleep Duration, Diet). So sánh nhẹ nhàng với cộng đồng để họ thấy: "À, mình đang ép bản thân quá
-              mức so với mọi người".
-            -   *Ví dụ:* "Mình thấy bạn đang chịu áp lực học tập cao hơn tới 77% các bạn khác, thảo nào mà điểm GPA cao
-            chót vót (top đầu luôn!). Nhưng mà đổi lại, giấc ngủ và ăn uống đang 'biểu tình' kìa!"
-            -   **Lời khuyên "Nhỏ mà Có võ" (Actionable Tips):** Đưa ra 2-3 lời khuyên cụ thể, dễ làm ngay lập tức.
-            -   Kết hợp giải quyết vấn đề (Ví dụ: Stress tài chính + Ăn uống unhealthy -> Gợi ý meal prep giá rẻ).
-            -   Nếu có "Family History of Mental Illness" hoặc "Suicidal Thoughts", hãy nhắc nhở nhẹ nhàng nhưng
-                kiên quyết về việc tìm kiếm sự hỗ trợ chuyên nghiệp hoặc chia sẻ với người thân, đừng ôm đồm một mình.
-            -   **Lời kết (Closing):** Một câu chốt động viên tinh thần cực kỳ tích cực.
-
-        LƯU Ý QUAN TRỌNG:
-        -   Dữ liệu cho thấy bạn ấy ngủ ít (5-6h) và ăn uống Unhealthy, lại có áp lực tài chính. Hãy khéo léo lồng
-        ghép việc "Yêu bản thân" vào lời khuyên.
-        -   Đừng chỉ liệt kê số liệu, hãy biến số liệu thành câu chuyện.
-        BẮT ĐẦU CÂU TRẢ LỜI NGAY DƯỚI ĐÂY:
-        """,
-        "en": """
-        YOUR ROLE:
-        You are a "Mental Health Companion" at a university. You are not a dry doctor, but a 
-        psychological counselor who is extremely friendly, cheerful, positive, and understands Gen Z.
-
-        TASK:
-        Based on the "USER VS POPULATION ANALYSIS REPORT" provided below, analyze the student's condition 
-        and provide advice.
-
-        INPUT DATA:
-        {report_text}
-
-        ANALYSIS & RESPONSE GUIDELINES:
-        1.  **Tone & Voice:**
-            -   Cheerful, warm, use natural, relatable language (emojis allowed 🌟, 💪, 😊).
-            -   Absolutely no judging or scaring.
-            -   Address as: "I" and "You".
-
-        2.  **Response Structure:**
-            -   **Greeting & "Wow" Moment:** Start with an energetic greeting. Find a bright spot in the report 
-            (e.g., high CGPA, hard work) to genuinely praise. Show them how good they are compared to the average.
-            -   **Empathetic Perspective:** Look at alarming indicators (Academic Pressure, Financial
-             Stress, Sleep Duration, Diet). Gently compare with the community so they see: "Ah, I'm pushing myself too
-              hard compared to everyone else".
-            -   *Example:* "I see you are under 77% more academic pressure than others, no wonder your GPA is sky high! 
-            But in return, your sleep and diet are 'protesting'!"
-            -   **Actionable Tips:** Give 2-3 specific, easy-to-do advice.
-            -   Combine problem-solving (e.g., Financial Stress + Unhealthy Diet -> Suggest cheap meal prep).
-            -   If there is "Family History of Mental Illness" or "Suicidal Thoughts", gently but firmly remind 
-            them to seek professional support or share with loved ones, don't carry it alone.
-            -   **Closing:** A super positive morale-boosting closing sentence.
-
-        IMPORTANT NOTES:
-        -   Don't just list numbers, turn numbers into a story.
-
-        START YOUR ANSWER BELOW:
-        """
-    }
-
-    prompt_template = prompts.get(language, prompts["en"])
-
-    prompt = ChatPromptTemplate.from_template(template=prompt_template)
-
-    llm = ChatGroq(
-        api_key=api_key,
-        model="llama-3.3-70b-versatile",
-        temperature=0.7,
-        max_tokens=1024
-    )
-    chain = prompt | llm
-    try:
-        # Append prediction result to report text for context
-        pred_text = f"\n--- 3. KẾT QUẢ DỰ ĐOÁN TRẦM CẢM: {prediction} ---" if language == "vi" else f"\n--- 3. DEPRESSION PREDICTION RESULT: {prediction} ---"
-        report_text = report_text + pred_text
 
-        response = chain.invoke({"report_text": report_text})
+class _LimitedChain:
+    """prompt | llm, với số lời gọi đồng thời bị giới hạn bởi semaphore của AdvisorClient."""
+
+    def __init__(self, chain, semaphore):
+        self.chain = chain
+        self.semaphore = semaphore
+
+    def invoke(self, inputs):
+        with self.semaphore:
+            return self.chain.invoke(inputs)
+
+    def stream(self, inputs):
+        with self.semaphore:
+            yield from self.chain.stream(inputs)
+
+
+class AdvisorClient:
+    """
+    Client LLM dùng lâu dài: prompt template của từng ngôn ngữ được compile một lần,
+    một ChatGroq dùng chung một httpx.Client (giữ kết nối keep-alive giữa các request),
+    cùng timeout và giới hạn số request đồng thời.
+    """
+
+    def __init__(self, api_key, model=LLM_MODEL, temperature=LLM_TEMPERATURE, max_tokens=LLM_MAX_TOKENS,
+                 base_url=None, timeout=LLM_TIMEOUT, connect_timeout=LLM_CONNECT_TIMEOUT,
+                 max_concurrency=LLM_MAX_CONCURRENCY, max_retries=2, llm=None):
+        import httpx
+        from langchain_core.prompts import ChatPromptTemplate
+        from langchain_groq import ChatGroq
+
+        self.model_name = model
+        self.temperature = temperature
+        self.http_client = httpx.Client(
+            timeout=httpx.Timeout(timeout, connect=connect_timeout),
+            limits=httpx.Limits(max_connections=max_concurrency, max_keepalive_connections=max_concurrency),
+        )
+        self.llm = llm or ChatGroq(
+            api_key=api_key,
+            model=model,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            groq_api_base=base_url,
+            request_timeout=timeout,
+            max_retries=max_retries,
+            http_client=self.http_client
+        )
+        self._semaphore = threading.BoundedSemaphore(max_concurrency)
+        self._chains = {
+            language: _LimitedChain(ChatPromptTemplate.from_template(template=template) | self.llm, self._semaphore)
+            for language, template in PROMPTS.items()
+        }
+
+    def chain(self, language):
+        return self._chains.get(language, self._chains["en"])
+
+    def close(self):
+        self.http_client.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+_advisor = None
+_advisor_lock = threading.Lock()
+
+
+def get_advisor():
+    """AdvisorClient dùng chung trong process; None nếu không có API key."""
+    global _advisor
+    with _advisor_lock:
+        if _advisor is None:
+            api_key = get_api_key()
+            if not api_key:
+                return None
+            _advisor = AdvisorClient(api_key, base_url=os.getenv("GROQ_API_BASE"))
+    return _advisor
+
+
+def _missing_key_message(language):
+    return "Error: GROQ_API_KEY not found in .env file." if language == "en" else "Lỗi: Không tìm thấy GROQ_API_KEY trong file .env. Vui lòng cấu hình."
+
+
+def _error_message(e, language):
+    return f"Xin lỗi, hệ thống đang bận. Lỗi chi tiết: {str(e)}" if language == "vi" else f"Sorry, system is busy. Error details: {str(e)}"
+
+
+def _cache_key(report_text, prediction, language, llm):
+    model_name = getattr(llm, "model_name", LLM_MODEL) if llm is not None else LLM_MODEL
+    temperature = getattr(llm, "temperature", LLM_TEMPERATURE) if llm is not None else LLM_TEMPERATURE
+    return make_cache_key(report_text, prediction, language, model_name, temperature)
+
+
+def _build_chain(language, llm=None):
+    """Trả về chain prompt | llm, hoặc None nếu không có API key."""
+    if llm is not None:
+        from langchain_core.prompts import ChatPromptTemplate
+
+        # Explicit (e.g. stub) model: build a throwaway chain around it
+        return ChatPromptTemplate.from_template(template=PROMPTS.get(language, PROMPTS["en"])) | llm
+
+    advisor = get_advisor()
+    return advisor.chain(language) if advisor is not None else None
+
+
+def prompt_input(report_text, prediction, language):
+    """Biến đầu vào của prompt (report kèm kết quả dự đoán), cho chain của AdvisorClient."""
+    # Append prediction result to report text for context
+    pred_text = f"\n--- 3. KẾT QUẢ DỰ ĐOÁN TRẦM CẢM: {prediction} ---" if language == "vi" else f"\n--- 3. DEPRESSION PREDICTION RESULT: {prediction} ---"
+    return {"report_text": report_text + pred_text}
+
+
+def chat_llm(report_text, prediction, language="vi", llm=None, use_cache=True):
+    """
+    Sinh lời khuyên từ báo cáo phân tích và kết quả dự đoán.
+    `llm`: chat model thay thế cho ChatGroq (ví dụ model giả lập khi test offline).
+    `use_cache=False` bỏ qua cache lời khuyên trên disk.
+    """
+    with span("llm.chat", cached=False) as current:
+        cache = get_llm_cache() if use_cache else None
+        cache_key = _cache_key(report_text, prediction, language, llm)
+        if cache is not None:
+            cached = cache.get(cache_key)
+            if cached is not None:
+                current.set(cached=True)
+                return cached
+
+        chain = _build_chain(language, llm)
+        if chain is None:
+            return _missing_key_message(language)
+
+        try:
+            response = chain.invoke(prompt_input(report_text, prediction, language))
+        except Exception as e:
+            current.set(error=type(e).__name__)
+            return _error_message(e, language)
+
+        # Only successful completions are cached, never error messages
+        if cache is not None:
+            cache.set(cache_key, response.content)
         return response.content
+
+
+def _stream_span(start, metrics):
+    add_span("llm.stream", start, start + metrics["total_time"], cached=metrics["cached"],
+             completed=metrics["completed"], chunks=metrics["chunks"],
+             time_to_first_token=metrics["time_to_first_token"])
+
+
+def stream_chat_llm(report_text, prediction, language="vi", llm=None, use_cache=True, metrics=None,
+                    raise_errors=False):
+    """
+    Giống chat_llm nhưng yield từng đoạn text ngay khi LLM trả về.
+    `metrics` (dict, tùy chọn) được điền: time_to_first_token, total_time, chunks,
+    cached, completed. Nếu stream bị ngắt giữa chừng, một thông báo lỗi được yield
+    sau phần text đã nhận và kết quả không được lưu vào cache.
+    `raise_errors=True` ném lỗi ra thay vì yield thông báo lỗi (để caller tự fallback).
+    """
+    metrics = metrics if metrics is not None else {}
+    metrics.update({"time_to_first_token": None, "total_time": None, "chunks": 0,
+                    "cached": False, "completed": False})
+    start = time.perf_counter()
+
+    cache = get_llm_cache() if use_cache else None
+    cache_key = _cache_key(report_text, prediction, language, llm)
+    if cache is not None:
+        cached = cache.get(cache_key)
+        if cached is not None:
+            metrics.update({"time_to_first_token": time.perf_counter() - start, "chunks": 1,
+                            "cached": True, "completed": True})
+            yield cached
+            metrics["total_time"] = time.perf_counter() - start
+            _stream_span(start, metrics)
+            return
+
+    chain = _build_chain(language, llm)
+    if chain is None:
+        metrics["total_time"] = time.perf_counter() - start
+        _stream_span(start, metrics)
+        if raise_errors:
+            raise RuntimeError(_missing_key_message(language))
+        yield _missing_key_message(language)
+        return
+
+    parts = []
+    try:
+        for chunk in chain.stream(prompt_input(report_text, prediction, language)):
+            text = chunk.content if hasattr(chunk, "content") else str(chunk)
+            if not text:
+                continue
+            if metrics["time_to_first_token"] is None:
+                metrics["time_to_first_token"] = time.perf_counter() - start
+            metrics["chunks"] += 1
+            parts.append(text)
+            yield text
+        metrics["completed"] = True
     except Exception as e:
-        err_msg = f"Xin lỗi, hệ thống đang bận. Lỗi chi tiết: {str(e)}" if language == "vi" else f"Sorry, system is busy. Error details: {str(e)}"
-        return err_msg
+        if raise_errors:
+            raise
+        # Keep whatever was already shown and explain why it stopped
+        yield ("\n\n" if parts else "") + _error_message(e, language)
+    finally:
+        metrics["total_time"] = time.perf_counter() - start
+        _stream_span(start, metrics)
+
+    if metrics["completed"] and cache is not None and parts:
+        cache.set(cache_key, "".join(parts))
+
+
+# ---------------------------------------------------------
+# Lời khuyên có deadline: timeout, hedged request, fallback theo luật
+# ---------------------------------------------------------
+_advice_stats = {"requests": 0, "llm": 0, "cache": 0, "hedges": 0, "hedge_wins": 0,
+                 "timeouts": 0, "errors": 0, "fallbacks": 0}
+_advice_lock = threading.Lock()
+_first_token_latencies = deque(maxlen=500)
+_advice_executor = ThreadPoolExecutor(max_workers=2 * LLM_MAX_CONCURRENCY, thread_name_prefix="advice")
+
+
+def _count(key, n=1):
+    with _advice_lock:
+        _advice_stats[key] += n
+
+
+def advice_stats():
+    """Bộ đếm của stream_advice_with_deadline (requests, timeouts, fallbacks, hedge_wins, ...)."""
+    with _advice_lock:
+        stats = dict(_advice_stats)
+        latencies = sorted(_first_token_latencies)
+    stats["first_token_p50"] = latencies[len(latencies) // 2] if latencies else None
+    stats["first_token_p95"] = latencies[int(len(latencies) * 0.95)] if latencies else None
+    return stats
+
+
+def hedge_threshold(min_samples=20):
+    """p95 của time-to-first-token đã quan sát; ADVICE_HEDGE_AFTER khi chưa đủ mẫu."""
+    with _advice_lock:
+        if len(_first_token_latencies) < min_samples:
+            return ADVICE_HEDGE_AFTER
+        latencies = sorted(_first_token_latencies)
+    return latencies[int(len(latencies) * 0.95)]
+
+
+def stream_advice_with_deadline(report_text, prediction, comparison_data, language="vi", budget=ADVICE_BUDGET,
+                                hedge_after="auto", llm=None, use_cache=True, metrics=None, stall_timeout=None):
+    """
+    Như stream_chat_llm, nhưng người dùng luôn có lời khuyên trong `budget` giây:
+    nếu LLM chưa trả token đầu tiên kịp, lỗi, hoặc không có API key thì yield lời
+    khuyên theo luật (fallback_advice) dựng từ comparison_data.
+    Sau token đầu tiên, nếu stream đứng quá `stall_timeout` giây (mặc định `budget`) giữa
+    hai đoạn, request bị bỏ và lời khuyên theo luật được nối vào sau phần đã hiển thị.
+    `hedge_after`: sau bấy nhiêu giây chưa có token thì gửi thêm một request thứ hai,
+    request nào có token trước thì thắng; "auto" = p95 đã quan sát, None = tắt.
+    Request bị bỏ vì quá hạn vẫn chạy nốt để kết quả được lưu vào cache.
+    `metrics` được điền: source ("llm" | "cache" | "hedge" | "fallback"), hedged,
+    timed_out, error, time_to_first_token, total_time.
+    """
+    metrics = metrics if metrics is not None else {}
+    metrics.update({"source": None, "hedged": False, "timed_out": False, "error": None,
+                    "time_to_first_token": None, "total_time": None})
+    if hedge_after == "auto":
+        hedge_after = hedge_threshold()
+    stall_timeout = budget if stall_timeout is None else stall_timeout
+    _count("requests")
+    start = time.perf_counter()
+    events = queue.Queue()
+    cancelled = []
+
+    def attempt(idx, cancel):
+        attempt_metrics = {}
+        try:
+            for chunk in stream_chat_llm(report_text, prediction, language=language, llm=llm, use_cache=use_cache,
+                                         metrics=attempt_metrics, raise_errors=True):
+                if cancel.is_set():
+                    return
+                events.put((idx, "chunk", chunk, attempt_metrics))
+            events.put((idx, "done", None, attempt_metrics))
+        except Exception as e:
+            events.put((idx, "error", e, attempt_metrics))
+
+    def launch():
+        cancel = threading.Event()
+        cancelled.append(cancel)
+        _advice_executor.submit(bind(attempt), len(cancelled) - 1, cancel)
+
+    def fallback(reason):
+        metrics["source"] = "fallback"
+        _count(reason)
+        _count("fallbacks")
+        return rule_based_advice(comparison_data, prediction, language)
+
+    launch()
+    winner = None
+    failed = 0
+    last_chunk = None
+    try:
+        while True:
+            now = time.perf_counter()
+            if winner is None:
+                deadlines = [start + budget]
+                if hedge_after is not None and len(cancelled) == 1:
+                    deadlines.append(start + hedge_after)
+                timeout = max(0.0, min(deadlines) - now)
+            else:
+                # A stream that stalls mid-response must not hold the user forever either
+                timeout = max(0.0, last_chunk + stall_timeout - now)
+            try:
+                idx, kind, payload, attempt_metrics = events.get(timeout=timeout)
+            except queue.Empty:
+                if winner is not None:
+                    metrics["timed_out"] = True
+                    for cancel in cancelled:
+                        cancel.set()
+                    yield "\n\n" + fallback("timeouts")
+                    return
+                if hedge_after is not None and len(cancelled) == 1 and now - start < budget:
+                    metrics["hedged"] = True
+                    _count("hedges")
+                    launch()
+                    continue
+                metrics["timed_out"] = True
+                yield fallback("timeouts")
+                return
+
+            if winner is not None and idx != winner:
+                continue
+            if kind == "chunk":
+                last_chunk = time.perf_counter()
+                if winner is None:
+                    winner = idx
+                    metrics["time_to_first_token"] = time.perf_counter() - start
+                    # The loser only holds a connection from now on
+                    for i, cancel in enumerate(cancelled):
+                        if i != idx:
+                            cancel.set()
+                    if attempt_metrics.get("cached"):
+                        metrics["source"] = "cache"
+                        _count("cache")
+                    else:
+                        metrics["source"] = "hedge" if idx > 0 else "llm"
+                        _count("hedge_wins" if idx > 0 else "llm")
+                        with _advice_lock:
+                            _first_token_latencies.append(attempt_metrics["time_to_first_token"])
+                yield payload
+            elif kind == "done" and winner is not None:
+                return
+            else:
+                # An error, or a completion that produced no text at all
+                metrics["error"] = f"{type(payload).__name__}: {payload}" if kind == "error" else "empty response"
+                if winner is not None:
+                    # Stream broke after text was shown: finish with the rule-based tips
+                    yield "\n\n" + fallback("errors")
+                    return
+                failed += 1
+                if failed == len(cancelled):
+                    yield fallback("errors")
+                    return
+    finally:
+        metrics["total_time"] = time.perf_counter() - start
+        add_span("llm.advice", start, start + metrics["total_time"], source=metrics["source"],
+                 hedged=metrics["hedged"], timed_out=metrics["timed_out"], error=metrics["error"])
+        if winner is not None:
+            # Consumer stopped reading (or the stream ended): release the winner too
+            for cancel in cancelled:
+                cancel.set()
+
+
+def advice_with_deadline(report_text, prediction, comparison_data, language="vi", budget=ADVICE_BUDGET,
+                         hedge_after="auto", llm=None, use_cache=True, metrics=None, stall_timeout=None):
+    """Bản không stream của stream_advice_with_deadline; trả về toàn bộ lời khuyên."""
+    return "".join(stream_advice_with_deadline(report_text, prediction, comparison_data, language=language,
+                                               budget=budget, hedge_after=hedge_after, llm=llm,
+                                               use_cache=use_cache, metrics=metrics, stall_timeout=stall_timeout))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,255 @@
+"""
+Chỉ mục (IVF) cho KNN: thay cho việc quét toàn bộ ma trận train trong KNN.pkl.
+
+Vector train (đã qua preprocessor) được chia thành n_lists cụm bằng k-means và
+lưu theo thứ tự cụm dưới dạng float32 .npy để load bằng mmap. Khi query, chỉ
+n_probe cụm gần nhất được quét; n_probe = n_lists cho kết quả chính xác,
+n_probe nhỏ hơn đánh đổi recall lấy latency. n_probe trong meta.json chỉ được dùng
+khi serving bật tìm kiếm gần đúng (make_inference.KNN_SEARCH="approximate").
+
+    python knn_index.py build            # build từ models/KNN.pkl vào models/knn_index
+
+meta.json ghi lại sha256/size/mtime của KNN.pkl mà index được build từ đó; get_knn_index bỏ
+qua index không khớp với KNN.pkl hiện tại (train.py cũng build lại index khi train KNN).
+"""
+import copy
+import json
+import math
+import os
+
+import numpy as np
+
+# 2: meta.json records the KNN.pkl the index was built from
+INDEX_FORMAT_VERSION = 2
+
+
+def _as_float32(X):
+    if hasattr(X, "toarray"):
+        X = X.toarray()
+    return np.ascontiguousarray(X, dtype=np.float32)
+
+
+def build_index(X, y, out_dir, n_neighbors=5, n_lists=None, n_probe=None,
+                sample_size=None, chunk_size=65_536, random_state=0, source=None):
+    """
+    Build và ghi index vào out_dir. X có thể là ma trận dense, sparse hoặc np.memmap
+    (được đọc theo chunk nên không cần nằm trọn trong RAM). source: source_info của
+    file model mà X, y lấy từ đó (xem get_knn_index).
+    """
+    from sklearn.cluster import MiniBatchKMeans
+
+    n_samples, n_features = X.shape
+    if n_lists is None:
+        n_lists = min(4096, max(1, int(4 * math.sqrt(n_samples))))
+    n_lists = min(n_lists, n_samples)
+    if n_probe is None:
+        n_probe = max(1, n_lists // 8)
+
+    classes, y_encoded = np.unique(np.asarray(y), return_inverse=True)
+
+    rng = np.random.default_rng(random_state)
+    sample_size = min(n_samples, sample_size or max(64 * n_lists, 10_000))
+    sample_idx = np.sort(rng.choice(n_samples, size=sample_size, replace=False))
+    kmeans = MiniBatchKMeans(n_clusters=n_lists, n_init=1, random_state=random_state,
+                             batch_size=min(sample_size, 8192))
+    kmeans.fit(_as_float32(X[sample_idx]))
+    centroids = kmeans.cluster_centers_.astype(np.float32)
+
+    # Pass 1: assign every row to its list
+    assignment = np.empty(n_samples, dtype=np.int32)
+    for start in range(0, n_samples, chunk_size):
+        assignment[start:start + chunk_size] = kmeans.predict(_as_float32(X[start:start + chunk_size]))
+
+    order = np.argsort(assignment, kind="stable")
+    counts = np.bincount(assignment, minlength=n_lists)
+    offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+
+    # Pass 2: write vectors grouped by list
+    os.makedirs(out_dir, exist_ok=True)
+    vectors = np.lib.format.open_memmap(os.path.join(out_dir, "vectors.npy"), mode="w+",
+                                        dtype=np.float32, shape=(n_samples, n_features))
+    for start in range(0, n_samples, chunk_size):
+        rows = order[start:start + chunk_size]
+        block = _as_float32(X[np.sort(rows)])
+        # X[np.sort(rows)] keeps reads sequential; put them back in list order
+        vectors[start:start + len(rows)] = block[np.argsort(np.argsort(rows))]
+    vectors.flush()
+    norms = np.einsum("ij,ij->i", vectors, vectors)
+    del vectors
+
+    np.save(os.path.join(out_dir, "norms.npy"), norms.astype(np.float32))
+    np.save(os.path.join(out_dir, "labels.npy"), y_encoded[order].astype(np.int8 if len(classes) < 128 else np.int32))
+    np.save(os.path.join(out_dir, "centroids.npy"), centroids)
+    np.save(os.path.join(out_dir, "offsets.npy"), offsets)
+    np.save(os.path.join(out_dir, "classes.npy"), classes)
+    with open(os.path.join(out_dir, "meta.json"), "w") as f:
+        json.dump({
+            "format_version": INDEX_FORMAT_VERSION,
+            "n_samples": int(n_samples),
+            "n_features": int(n_features),
+            "n_lists": int(n_lists),
+            "n_probe": int(n_probe),
+            "n_neighbors": int(n_neighbors),
+            "source": source,
+        }, f, indent=2)
+    return KNNIndex.load(out_dir)
+
+
+class KNNIndex:
+    """Giao diện giống KNeighborsClassifier (classes_, predict_proba, predict) để dùng chung với predict_frame."""
+
+    def __init__(self, vectors, norms, labels, centroids, offsets, classes, meta):
+        self.vectors = vectors
+        self.norms = norms
+        self.labels = labels
+        self.centroids = centroids
+        self.offsets = offsets
+        self.classes_ = classes
+        self.meta = meta
+        self.n_neighbors = meta["n_neighbors"]
+        self.n_probe = meta["n_probe"]
+
+    @classmethod
+    def load(cls, index_dir, mmap=True):
+        with open(os.path.join(index_dir, "meta.json")) as f:
+            meta = json.load(f)
+        if meta["format_version"] != INDEX_FORMAT_VERSION:
+            raise ValueError(f"Unsupported KNN index format version: {meta['format_version']}")
+        mode = "r" if mmap else None
+
+        def load(name):
+            return np.load(os.path.join(index_dir, name), mmap_mode=mode, allow_pickle=False)
+
+        return cls(load("vectors.npy"), load("norms.npy"), load("labels.npy"),
+                   np.load(os.path.join(index_dir, "centroids.npy")),
+                   np.load(os.path.join(index_dir, "offsets.npy")),
+                   np.load(os.path.join(index_dir, "classes.npy"), allow_pickle=False),
+                   meta)
+
+    def exact(self):
+        """Cùng index (dùng chung mảng), nhưng quét mọi cụm: kết quả giống KNeighborsClassifier."""
+        view = copy.copy(self)
+        view.n_probe = len(self.centroids)
+        return view
+
+    def kneighbors(self, X, n_neighbors=None, n_probe=None, query_batch=1024, block_size=16_384):
+        """Trả về (khoảng cách bình phương, vị trí trong index) của k láng giềng gần nhất, đã sắp xếp."""
+        k = n_neighbors or self.n_neighbors
+        n_lists = len(self.centroids)
+        n_probe = min(n_probe or self.n_probe, n_lists)
+        Q = _as_float32(X)
+
+        all_d = np.empty((len(Q), k), dtype=np.float32)
+        all_i = np.empty((len(Q), k), dtype=np.int64)
+        c_norms = np.einsum("ij,ij->i", self.centroids, self.centroids)
+
+        for q0 in range(0, len(Q), query_batch):
+            q = Q[q0:q0 + query_batch]
+            q_norms = np.einsum("ij,ij->i", q, q)
+            best_d = np.full((len(q), k), np.inf, dtype=np.float32)
+            best_i = np.full((len(q), k), -1, dtype=np.int64)
+
+            if n_probe < n_lists:
+                cd = q_norms[:, None] - 2 * q @ self.centroids.T + c_norms[None, :]
+                probes = np.argpartition(cd, n_probe - 1, axis=1)[:, :n_probe]
+            else:
+                probes = np.broadcast_to(np.arange(n_lists), (len(q), n_lists))
+
+            # Invert (query -> lists) into (list -> queries) so each list is scanned once per batch
+            flat_lists = probes.ravel()
+            flat_queries = np.repeat(np.arange(len(q)), probes.shape[1])
+            order = np.argsort(flat_lists, kind="stable")
+            flat_lists, flat_queries = flat_lists[order], flat_queries[order]
+            bounds = np.flatnonzero(np.diff(flat_lists)) + 1
+
+            for lst, qi in zip(flat_lists[np.r_[0, bounds]], np.split(flat_queries, bounds)):
+                start, end = self.offsets[lst], self.offsets[lst + 1]
+                for b0 in range(start, end, block_size):
+                    b1 = min(end, b0 + block_size)
+                    d = q_norms[qi, None] - 2 * q[qi] @ self.vectors[b0:b1].T + self.norms[b0:b1][None, :]
+                    cand_d = np.concatenate([best_d[qi], d], axis=1)
+                    cand_i = np.concatenate([best_i[qi], np.broadcast_to(np.arange(b0, b1), d.shape)], axis=1)
+                    sel = np.argpartition(cand_d, k - 1, axis=1)[:, :k]
+                    best_d[qi] = np.take_along_axis(cand_d, sel, axis=1)
+                    best_i[qi] = np.take_along_axis(cand_i, sel, axis=1)
+
+            # The expanded |q|^2 - 2qx + |x|^2 form loses precision near 0 in float32;
+            # recompute the k survivors from the differences before sorting
+            found = best_i >= 0
+            diff = self.vectors[np.where(found, best_i, 0).ravel()].reshape(len(q), k, -1) - q[:, None, :]
+            best_d = np.where(found, np.einsum("qkd,qkd->qk", diff, diff), np.inf)
+            ordering = np.argsort(best_d, axis=1, kind="stable")
+            all_d[q0:q0 + len(q)] = np.take_along_axis(best_d, ordering, axis=1)
+            all_i[q0:q0 + len(q)] = np.take_along_axis(best_i, ordering, axis=1)
+        return all_d, all_i
+
+    def predict_proba(self, X, n_probe=None):
+        _, idx = self.kneighbors(X, n_probe=n_probe)
+        votes = self.labels[np.where(idx < 0, 0, idx)]
+        proba = np.zeros((len(idx), len(self.classes_)))
+        for c in range(len(self.classes_)):
+            proba[:, c] = ((votes == c) & (idx >= 0)).sum(axis=1)
+        return proba / np.maximum(proba.sum(axis=1, keepdims=True), 1)
+
+    def predict(self, X, n_probe=None):
+        return self.classes_[self.predict_proba(X, n_probe=n_probe).argmax(axis=1)]
+
+
+_cache = {}
+
+
+def get_knn_index(index_dir, model_path=None, exact=False):
+    """
+    Index đã load (mmap), cache theo mtime của meta.json; None nếu chưa build, khác phiên bản
+    định dạng, hoặc (khi có model_path) không được build từ đúng nội dung model_path hiện tại.
+    exact=True: bản quét mọi cụm (KNNIndex.exact) thay cho n_probe của meta.json.
+    """
+    from dataset_store import matches_source
+
+    meta_path = os.path.join(index_dir, "meta.json")
+    if not os.path.exists(meta_path):
+        return None
+    mtime = os.stat(meta_path).st_mtime_ns
+    cached = _cache.get(index_dir)
+    if cached is None or cached[0] != mtime:
+        try:
+            index = KNNIndex.load(index_dir)
+            cached = (mtime, index, index.exact())
+        except ValueError:
+            cached = (mtime, None, None)
+        _cache[index_dir] = cached
+    index = cached[2] if exact else cached[1]
+    if index is None or model_path is None:
+        return index
+    # A retrained KNN.pkl must not be answered from the index of the previous one
+    source = index.meta.get("source")
+    if source is None or not os.path.exists(model_path) or not matches_source(model_path, source):
+        return None
+    return index
+
+
+def build_from_knn_pickle(out_dir, **kwargs):
+    """Dùng ma trận train đã lưu sẵn trong KNN.pkl (_fit_X, _y) để build index."""
+    from dataset_store import source_info
+    from model_registry import registry
+    from utils import MODEL_PATHS
+
+    knn = registry.get(MODEL_PATHS["KNN"])
+    return build_index(knn._fit_X, knn.classes_[knn._y], out_dir, n_neighbors=knn.n_neighbors,
+                       source=source_info(MODEL_PATHS["KNN"]), **kwargs)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from utils import KNN_INDEX_DIR
+
+    parser = argparse.ArgumentParser(description="Build the IVF index for the KNN model")
+    parser.add_argument("command", choices=["build"])
+    parser.add_argument("--out", default=KNN_INDEX_DIR)
+    parser.add_argument("--n-lists", type=int, default=None)
+    parser.add_argument("--n-probe", type=int, default=None)
+    args = parser.parse_args()
+
+    index = build_from_knn_pickle(args.out, n_lists=args.n_lists, n_probe=args.n_probe)
+    print(f"Built {args.out}: {index.meta}")
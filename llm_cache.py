@@ -0,0 +1,146 @@
+"""
+Cache lời khuyên của LLM trên disk (SQLite), để request lặp lại (cùng báo cáo,
+cùng dự đoán, cùng ngôn ngữ, cùng model/temperature) không phải gọi Groq lần nữa.
+
+Key là sha256 của các tham số đã chuẩn hóa. Entry hết hạn sau `ttl_seconds`;
+khi vượt `max_entries` hoặc `max_bytes`, các entry ít được dùng gần đây nhất bị xóa.
+
+Cấu hình qua biến môi trường:
+    LLM_CACHE_PATH      (mặc định cache/llm_cache.sqlite)
+    LLM_CACHE_DISABLED  (=1 để bỏ qua cache)
+"""
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+
+DEFAULT_CACHE_PATH = "cache/llm_cache.sqlite"
+
+
+def normalize_text(text):
+    # Whitespace-only differences (indentation, trailing spaces, blank lines) map to the same key
+    lines = [re.sub(r"\s+", " ", line).strip() for line in str(text).strip().splitlines()]
+    return "\n".join(line for line in lines if line)
+
+
+def make_cache_key(report_text, prediction, language, model, temperature):
+    payload = {
+        "report_text": normalize_text(report_text),
+        "prediction": str(prediction).strip(),
+        "language": language,
+        "model": model,
+        "temperature": round(float(temperature), 4),
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    def __init__(self, path=DEFAULT_CACHE_PATH, ttl_seconds=7 * 24 * 3600, max_entries=10_000, max_bytes=50 * 2 ** 20):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+        if path != ":memory:" and os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS advice ("
+            " key TEXT PRIMARY KEY,"
+            " value TEXT NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " last_access REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS advice_last_access ON advice(last_access)")
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT value, created_at FROM advice WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            value, created_at = row
+            if self.ttl_seconds is not None and now - created_at > self.ttl_seconds:
+                self._conn.execute("DELETE FROM advice WHERE key = ?", (key,))
+                self.expired += 1
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE advice SET last_access = ? WHERE key = ?", (now, key))
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        now = time.time()
+        size = len(value.encode("utf-8"))
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO advice (key, value, size, created_at, last_access) VALUES (?, ?, ?, ?, ?)",
+                (key, value, size, now, now),
+            )
+            self._evict(now)
+
+    def _evict(self, now):
+        if self.ttl_seconds is not None:
+            cur = self._conn.execute("DELETE FROM advice WHERE created_at < ?", (now - self.ttl_seconds,))
+            self.expired += max(cur.rowcount, 0)
+
+        count, total = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM advice").fetchone()
+        while (self.max_entries is not None and count > self.max_entries) or \
+                (self.max_bytes is not None and total > self.max_bytes and count > 1):
+            key, size = self._conn.execute(
+                "SELECT key, size FROM advice ORDER BY last_access ASC LIMIT 1").fetchone()
+            self._conn.execute("DELETE FROM advice WHERE key = ?", (key,))
+            self.evictions += 1
+            count -= 1
+            total -= size
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM advice")
+
+    def stats(self):
+        with self._lock:
+            count, total = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM advice").fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "expired": self.expired,
+            "evictions": self.evictions,
+            "entries": count,
+            "bytes": total,
+        }
+
+    def close(self):
+        self._conn.close()
+
+
+_default_cache = None
+_default_lock = threading.Lock()
+
+
+def cache_disabled():
+    return os.getenv("LLM_CACHE_DISABLED", "").lower() in ("1", "true", "yes")
+
+
+def get_llm_cache():
+    """Cache dùng chung trong process (None nếu bị tắt qua LLM_CACHE_DISABLED)."""
+    global _default_cache
+    if cache_disabled():
+        return None
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = LLMCache(os.getenv("LLM_CACHE_PATH", DEFAULT_CACHE_PATH))
+    return _default_cache
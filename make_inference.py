@@ -1,34 +1,129 @@
-from typing import Literal
-import pickle
-import pandas as pd
+from typing import TYPE_CHECKING, Iterable, Literal, Union
+import os
+import numpy as np
+
+from fast_lr import get_compiled_lr
+from knn_index import get_knn_index
+from model_registry import get_model, get_preprocessor
+from tracing import span
+from utils import ID2LABEL, KNN_INDEX_DIR, MODEL_PATHS
+
+# KNN serving: "exact" scans the whole IVF index (same predictions as KNN.pkl), "approximate"
+# probes only the n_probe nearest lists of models/knn_index/meta.json, "off" ignores the index
+KNN_SEARCH = os.getenv("KNN_SEARCH", "exact")
+
+# pandas (~0.4s to import) is only loaded by the DataFrame paths below; the LR
+# single-row path never needs it
+if TYPE_CHECKING:
+    import pandas as pd
+
+
+def get_estimator(model: Literal["LR", "KNN", "RF"]):
+    """
+    Model dùng để predict; với KNN ưu tiên index đã build (models/knn_index) nếu nó khớp KNN.pkl,
+    theo KNN_SEARCH (mặc định tìm chính xác; gần đúng chỉ khi được bật rõ ràng).
+    """
+    if model == "KNN" and KNN_SEARCH != "off":
+        index = get_knn_index(KNN_INDEX_DIR, MODEL_PATHS["KNN"], exact=KNN_SEARCH != "approximate")
+        if index is not None:
+            return index
+    return get_model(model)
+
 
 def make_inference(model: Literal["LR", "KNN", "RF"], user_input: dict):
 
-    model_path_dict = {
-        "LR": "models/LR.pkl",
-        "KNN": "models/KNN.pkl",
-        "RF": "models/RF.pkl"
-    }
-    id2label = {
-        "1": "Yes",
-        "0": "No"
-    }
+    if model == "LR":
+        # Pandas-free compiled path, same result as preprocessor.transform + predict
+        with span("inference.predict", model=model, path="compiled"):
+            return ID2LABEL[f"{get_compiled_lr().predict_one(user_input)}"]
+
+    import pandas as pd
 
-    preprocessor_path = "preprocessor/preprocessor.pkl"
-    with open(preprocessor_path, "rb") as f:
-        preprocessor = pickle.load(f)
+    # Artifacts are unpickled once per process and cached by model_registry
+    preprocessor = get_preprocessor()
 
     try:
-        user_input_df = pd.DataFrame([user_input])
-        preprocessed_input = preprocessor.transform(user_input_df)
-        model_path = model_path_dict[model]
-        model = pickle.load(open(model_path, 'rb'))
-        prediction = model.predict(preprocessed_input)
+        with span("inference.preprocess"):
+            user_input_df = pd.DataFrame([user_input])
+            preprocessed_input = preprocessor.transform(user_input_df)
+        with span("inference.predict", model=model):
+            estimator = get_estimator(model)
+            prediction = estimator.predict(preprocessed_input)
     except Exception as e:
         print(f"An error occured: {e}")
         raise
 
-    return id2label[f"{prediction[0].item()}"]
+    return ID2LABEL[f"{prediction[0].item()}"]
+
+
+def iter_input_chunks(inputs, chunk_size):
+    """Chia input (DataFrame, iterable of dicts, hoặc đường dẫn CSV/JSONL) thành các DataFrame chunk."""
+    import pandas as pd
+
+    if isinstance(inputs, pd.DataFrame):
+        for start in range(0, len(inputs), chunk_size):
+            yield inputs.iloc[start:start + chunk_size]
+    elif isinstance(inputs, (str, os.PathLike)):
+        path = os.fspath(inputs)
+        if path.endswith((".jsonl", ".json")):
+            yield from pd.read_json(path, lines=True, chunksize=chunk_size)
+        else:
+            yield from pd.read_csv(path, chunksize=chunk_size)
+    else:
+        batch = []
+        for row in inputs:
+            batch.append(row)
+            if len(batch) == chunk_size:
+                yield pd.DataFrame(batch)
+                batch = []
+        if batch:
+            yield pd.DataFrame(batch)
+
+
+def predict_frame(model, preprocessor, df: "pd.DataFrame"):
+    """Score một DataFrame đã load; trả về (labels, xác suất của lớp "Yes")."""
+    X = preprocessor.transform(df)
+    # The ColumnTransformer returns CSR (density < sparse_threshold); 49 dense columns are cheap
+    # and the dense distance kernels are about twice as fast for KNN
+    if hasattr(X, "toarray"):
+        X = X.toarray()
+    # predict() is argmax over predict_proba(); derive it to avoid a second pass (KNN search is costly)
+    all_proba = model.predict_proba(X)
+    pred = model.classes_[all_proba.argmax(axis=1)]
+    proba = all_proba[:, list(model.classes_).index(1)]
+    labels = np.where(pred == 1, ID2LABEL["1"], ID2LABEL["0"])
+    return labels, proba
+
+
+def make_inference_batch(model: Literal["LR", "KNN", "RF"],
+                         inputs: Union["pd.DataFrame", Iterable[dict], str, os.PathLike],
+                         chunk_size: int = 50_000) -> "pd.DataFrame":
+    """
+    Dự đoán cho nhiều profile cùng lúc.
+    Trả về DataFrame gồm cột "prediction" ("Yes"/"No") và "probability",
+    theo đúng thứ tự của input.
+    """
+    import pandas as pd
+
+    preprocessor = get_preprocessor()
+    estimator = get_estimator(model)
+
+    labels, probas = [], []
+    for chunk in iter_input_chunks(inputs, chunk_size):
+        if len(chunk) == 0:
+            continue
+        chunk_labels, chunk_proba = predict_frame(estimator, preprocessor, chunk)
+        labels.append(chunk_labels)
+        probas.append(chunk_proba)
+
+    if not labels:
+        return pd.DataFrame({"prediction": pd.Series(dtype=object), "probability": pd.Series(dtype=float)})
+
+    return pd.DataFrame({
+        "prediction": np.concatenate(labels),
+        "probability": np.concatenate(probas)
+    })
+
 
 if __name__ == "__main__":
     model = "LR"
@@ -0,0 +1,56 @@
+"""
+Memo theo nội dung input cho các bước tính toán của một lần submit.
+
+input_key() là hash chuẩn hóa của các cột đầu vào (số được ép về float, thứ tự key
+không quan trọng), nên 20 và 20.0, hay hai dict cùng giá trị khác thứ tự, cho cùng key.
+LRUCache là một OrderedDict có giới hạn số entry và lock (được gọi từ thread pool của
+submit_pipeline, nơi st.cache_data không dùng được vì không có script run context).
+"""
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+
+def input_key(values, numeric_cols=(), columns=None):
+    """Hash chuẩn hóa của `values` (chỉ các key trong `columns` nếu có)."""
+    payload = {}
+    for col, value in values.items():
+        if columns is not None and col not in columns:
+            continue
+        payload[col] = float(value) if col in numeric_cols else value
+    text = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=repr)
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+
+class LRUCache:
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+            return default
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries)}
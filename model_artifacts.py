@@ -0,0 +1,487 @@
+"""
+Định dạng artifact gọn thay cho pickle của sklearn.
+
+Bước export đọc preprocessor.pkl và models/*.pkl (cần sklearn) một lần, rồi ghi các
+tham số đã fit ra models/artifacts/:
+
+    manifest.json            phiên bản định dạng, nguồn (sha256/mtime của từng .pkl),
+                             tham số nhỏ (cột, category, n_neighbors...) và danh sách mảng
+    <component>.<name>.npy   các mảng số (coef, ma trận train của KNN, node của cây RF...)
+
+Ma trận train của KNN được tách làm hai: các cột số giữ dạng dense float64, còn các cột
+one-hot (chỉ có 0/1) chỉ lưu vị trí các số 1 theo kiểu CSR (indices/indptr), nên artifact
+nhỏ hơn cả pickle mà khoảng cách vẫn tính bằng float64 như sklearn.
+
+Loader không import sklearn và mở các .npy bằng mmap, nên nhiều worker process dùng
+chung page cache thay vì mỗi process giữ một bản sao riêng. Component nào có file .pkl
+nguồn đã thay đổi sau khi export thì bị coi là cũ và model_registry dùng lại pickle.
+
+    python model_artifacts.py export
+    python model_artifacts.py verify     # so sánh dự đoán với pickle trên data/clean_df.csv
+"""
+import hashlib
+import json
+import os
+import time
+
+import numpy as np
+
+from utils import ARTIFACT_DIR, MODEL_PATHS, PREPROCESSOR_PATH
+
+# 2: KNN training matrix stored as a dense numeric block + CSR pattern of the one-hot block
+ARTIFACT_FORMAT_VERSION = 2
+MANIFEST_NAME = "manifest.json"
+
+
+def _sha256(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _is_missing(value):
+    return value is None or (isinstance(value, float) and value != value)
+
+
+# ---------------------------------------------------------
+# Các estimator dựng lại từ tham số (chỉ cần numpy)
+# ---------------------------------------------------------
+class ExportedPreprocessor:
+    """ColumnTransformer(imputer+scaler cho cột số, imputer+OneHotEncoder cho cột categorical), output dense."""
+
+    def __init__(self, blocks, arrays):
+        self.blocks = blocks
+        self.arrays = arrays
+        self.n_features_out = sum(len(b["columns"]) if b["kind"] == "numeric" else sum(map(len, b["categories"]))
+                                  for b in blocks)
+        self._indexes = None
+
+    def _category_indexes(self):
+        # Built once: pd.Categorical(..., categories=...) re-validates the categories on every call
+        import pandas as pd
+
+        if self._indexes is None:
+            self._indexes = [[pd.Index(cats) for cats in block["categories"]] if block["kind"] == "onehot" else None
+                             for block in self.blocks]
+        return self._indexes
+
+    def transform(self, df):
+        import pandas as pd
+
+        if not isinstance(df, pd.DataFrame):
+            df = pd.DataFrame(df)
+        X = np.zeros((len(df), self.n_features_out), dtype=np.float64)
+        offset = 0
+        for i, (block, indexes) in enumerate(zip(self.blocks, self._category_indexes())):
+            if block["kind"] == "numeric":
+                median = self.arrays[f"block{i}.median"]
+                mean = self.arrays[f"block{i}.mean"]
+                scale = self.arrays[f"block{i}.scale"]
+                for j, col in enumerate(block["columns"]):
+                    values = pd.to_numeric(df[col], errors="coerce").to_numpy(dtype=np.float64)
+                    values = np.where(np.isnan(values), median[j], values)
+                    X[:, offset + j] = (values - mean[j]) / scale[j]
+                offset += len(block["columns"])
+            else:
+                rows = np.arange(len(df))
+                for col, most_frequent, index in zip(block["columns"], block["most_frequent"], indexes):
+                    values = df[col]
+                    if values.hasnans:
+                        values = values.fillna(most_frequent)
+                    # Unknown categories get code -1 and stay all-zero (handle_unknown="ignore")
+                    codes = index.get_indexer(values)
+                    known = codes >= 0
+                    X[rows[known], offset + codes[known]] = 1.0
+                    offset += len(index)
+        return X
+
+
+class ExportedLogisticRegression:
+    def __init__(self, coef, intercept, classes):
+        self.coef_ = coef
+        self.intercept_ = intercept
+        self.classes_ = classes
+
+    def decision_function(self, X):
+        scores = X @ self.coef_.T + self.intercept_
+        return scores[:, 0] if scores.shape[1] == 1 else scores
+
+    def predict_proba(self, X):
+        scores = self.decision_function(X)
+        if scores.ndim == 1:
+            # Numerically stable sigmoid for both signs
+            p = np.empty_like(scores)
+            pos = scores >= 0
+            p[pos] = 1.0 / (1.0 + np.exp(-scores[pos]))
+            z = np.exp(scores[~pos])
+            p[~pos] = z / (1.0 + z)
+            return np.column_stack([1.0 - p, p])
+        scores = scores - scores.max(axis=1, keepdims=True)
+        e = np.exp(scores)
+        return e / e.sum(axis=1, keepdims=True)
+
+    def predict(self, X):
+        scores = self.decision_function(X)
+        indices = (scores > 0).astype(int) if scores.ndim == 1 else scores.argmax(axis=1)
+        return self.classes_[indices]
+
+
+class ExportedKNeighborsClassifier:
+    """
+    KNN brute force (euclid, weights="uniform") trên ma trận train mmap, lưu thành khối dense
+    (dense_cols) và khối nhị phân (vị trí các số 1, dạng CSR: binary_indices/binary_indptr).
+    """
+
+    def __init__(self, dense_cols, fit_dense, binary_indices, binary_indptr, y_codes, classes, n_neighbors,
+                 block_size=256, max_gather=1 << 19, train_chunk=8192):
+        self.dense_cols = dense_cols
+        self.fit_dense = fit_dense
+        self.binary_indices = binary_indices
+        self.binary_indptr = binary_indptr
+        self.y_codes = y_codes
+        self.classes_ = classes
+        self.n_neighbors = n_neighbors
+        self.block_size = block_size
+        self.max_gather = max_gather
+        self.train_chunk = train_chunk
+        nnz_per_row = np.diff(binary_indptr)
+        self._row_starts = binary_indptr[:-1]
+        self._empty_rows = nnz_per_row == 0
+        self.fit_sq_norms = np.einsum("ij,ij->i", fit_dense, fit_dense) + nnz_per_row
+
+    def _dense_rows(self, start, end, n_features):
+        """fit_X[start:end] dựng lại dạng dense (một chunk nhỏ, không giữ lại)."""
+        block = np.zeros((end - start, n_features), dtype=np.float64)
+        block[:, self.dense_cols] = self.fit_dense[start:end]
+        lo, hi = self.binary_indptr[start], self.binary_indptr[end]
+        rows = np.repeat(np.arange(end - start), np.diff(self.binary_indptr[start:end + 1]))
+        block[rows, self.binary_indices[lo:hi]] = 1.0
+        return block
+
+    def _dot(self, Q):
+        """Q @ fit_X.T mà không giữ fit_X dense trong bộ nhớ."""
+        if len(Q) * len(self.binary_indices) > self.max_gather:
+            # Many queries: a BLAS product per rebuilt chunk of training rows is cheaper than gathering
+            n_train = len(self.fit_dense)
+            dot = np.empty((len(Q), n_train), dtype=np.float64)
+            for start in range(0, n_train, self.train_chunk):
+                end = min(n_train, start + self.train_chunk)
+                dot[:, start:end] = Q @ self._dense_rows(start, end, Q.shape[1]).T
+            return dot
+        dot = Q[:, self.dense_cols] @ self.fit_dense.T
+        if len(self.binary_indices):
+            binary = np.add.reduceat(Q[:, self.binary_indices], self._row_starts, axis=1)
+            # reduceat yields the element at the start index for empty segments; those rows add nothing
+            binary[:, self._empty_rows] = 0.0
+            dot += binary
+        return dot
+
+    def predict_proba(self, X):
+        X = np.asarray(X, dtype=np.float64)
+        k = self.n_neighbors
+        proba = np.empty((len(X), len(self.classes_)), dtype=np.float64)
+        for start in range(0, len(X), self.block_size):
+            Q = X[start:start + self.block_size]
+            d = (Q * Q).sum(axis=1)[:, None] - 2.0 * self._dot(Q) + self.fit_sq_norms[None, :]
+            idx = np.argpartition(d, k - 1, axis=1)[:, :k]
+            votes = self.y_codes[idx]
+            for c in range(len(self.classes_)):
+                proba[start:start + len(Q), c] = (votes == c).sum(axis=1) / k
+        return proba
+
+    def predict(self, X):
+        return self.classes_[self.predict_proba(X).argmax(axis=1)]
+
+
+class ExportedForestClassifier:
+    """RandomForest/ExtraTrees: mọi cây ghép thành các mảng node phẳng, duyệt vector hóa theo (dòng, cây)."""
+
+    def __init__(self, roots, children_left, children_right, feature, threshold, value, classes, block_size=4096):
+        self.roots = roots
+        self.children_left = children_left
+        self.children_right = children_right
+        self.feature = feature
+        self.threshold = threshold
+        self.value = value
+        self.classes_ = classes
+        self.block_size = block_size
+
+    def predict_proba(self, X):
+        # sklearn trees compare float32 features against float64 thresholds
+        X = np.asarray(X, dtype=np.float32)
+        proba = np.empty((len(X), len(self.classes_)), dtype=np.float64)
+        for start in range(0, len(X), self.block_size):
+            Q = X[start:start + self.block_size]
+            rows = np.arange(len(Q))[:, None]
+            node = np.repeat(self.roots[None, :], len(Q), axis=0)
+            while True:
+                left = self.children_left[node]
+                leaf = left < 0
+                if leaf.all():
+                    break
+                feature = np.where(leaf, 0, self.feature[node])
+                go_left = Q[rows, feature] <= self.threshold[node]
+                node = np.where(leaf, node, np.where(go_left, left, self.children_right[node]))
+            proba[start:start + len(Q)] = self.value[node].mean(axis=1)
+        return proba
+
+    def predict(self, X):
+        return self.classes_[self.predict_proba(X).argmax(axis=1)]
+
+
+# ---------------------------------------------------------
+# Export (cần sklearn, chạy một lần sau khi train)
+# ---------------------------------------------------------
+def _export_preprocessor(preprocessor):
+    meta, arrays = {"type": "column_transformer", "blocks": []}, {}
+    for name, pipeline, columns in preprocessor.transformers_:
+        if name == "remainder":
+            if pipeline != "drop" and len(columns):
+                raise ValueError("Only remainder='drop' is supported")
+            continue
+        steps = dict(pipeline.steps)
+        imputer = steps["imputer"]
+        i = len(meta["blocks"])
+        if "scaler" in steps:
+            meta["blocks"].append({"kind": "numeric", "columns": list(columns)})
+            arrays[f"block{i}.median"] = np.asarray(imputer.statistics_, dtype=np.float64)
+            arrays[f"block{i}.mean"] = np.asarray(steps["scaler"].mean_, dtype=np.float64)
+            arrays[f"block{i}.scale"] = np.asarray(steps["scaler"].scale_, dtype=np.float64)
+        elif "encoder" in steps:
+            encoder = steps["encoder"]
+            if encoder.drop is not None or encoder.handle_unknown != "ignore":
+                raise ValueError("Only OneHotEncoder(handle_unknown='ignore', drop=None) is supported")
+            meta["blocks"].append({
+                "kind": "onehot",
+                "columns": list(columns),
+                "most_frequent": [v.item() if hasattr(v, "item") else v for v in imputer.statistics_],
+                "categories": [[v.item() if hasattr(v, "item") else v for v in cats] for cats in encoder.categories_],
+            })
+        else:
+            raise ValueError(f"Unsupported transformer pipeline: {name}")
+    return meta, arrays
+
+
+def _export_model(model):
+    kind = type(model).__name__
+    classes = np.asarray(model.classes_)
+    if kind == "LogisticRegression":
+        return {"type": "logistic_regression"}, {
+            "coef": np.asarray(model.coef_, dtype=np.float64),
+            "intercept": np.asarray(model.intercept_, dtype=np.float64),
+            "classes": classes,
+        }
+    if kind == "KNeighborsClassifier":
+        if model.weights != "uniform" or model.effective_metric_ != "euclidean":
+            raise ValueError("Only KNeighborsClassifier(weights='uniform', euclidean metric) is supported")
+        fit_X = np.asarray(model._fit_X.toarray() if hasattr(model._fit_X, "toarray") else model._fit_X,
+                           dtype=np.float64)
+        # One-hot columns only hold 0/1: keep just where the ones are
+        binary = ((fit_X == 0) | (fit_X == 1)).all(axis=0)
+        rows, cols = np.nonzero(fit_X * binary[None, :])
+        index_dtype = np.int16 if fit_X.shape[1] <= np.iinfo(np.int16).max else np.int32
+        return {"type": "knn", "n_neighbors": int(model.n_neighbors)}, {
+            "dense_cols": np.flatnonzero(~binary).astype(index_dtype),
+            "fit_dense": np.ascontiguousarray(fit_X[:, ~binary]),
+            "binary_indices": cols.astype(index_dtype),
+            "binary_indptr": np.concatenate([[0], np.cumsum(np.bincount(rows, minlength=len(fit_X)))]).astype(np.int64),
+            "y_codes": np.asarray(model._y, dtype=np.int8 if len(classes) < 128 else np.int32),
+            "classes": classes,
+        }
+    if hasattr(model, "estimators_") and hasattr(model.estimators_[0], "tree_"):
+        parts = {"roots": [], "children_left": [], "children_right": [], "feature": [], "threshold": [], "value": []}
+        offset = 0
+        for estimator in model.estimators_:
+            tree = estimator.tree_
+            parts["roots"].append(offset)
+            for side in ("children_left", "children_right"):
+                child = getattr(tree, side).astype(np.int64)
+                parts[side].append(np.where(child >= 0, child + offset, -1))
+            parts["feature"].append(tree.feature.astype(np.int32))
+            parts["threshold"].append(tree.threshold.astype(np.float64))
+            value = tree.value[:, 0, :].astype(np.float64)
+            parts["value"].append(value / value.sum(axis=1, keepdims=True))
+            offset += tree.node_count
+        arrays = {key: np.asarray(parts["roots"], dtype=np.int64) if key == "roots" else np.concatenate(vals)
+                  for key, vals in parts.items()}
+        arrays["classes"] = classes
+        return {"type": "forest", "n_estimators": len(model.estimators_)}, arrays
+    raise ValueError(f"Unsupported model type: {kind}")
+
+
+def export_artifacts(out_dir=ARTIFACT_DIR, models=None):
+    """Ghi preprocessor và các model có trên disk (mặc định mọi MODEL_PATHS) ra out_dir; trả về manifest."""
+    import sklearn
+
+    from model_registry import registry
+
+    sources = {"preprocessor": PREPROCESSOR_PATH}
+    sources.update({name: path for name, path in MODEL_PATHS.items()
+                    if (models is None or name in models) and os.path.exists(path)})
+
+    os.makedirs(out_dir, exist_ok=True)
+    manifest = {
+        "format_version": ARTIFACT_FORMAT_VERSION,
+        "created_at": time.time(),
+        "exported_with": {"sklearn": sklearn.__version__, "numpy": np.__version__},
+        "components": {},
+    }
+    for component, path in sources.items():
+        obj = registry.get(path)
+        meta, arrays = _export_preprocessor(obj) if component == "preprocessor" else _export_model(obj)
+        st = os.stat(path)
+        meta["source"] = {"path": path, "sha256": _sha256(path), "size": st.st_size, "mtime_ns": st.st_mtime_ns}
+        meta["arrays"] = {}
+        for name, array in arrays.items():
+            filename = f"{component}.{name}.npy"
+            np.save(os.path.join(out_dir, filename), np.ascontiguousarray(array), allow_pickle=False)
+            meta["arrays"][name] = {"file": filename, "dtype": str(array.dtype), "shape": list(array.shape)}
+        manifest["components"][component] = meta
+
+    # Manifest last: a crash mid-export leaves the previous manifest pointing at complete files
+    tmp_path = os.path.join(out_dir, MANIFEST_NAME + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, os.path.join(out_dir, MANIFEST_NAME))
+    return manifest
+
+
+# ---------------------------------------------------------
+# Load (không cần sklearn)
+# ---------------------------------------------------------
+class ArtifactBundle:
+    def __init__(self, artifact_dir, manifest, mmap=True):
+        self.artifact_dir = artifact_dir
+        self.manifest = manifest
+        self.mmap = mmap
+        self._objects = {}
+        self._fresh = {}
+
+    @classmethod
+    def load(cls, artifact_dir=ARTIFACT_DIR, mmap=True):
+        with open(os.path.join(artifact_dir, MANIFEST_NAME), encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest["format_version"] != ARTIFACT_FORMAT_VERSION:
+            raise ValueError(f"Unsupported artifact format {manifest['format_version']} "
+                             f"(expected {ARTIFACT_FORMAT_VERSION}); run `python model_artifacts.py export`")
+        return cls(artifact_dir, manifest, mmap)
+
+    def has(self, component):
+        return component in self.manifest["components"]
+
+    def is_fresh(self, component):
+        """
+        False nếu file .pkl nguồn đã bị thay đổi (hoặc xóa) sau khi export. mtime/size khác
+        (ví dụ sau git checkout) thì so sha256 một lần rồi nhớ kết quả theo (mtime, size).
+        """
+        source = self.manifest["components"][component]["source"]
+        try:
+            st = os.stat(source["path"])
+        except FileNotFoundError:
+            return False
+        if st.st_size == source["size"] and st.st_mtime_ns == source["mtime_ns"]:
+            return True
+        key = (source["path"], st.st_size, st.st_mtime_ns)
+        if key not in self._fresh:
+            self._fresh[key] = _sha256(source["path"]) == source["sha256"]
+        return self._fresh[key]
+
+    def _arrays(self, meta):
+        mode = "r" if self.mmap else None
+        return {name: np.load(os.path.join(self.artifact_dir, spec["file"]), mmap_mode=mode, allow_pickle=False)
+                for name, spec in meta["arrays"].items()}
+
+    def get(self, component):
+        """Estimator đã dựng lại (cache trong bundle)."""
+        if component not in self._objects:
+            meta = self.manifest["components"][component]
+            arrays = self._arrays(meta)
+            kind = meta["type"]
+            if kind == "column_transformer":
+                obj = ExportedPreprocessor(meta["blocks"], arrays)
+            elif kind == "logistic_regression":
+                obj = ExportedLogisticRegression(arrays["coef"], arrays["intercept"], arrays["classes"])
+            elif kind == "knn":
+                obj = ExportedKNeighborsClassifier(arrays["dense_cols"], arrays["fit_dense"], arrays["binary_indices"],
+                                                   arrays["binary_indptr"], arrays["y_codes"], arrays["classes"],
+                                                   meta["n_neighbors"])
+            elif kind == "forest":
+                obj = ExportedForestClassifier(arrays["roots"], arrays["children_left"], arrays["children_right"],
+                                               arrays["feature"], arrays["threshold"], arrays["value"],
+                                               arrays["classes"])
+            else:
+                raise ValueError(f"Unknown component type: {kind}")
+            self._objects[component] = obj
+        return self._objects[component]
+
+    def verify_checksums(self):
+        """So sha256 của file nguồn với manifest (đọc toàn bộ .pkl, chỉ dùng khi kiểm tra)."""
+        return {component: _sha256(meta["source"]["path"]) == meta["source"]["sha256"]
+                for component, meta in self.manifest["components"].items()
+                if os.path.exists(meta["source"]["path"])}
+
+
+_cache = {}
+
+
+def get_artifact_bundle(artifact_dir=ARTIFACT_DIR):
+    """Bundle đã load, cache theo mtime của manifest.json; None nếu chưa export hoặc khác phiên bản định dạng."""
+    manifest_path = os.path.join(artifact_dir, MANIFEST_NAME)
+    try:
+        mtime = os.stat(manifest_path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+    cached = _cache.get(artifact_dir)
+    if cached is None or cached[0] != mtime:
+        try:
+            bundle = ArtifactBundle.load(artifact_dir)
+        except ValueError:
+            # Exported by an older format: serve the pickles until it is re-exported
+            bundle = None
+        cached = (mtime, bundle)
+        _cache[artifact_dir] = cached
+    return cached[1]
+
+
+def verify_against_pickles(artifact_dir=ARTIFACT_DIR, data_path="data/clean_df.csv"):
+    """Dự đoán bằng artifact và bằng pickle trên cùng dữ liệu; trả về độ lệch xác suất và tỉ lệ nhãn khớp."""
+    import pandas as pd
+
+    from model_registry import registry
+
+    bundle = ArtifactBundle.load(artifact_dir)
+    df = pd.read_csv(data_path).drop(columns=["Depression"], errors="ignore")
+    X_exported = bundle.get("preprocessor").transform(df)
+    X_pickle = registry.get(PREPROCESSOR_PATH).transform(df)
+    X_pickle = X_pickle.toarray() if hasattr(X_pickle, "toarray") else X_pickle
+    report = {"preprocessor": {"max_abs_diff": float(np.abs(X_exported - X_pickle).max())}}
+    for name in MODEL_PATHS:
+        if not bundle.has(name):
+            continue
+        exported = bundle.get(name).predict_proba(X_exported)
+        reference = registry.get(MODEL_PATHS[name]).predict_proba(X_pickle)
+        report[name] = {
+            "max_abs_diff": float(np.abs(exported - reference).max()),
+            "label_agreement": float((exported.argmax(axis=1) == reference.argmax(axis=1)).mean()),
+        }
+    return report
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Export sklearn pickles to the mmap-able artifact format")
+    parser.add_argument("command", choices=["export", "verify"])
+    parser.add_argument("--out", default=ARTIFACT_DIR)
+    parser.add_argument("--models", nargs="*", default=None, choices=list(MODEL_PATHS))
+    args = parser.parse_args()
+
+    if args.command == "export":
+        manifest = export_artifacts(args.out, args.models)
+        for component, meta in manifest["components"].items():
+            size = sum(os.path.getsize(os.path.join(args.out, a["file"])) for a in meta["arrays"].values())
+            print(f"{component:<13} {meta['type']:<20} {size / 1024:9.1f} KiB  <- {meta['source']['path']}")
+    else:
+        print(json.dumps(verify_against_pickles(args.out), indent=2))
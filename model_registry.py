@@ -0,0 +1,167 @@
+import hashlib
+import os
+import pickle
+import threading
+import time
+
+from model_artifacts import get_artifact_bundle
+from utils import ARTIFACT_DIR, MODEL_PATHS, PREPROCESSOR_PATH
+
+# "auto": dùng models/artifacts (mmap, không cần sklearn) khi đã export và còn khớp với .pkl
+# nguồn, ngược lại unpickle; "pickle": luôn unpickle
+MODEL_FORMAT = os.getenv("MODEL_FORMAT", "auto")
+
+
+class ArtifactRegistry:
+    """
+    Giữ các artifact đã unpickle trong bộ nhớ của process.
+    Mỗi lần get() chỉ stat file; nếu mtime/size đổi thì so sánh sha256,
+    và chỉ unpickle lại khi nội dung thực sự thay đổi.
+    """
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.reloads = 0
+
+    @staticmethod
+    def _file_digest(path):
+        h = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                h.update(block)
+        return h.hexdigest()
+
+    def _load(self, path, st):
+        start = time.perf_counter()
+        digest = self._file_digest(path)
+        with open(path, "rb") as f:
+            obj = pickle.load(f)
+        self._entries[path] = {
+            "obj": obj,
+            "mtime_ns": st.st_mtime_ns,
+            "size": st.st_size,
+            "sha256": digest,
+            "load_seconds": time.perf_counter() - start,
+            "loaded_at": time.time(),
+        }
+        return obj
+
+    def get(self, path):
+        st = os.stat(path)
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is None:
+                self.misses += 1
+                return self._load(path, st)
+
+            if entry["mtime_ns"] == st.st_mtime_ns and entry["size"] == st.st_size:
+                self.hits += 1
+                return entry["obj"]
+
+            # File was touched: only reload if the content actually changed
+            if self._file_digest(path) == entry["sha256"]:
+                entry["mtime_ns"] = st.st_mtime_ns
+                entry["size"] = st.st_size
+                self.hits += 1
+                return entry["obj"]
+
+            self.misses += 1
+            self.reloads += 1
+            return self._load(path, st)
+
+    def preload(self, paths):
+        loaded = {}
+        for path in paths:
+            if os.path.exists(path):
+                self.get(path)
+                loaded[path] = self._entries[path]["load_seconds"]
+        return loaded
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.reloads = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "reloads": self.reloads,
+                "artifacts": {
+                    path: {
+                        "sha256": e["sha256"],
+                        "size": e["size"],
+                        "load_seconds": e["load_seconds"],
+                        "loaded_at": e["loaded_at"],
+                    }
+                    for path, e in self._entries.items()
+                },
+            }
+
+
+registry = ArtifactRegistry()
+
+
+class ModelNotAvailable(LookupError):
+    """Model chưa được train/export trên máy này (ví dụ RF.pkl không có trong repo)."""
+
+
+def _exported(component):
+    """Estimator từ models/artifacts, hoặc None nếu chưa export / đã cũ so với file .pkl nguồn."""
+    if MODEL_FORMAT == "pickle":
+        return None
+    bundle = get_artifact_bundle(ARTIFACT_DIR)
+    if bundle is None or not bundle.has(component) or not bundle.is_fresh(component):
+        return None
+    return bundle.get(component)
+
+
+def get_preprocessor():
+    exported = _exported("preprocessor")
+    return exported if exported is not None else registry.get(PREPROCESSOR_PATH)
+
+
+def is_available(model):
+    """Model có thể load được: đã export và còn mới, hoặc file .pkl tồn tại."""
+    return _exported(model) is not None or os.path.exists(MODEL_PATHS[model])
+
+
+def available_models():
+    return [model for model in MODEL_PATHS if is_available(model)]
+
+
+def get_model(model):
+    exported = _exported(model)
+    if exported is not None:
+        return exported
+    path = MODEL_PATHS[model]
+    if not os.path.exists(path):
+        raise ModelNotAvailable(f"{path} not found; build it with `python train.py --models {model}`")
+    return registry.get(path)
+
+
+def preload_all():
+    """
+    Load preprocessor và tất cả model có trên disk (bỏ qua file chưa tồn tại, ví dụ RF.pkl).
+    Component đã export chỉ mở mmap artifact; chỉ những cái còn lại mới unpickle.
+    """
+    loaded = {}
+    pickles = []
+    for component, path in [("preprocessor", PREPROCESSOR_PATH), *MODEL_PATHS.items()]:
+        start = time.perf_counter()
+        if _exported(component) is not None:
+            loaded[os.path.join(ARTIFACT_DIR, component)] = time.perf_counter() - start
+        else:
+            pickles.append(path)
+    loaded.update(registry.preload(pickles))
+    return loaded
+
+
+if __name__ == "__main__":
+    print(preload_all())
+    get_model("LR")
+    print(registry.stats())
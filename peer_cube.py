@@ -0,0 +1,213 @@
+"""
+Khối so sánh theo nhóm (peer cube): so sánh user với sinh viên cùng Degree,
+cùng Gender, cùng Sleep Duration... thay vì chỉ với toàn bộ cộng đồng.
+
+Với mỗi cột số, các giá trị distinct được lưu một lần; mỗi segment chỉ giữ
+vector đếm tích lũy trên các giá trị đó, nên percentile là một phép
+searchsorted + tra mảng (O(log u)), và file lưu rất nhỏ. Mỗi segment cũng có
+bảng tần suất cho các cột categorical còn lại.
+
+    python peer_cube.py --out data/peer_cube.npz
+
+clean_data.py ghi data/peer_cube.npz cùng lúc với data/clean_df.csv; file lưu kèm
+source_info của CSV nên load_fresh bỏ qua cube cũ khi dữ liệu đã đổi.
+"""
+import json
+import os
+
+import numpy as np
+
+from population_stats import input_value, source_column
+from utils import ANALYSIS_CATEGORICAL_COLS, ANALYSIS_NUMERIC_COLS, CLEAN_DATA_PATH, PEER_CUBE_PATH
+
+# 2: categorical frequencies are keyed by analysis name (utils.ANALYSIS_COLUMN_SOURCES)
+CUBE_FORMAT_VERSION = 2
+DEFAULT_SEGMENT_COLS = ['Degree', 'Gender', 'Sleep Duration', 'Dietary Habits',
+                        'Family History of Mental Illness']
+
+
+class PeerCube:
+    def __init__(self, uniques, segments, frequencies, numeric_cols, categorical_cols, source=None):
+        self.uniques = uniques          # {metric: sorted distinct values}
+        self.segments = segments        # {(col, value): {"size", "cum": {metric}, "sum": {metric}, "max": {metric}, "count": {metric}}}
+        self.frequencies = frequencies  # {(col, value): {other_col: {category: count}}}
+        self.numeric_cols = numeric_cols
+        self.categorical_cols = categorical_cols
+        self.source = source            # dataset_store.source_info of the CSV it was built from
+
+    @classmethod
+    def build(cls, df, segment_cols=DEFAULT_SEGMENT_COLS, numeric_cols=ANALYSIS_NUMERIC_COLS,
+              categorical_cols=ANALYSIS_CATEGORICAL_COLS):
+        numeric_cols = [c for c in numeric_cols if c in df.columns]
+        sources = {c: source_column(c, df.columns) for c in categorical_cols}
+        categorical_cols = [c for c in categorical_cols if sources[c] is not None]
+        segment_cols = [c for c in segment_cols if c in df.columns]
+
+        uniques, positions, valid = {}, {}, {}
+        for metric in numeric_cols:
+            values = df[metric].to_numpy(dtype=np.float64)
+            ok = ~np.isnan(values)
+            uniques[metric] = np.unique(values[ok])
+            positions[metric] = np.searchsorted(uniques[metric], np.where(ok, values, 0))
+            valid[metric] = ok
+
+        segments, frequencies = {}, {}
+        for col in segment_cols:
+            codes, labels = df[col].factorize(use_na_sentinel=True)
+            for code, label in enumerate(labels):
+                mask = codes == code
+                key = (col, str(label))
+                entry = {"size": int(mask.sum()), "cum": {}, "sum": {}, "max": {}, "count": {}}
+                for metric in numeric_cols:
+                    sel = mask & valid[metric]
+                    counts = np.bincount(positions[metric][sel], minlength=len(uniques[metric]))
+                    entry["cum"][metric] = np.concatenate([[0], np.cumsum(counts)]).astype(np.int32)
+                    picked = uniques[metric][positions[metric][sel]]
+                    entry["sum"][metric] = float(picked.sum())
+                    entry["count"][metric] = int(sel.sum())
+                    entry["max"][metric] = float(picked.max()) if sel.any() else float("nan")
+                segments[key] = entry
+                frequencies[key] = {
+                    # `if v`: categorical columns also count the categories absent from this segment
+                    other: {str(k): int(v) for k, v in df.loc[mask, sources[other]].value_counts(dropna=True).items() if v}
+                    for other in categorical_cols if other != col
+                }
+        return cls(uniques, segments, frequencies, numeric_cols, categorical_cols)
+
+    @classmethod
+    def from_csv(cls, path=CLEAN_DATA_PATH, **kwargs):
+        # Deferred: load() from .npz does not need pandas at all
+        from dataset_store import load_dataset, source_info
+        cube = cls.build(load_dataset(path), **kwargs)
+        cube.source = source_info(path)
+        return cube
+
+    def has_segment(self, col, value):
+        return (col, str(value)) in self.segments
+
+    def segment_size(self, col, value):
+        return self.segments[(col, str(value))]["size"]
+
+    def percentile_below(self, col, value, metric, x):
+        """% sinh viên trong segment (col == value) có metric < x."""
+        entry = self.segments[(col, str(value))]
+        if entry["size"] == 0 or np.isnan(x):
+            return 0.0
+        pos = np.searchsorted(self.uniques[metric], x, side="left")
+        return entry["cum"][metric][pos] / entry["size"] * 100
+
+    def mean(self, col, value, metric):
+        entry = self.segments[(col, str(value))]
+        count = entry["count"][metric]
+        return entry["sum"][metric] / count if count else float("nan")
+
+    def category_percentage(self, col, value, other_col, other_value):
+        """% sinh viên trong segment (col == value) có other_col == other_value."""
+        key = (col, str(value))
+        size = self.segments[key]["size"]
+        if size == 0:
+            return 0.0
+        return self.frequencies[key].get(other_col, {}).get(str(other_value), 0) / size * 100
+
+    def compare(self, user_input, segment_col):
+        """
+        So sánh user với nhóm cùng giá trị segment_col.
+        Trả về dict cùng dạng comparison_data của analyze_user_vs_population
+        (thêm "segment" và "size"), hoặc None nếu user không thuộc segment nào đã biết.
+        """
+        value = user_input.get(segment_col)
+        if value is None or not self.has_segment(segment_col, value):
+            return None
+        result = {
+            "segment": {"feature": segment_col, "value": value},
+            "size": self.segment_size(segment_col, value),
+            "numerical": [],
+            "categorical": [],
+        }
+        for metric in self.numeric_cols:
+            if metric in user_input:
+                user_val = float(user_input[metric])
+                result["numerical"].append({
+                    "metric": metric,
+                    "user": user_val,
+                    "avg": self.mean(segment_col, value, metric),
+                    "percentile": self.percentile_below(segment_col, value, metric, user_val),
+                })
+        for other in self.categorical_cols:
+            present, other_value = input_value(user_input, other)
+            if other != segment_col and present:
+                result["categorical"].append({
+                    "feature": other,
+                    "value": other_value,
+                    "percentage": self.category_percentage(segment_col, value, other, other_value),
+                })
+        return result
+
+    def save(self, path, source=None):
+        keys = list(self.segments)
+        meta = {
+            "format_version": CUBE_FORMAT_VERSION,
+            "source": source or self.source,
+            "numeric_cols": self.numeric_cols,
+            "categorical_cols": self.categorical_cols,
+            "segments": [
+                {"col": col, "value": value, "size": self.segments[(col, value)]["size"],
+                 "sum": self.segments[(col, value)]["sum"], "max": self.segments[(col, value)]["max"],
+                 "count": self.segments[(col, value)]["count"],
+                 "frequencies": self.frequencies[(col, value)]}
+                for col, value in keys
+            ],
+        }
+        arrays = {f"uniq_{i}": self.uniques[m] for i, m in enumerate(self.numeric_cols)}
+        for i, metric in enumerate(self.numeric_cols):
+            # One (n_segments, n_uniques + 1) matrix per metric
+            arrays[f"cum_{i}"] = np.stack([self.segments[k]["cum"][metric] for k in keys]) if keys \
+                else np.zeros((0, len(self.uniques[metric]) + 1), dtype=np.int32)
+        np.savez_compressed(path, meta=np.array(json.dumps(meta)), **arrays)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            meta = json.loads(str(data["meta"]))
+            if meta["format_version"] != CUBE_FORMAT_VERSION:
+                raise ValueError(f"Unsupported peer cube version: {meta['format_version']}")
+            numeric_cols = meta["numeric_cols"]
+            uniques = {m: data[f"uniq_{i}"] for i, m in enumerate(numeric_cols)}
+            cums = {m: data[f"cum_{i}"] for i, m in enumerate(numeric_cols)}
+
+        segments, frequencies = {}, {}
+        for row, seg in enumerate(meta["segments"]):
+            key = (seg["col"], seg["value"])
+            segments[key] = {
+                "size": seg["size"], "sum": seg["sum"], "max": seg["max"], "count": seg["count"],
+                "cum": {m: cums[m][row] for m in numeric_cols},
+            }
+            frequencies[key] = seg["frequencies"]
+        return cls(uniques, segments, frequencies, numeric_cols, meta["categorical_cols"], meta.get("source"))
+
+    @classmethod
+    def load_fresh(cls, path=PEER_CUBE_PATH, csv_path=CLEAN_DATA_PATH):
+        """Cube đã lưu nếu nó được build từ đúng nội dung csv_path hiện tại, nếu không thì None."""
+        from dataset_store import matches_source
+
+        if not os.path.exists(path):
+            return None
+        try:
+            cube = cls.load(path)
+        except ValueError:
+            # Written by an older format version: rebuild instead
+            return None
+        if cube.source is None or not os.path.exists(csv_path) or not matches_source(csv_path, cube.source):
+            return None
+        return cube
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Build the peer comparison cube")
+    parser.add_argument("--data", default=CLEAN_DATA_PATH)
+    parser.add_argument("--out", default=PEER_CUBE_PATH)
+    args = parser.parse_args()
+    PeerCube.from_csv(args.data).save(args.out)
+    print(f"Saved {args.out}")
@@ -0,0 +1,225 @@
+"""
+Thống kê cộng đồng tính sẵn cho analyze_user_vs_population.
+
+Thay vì quét toàn bộ DataFrame cho mỗi request, mỗi cột số được lưu dưới dạng
+mảng đã sắp xếp (percentile = tìm kiếm nhị phân) cùng mean/max, và mỗi cột
+categorical có bảng tần suất. Có thể lưu/đọc từ file .npz.
+
+PopulationStatsBuilder cộng dồn thống kê theo từng chunk (đếm số lần xuất hiện của mỗi
+giá trị), nên clean_data.py dựng được stats mà không cần giữ cả dataset trong RAM; kết
+quả giống hệt from_dataframe trên toàn bộ dữ liệu.
+"""
+import json
+import os
+
+import numpy as np
+
+from utils import (ANALYSIS_CATEGORICAL_COLS, ANALYSIS_COLUMN_SOURCES, ANALYSIS_NUMERIC_COLS, CLEAN_DATA_PATH,
+                   POPULATION_STATS_PATH)
+
+# 2: categorical frequencies are keyed by analysis name (ANALYSIS_COLUMN_SOURCES)
+STATS_FORMAT_VERSION = 2
+
+
+def source_column(col, columns):
+    """Cột của `columns` chứa dữ liệu cho cột phân tích `col` (tên gốc hoặc theo ANALYSIS_COLUMN_SOURCES), hoặc None."""
+    if col in columns:
+        return col
+    source = ANALYSIS_COLUMN_SOURCES.get(col)
+    return source if source in columns else None
+
+
+def input_value(user_input, col):
+    """(có giá trị?, giá trị) của cột phân tích `col` trong input của user, cũng theo ANALYSIS_COLUMN_SOURCES."""
+    source = source_column(col, user_input)
+    if source is None:
+        return False, None
+    return True, user_input[source]
+
+
+class PopulationStats:
+    def __init__(self, total, sorted_values, means, maxes, frequencies, columns, source=None):
+        self.total = total
+        self.sorted_values = sorted_values  # {col: sorted float64 array, NaN removed}
+        self.means = means
+        self.maxes = maxes
+        self.frequencies = frequencies      # {col: {value: count}}
+        self.columns = set(columns)
+        self.source = source                # dataset_store.source_info of the CSV, when known
+
+    @classmethod
+    def from_dataframe(cls, df, numeric_cols=ANALYSIS_NUMERIC_COLS, categorical_cols=ANALYSIS_CATEGORICAL_COLS):
+        sorted_values, means, maxes, frequencies = {}, {}, {}, {}
+        for col in numeric_cols:
+            if col in df.columns:
+                values = df[col].to_numpy(dtype=np.float64)
+                values = np.sort(values[~np.isnan(values)])
+                sorted_values[col] = values
+                means[col] = float(values.mean()) if len(values) else float("nan")
+                maxes[col] = float(values[-1]) if len(values) else float("nan")
+        for col in categorical_cols:
+            source = source_column(col, df.columns)
+            if source is not None:
+                counts = df[source].value_counts(dropna=True)
+                frequencies[col] = {str(k): int(v) for k, v in counts.items()}
+        return cls(len(df), sorted_values, means, maxes, frequencies, list(df.columns) + list(frequencies))
+
+    @classmethod
+    def from_csv(cls, path=CLEAN_DATA_PATH):
+        # Deferred: load() from .npz does not need pandas at all
+        from dataset_store import load_dataset
+        return cls.from_dataframe(load_dataset(path))
+
+    @classmethod
+    def load_fresh(cls, path=POPULATION_STATS_PATH, csv_path=CLEAN_DATA_PATH):
+        """Stats đã lưu nếu chúng được tính từ đúng nội dung csv_path hiện tại, nếu không thì None."""
+        from dataset_store import matches_source
+
+        if not os.path.exists(path):
+            return None
+        try:
+            stats = cls.load(path)
+        except ValueError:
+            # Written by an older format version: rebuild instead
+            return None
+        if stats.source is None or not matches_source(csv_path, stats.source):
+            return None
+        return stats
+
+    def has(self, col):
+        return col in self.columns
+
+    def mean(self, col):
+        return self.means[col]
+
+    def max(self, col):
+        return self.maxes[col]
+
+    def percentile_below(self, col, value):
+        """% dòng có giá trị < value (NaN tính vào mẫu số), giống (df[col] < value).mean() * 100."""
+        if self.total == 0 or np.isnan(value):
+            return 0.0
+        return np.searchsorted(self.sorted_values[col], value, side="left") / self.total * 100
+
+    def category_percentage(self, col, value):
+        """% dòng có df[col] == value."""
+        if self.total == 0:
+            return 0.0
+        return self.frequencies.get(col, {}).get(str(value), 0) / self.total * 100
+
+    def save(self, path, source=None):
+        source = source or self.source
+        meta = {
+            "format_version": STATS_FORMAT_VERSION,
+            "total": self.total,
+            "means": self.means,
+            "maxes": self.maxes,
+            "frequencies": self.frequencies,
+            "columns": sorted(self.columns),
+            "numeric_cols": list(self.sorted_values),
+            "source": source,
+        }
+        arrays = {f"num_{i}": values for i, values in enumerate(self.sorted_values.values())}
+        np.savez_compressed(path, meta=np.array(json.dumps(meta)), **arrays)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            meta = json.loads(str(data["meta"]))
+            if meta["format_version"] != STATS_FORMAT_VERSION:
+                raise ValueError(f"Unsupported population stats version: {meta['format_version']}")
+            sorted_values = {col: data[f"num_{i}"] for i, col in enumerate(meta["numeric_cols"])}
+        return cls(meta["total"], sorted_values, meta["means"], meta["maxes"],
+                   meta["frequencies"], meta["columns"], meta.get("source"))
+
+
+class PopulationStatsBuilder:
+    """Cộng dồn PopulationStats qua các chunk; các builder (mỗi process một cái) gộp được với nhau."""
+
+    def __init__(self, numeric_cols=ANALYSIS_NUMERIC_COLS, categorical_cols=ANALYSIS_CATEGORICAL_COLS):
+        self.numeric_cols = list(numeric_cols)
+        self.categorical_cols = list(categorical_cols)
+        self.total = 0
+        self.columns = []
+        self.value_counts = {}   # {col: {float value: count}}, NaN excluded
+        self.frequencies = {}    # {col: {str value: count}}
+
+    def _add_columns(self, columns):
+        self.columns.extend(col for col in columns if col not in self.columns)
+
+    def update(self, df):
+        self.total += len(df)
+        self._add_columns(df.columns)
+        for col in self.numeric_cols:
+            if col in df.columns:
+                values = df[col].to_numpy(dtype=np.float64)
+                uniques, counts = np.unique(values[~np.isnan(values)], return_counts=True)
+                target = self.value_counts.setdefault(col, {})
+                for value, count in zip(uniques.tolist(), counts.tolist()):
+                    target[value] = target.get(value, 0) + count
+        for col in self.categorical_cols:
+            source = source_column(col, df.columns)
+            if source is not None:
+                target = self.frequencies.setdefault(col, {})
+                for value, count in df[source].value_counts(dropna=True).items():
+                    if count:
+                        target[str(value)] = target.get(str(value), 0) + int(count)
+        self._add_columns(self.frequencies)
+        return self
+
+    def merge(self, other):
+        self.total += other.total
+        self._add_columns(other.columns)
+        for attr in ("value_counts", "frequencies"):
+            mine = getattr(self, attr)
+            for col, counts in getattr(other, attr).items():
+                target = mine.setdefault(col, {})
+                for value, count in counts.items():
+                    target[value] = target.get(value, 0) + count
+        return self
+
+    def build(self, source=None):
+        sorted_values, means, maxes = {}, {}, {}
+        for col in self.numeric_cols:
+            if col in self.value_counts:
+                uniques = np.array(sorted(self.value_counts[col]), dtype=np.float64)
+                counts = np.array([self.value_counts[col][v] for v in uniques.tolist()], dtype=np.int64)
+                values = np.repeat(uniques, counts)
+                sorted_values[col] = values
+                means[col] = float(values.mean()) if len(values) else float("nan")
+                maxes[col] = float(values[-1]) if len(values) else float("nan")
+        # Same order as value_counts(): most frequent first
+        frequencies = {col: dict(sorted(counts.items(), key=lambda item: -item[1]))
+                       for col, counts in self.frequencies.items()}
+        return PopulationStats(self.total, sorted_values, means, maxes, frequencies, self.columns, source)
+
+    def to_state(self):
+        """Dạng JSON được (để lần chạy sau chỉ cần cộng thêm phần dữ liệu mới)."""
+        return {
+            "total": self.total,
+            "columns": self.columns,
+            "value_counts": {col: sorted(counts.items()) for col, counts in self.value_counts.items()},
+            "frequencies": self.frequencies,
+        }
+
+    @classmethod
+    def from_state(cls, state, **kwargs):
+        builder = cls(**kwargs)
+        builder.total = state["total"]
+        builder.columns = list(state["columns"])
+        builder.value_counts = {col: {float(v): int(c) for v, c in pairs} for col, pairs in state["value_counts"].items()}
+        builder.frequencies = {col: dict(counts) for col, counts in state["frequencies"].items()}
+        return builder
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Build population statistics for analysis")
+    parser.add_argument("--data", default=CLEAN_DATA_PATH)
+    parser.add_argument("--out", default=POPULATION_STATS_PATH)
+    args = parser.parse_args()
+
+    from dataset_store import source_info
+    PopulationStats.from_csv(args.data).save(args.out, source=source_info(args.data))
+    print(f"Saved {args.out}")
@@ -0,0 +1,364 @@
+"""
+Service HTTP dự đoán, dùng được từ hệ thống khác (không qua Streamlit).
+
+    python prediction_service.py --port 8000 --max-batch-size 64 --max-wait-ms 5
+
+    POST /predict        {"model": "KNN", "profile": {...}}       -> {"model", "prediction", "probability"}
+    POST /predict/bulk   {"model": "KNN", "profiles": [{...}]}    -> {"model", "predictions": [...]}
+    GET  /healthz
+    GET  /metrics        (Prometheus: số batch/dòng của micro-batcher + histogram của tracing)
+
+Micro-batching: request đơn lẻ của một model được đưa vào hàng đợi; một thread gom các
+request tới trong vòng `max_wait_ms` (tính từ request đầu tiên, tối đa `max_batch_size`
+dòng) thành một lần preprocessor.transform + predict, rồi trả kết quả về từng request.
+Model trong `direct_models` (mặc định LR: scorer đã compile chỉ mất vài chục micro giây
+mỗi dòng, rẻ hơn cả một lần transform batch) được tính ngay trên thread của request.
+max_batch_size <= 1 tắt batching: mọi request được xử lý từng cái một.
+"""
+import argparse
+import json
+import math
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import nullcontext
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import tracing
+from fast_lr import get_compiled_lr
+from make_inference import get_estimator, predict_frame
+from model_registry import get_preprocessor, is_available
+from utils import ANALYSIS_NUMERIC_COLS, ID2LABEL, MODEL_INPUT_COLS, MODEL_PATHS
+
+DEFAULT_MODEL = "LR"
+MAX_BATCH_SIZE = 64
+MAX_WAIT_MS = 5.0
+DIRECT_MODELS = ("LR",)
+BULK_CHUNK_SIZE = 10_000
+REQUEST_TIMEOUT = 30.0
+MAX_BODY_BYTES = 64 * 1024 * 1024
+
+_STOP = object()
+
+
+class BadRequest(Exception):
+    pass
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128  # listen backlog; the default of 5 resets bursts of new connections
+
+
+def validate_profile(profile):
+    """
+    Kiểm tra profile trước khi tới model, để input sai là 400 với mọi model (thay vì 500 ở
+    model này, 200 ở model khác): cột số phải là số hữu hạn, cột phân loại phải là chuỗi.
+    """
+    if not isinstance(profile, dict):
+        raise BadRequest("profile must be a JSON object")
+    missing = [col for col in MODEL_INPUT_COLS if col not in profile]
+    if missing:
+        raise BadRequest(f"missing fields: {', '.join(missing)}")
+    invalid = []
+    for col in MODEL_INPUT_COLS:
+        value = profile[col]
+        if col in ANALYSIS_NUMERIC_COLS:
+            # bool is an int subclass, but true/false is not an answer to a numeric question
+            ok = isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value)
+            expected = "a finite number"
+        else:
+            ok = isinstance(value, str)
+            expected = "a string"
+        if not ok:
+            invalid.append(f"{col} must be {expected}, got {json.dumps(value)}")
+    if invalid:
+        raise BadRequest("invalid fields: " + "; ".join(invalid))
+    return profile
+
+
+def predict_rows(model, rows):
+    """[(prediction, probability)] cho một list profile, bằng một lần transform + predict."""
+    import pandas as pd
+
+    labels, proba = predict_frame(get_estimator(model), get_preprocessor(), pd.DataFrame(rows))
+    return [(str(label), float(p)) for label, p in zip(labels, proba)]
+
+
+def predict_one(model, profile):
+    if model == "LR":
+        # Pandas-free compiled path (same result as predict_frame)
+        compiled = get_compiled_lr()
+        return ID2LABEL[f"{compiled.predict_one(profile)}"], compiled.predict_proba_one(profile)
+    return predict_rows(model, [profile])[0]
+
+
+class MicroBatcher:
+    """Gom các request đơn lẻ của một model thành batch, xử lý trên một thread riêng."""
+
+    def __init__(self, model, max_batch_size=MAX_BATCH_SIZE, max_wait_ms=MAX_WAIT_MS):
+        self.model = model
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.batches = 0
+        self.rows = 0
+        self.max_batch_rows = 0
+        self.errors = 0
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name=f"batcher-{model}", daemon=True)
+        self._thread.start()
+
+    def submit(self, rows):
+        """Future của [(prediction, probability)] cho `rows`."""
+        future = Future()
+        self._queue.put((rows, future))
+        return future
+
+    def close(self):
+        self._queue.put(_STOP)
+        self._thread.join()
+
+    def stats(self):
+        with self._lock:
+            return {"batches": self.batches, "rows": self.rows, "max_batch_rows": self.max_batch_rows,
+                    "errors": self.errors}
+
+    def _collect(self):
+        first = self._queue.get()
+        if first is _STOP:
+            return None
+        batch, n_rows = [first], len(first[0])
+        deadline = time.perf_counter() + self.max_wait
+        while n_rows < self.max_batch_size:
+            timeout = deadline - time.perf_counter()
+            if timeout <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            if item is _STOP:
+                # Finish this batch, then stop
+                self._queue.put(_STOP)
+                break
+            batch.append(item)
+            n_rows += len(item[0])
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            if batch is None:
+                return
+            self._predict(batch)
+
+    def _predict(self, batch):
+        rows = [row for item_rows, _ in batch for row in item_rows]
+        try:
+            results = predict_rows(self.model, rows)
+        except Exception as e:
+            if len(batch) > 1:
+                # One bad profile must not fail the other requests of the batch
+                for item in batch:
+                    self._predict([item])
+                return
+            with self._lock:
+                self.errors += 1
+            batch[0][1].set_exception(e)
+            return
+        with self._lock:
+            self.batches += 1
+            self.rows += len(rows)
+            self.max_batch_rows = max(self.max_batch_rows, len(rows))
+        offset = 0
+        for item_rows, future in batch:
+            future.set_result(results[offset:offset + len(item_rows)])
+            offset += len(item_rows)
+
+
+class PredictionService:
+    def __init__(self, host="127.0.0.1", port=8000, max_batch_size=MAX_BATCH_SIZE, max_wait_ms=MAX_WAIT_MS,
+                 direct_models=DIRECT_MODELS, trace=tracing.TRACING):
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self.direct_models = set(direct_models)
+        self.trace = trace
+        self.requests = 0
+        self._batchers = {}
+        self._lock = threading.Lock()
+        self._httpd = _Server((host, port), self._make_handler())
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        self._httpd.serve_forever()
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        for batcher in self._batchers.values():
+            batcher.close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def batcher(self, model):
+        with self._lock:
+            if model not in self._batchers:
+                self._batchers[model] = MicroBatcher(model, self.max_batch_size, self.max_wait_ms)
+            return self._batchers[model]
+
+    def _model(self, request):
+        model = request.get("model", DEFAULT_MODEL)
+        if model not in MODEL_PATHS:
+            raise BadRequest(f"unknown model {model!r}; expected one of {', '.join(MODEL_PATHS)}")
+        if not is_available(model):
+            raise BadRequest(f"model {model!r} is not built; run `python train.py --models {model}`")
+        return model
+
+    def predict(self, request):
+        model = self._model(request)
+        profile = validate_profile(request.get("profile"))
+        if self.max_batch_size <= 1 or model in self.direct_models:
+            with tracing.span("service.predict", model=model):
+                prediction, probability = predict_one(model, profile)
+        else:
+            # Queue wait + batched scoring, as seen by this request
+            with tracing.span("service.batched", model=model):
+                prediction, probability = self.batcher(model).submit([profile]).result(REQUEST_TIMEOUT)[0]
+        return {"model": model, "prediction": prediction, "probability": probability}
+
+    def predict_bulk(self, request):
+        model = self._model(request)
+        profiles = request.get("profiles")
+        if not isinstance(profiles, list):
+            raise BadRequest("profiles must be a JSON array")
+        for profile in profiles:
+            validate_profile(profile)
+        # Already a batch: scored on the request thread in chunks, bypassing the micro-batcher
+        results = []
+        for start in range(0, len(profiles), BULK_CHUNK_SIZE):
+            chunk = profiles[start:start + BULK_CHUNK_SIZE]
+            with tracing.span("service.bulk_chunk", model=model, rows=len(chunk)):
+                results += predict_rows(model, chunk)
+        return {"model": model,
+                "predictions": [{"prediction": p, "probability": prob} for p, prob in results]}
+
+    def metrics_text(self):
+        with self._lock:
+            batchers = dict(self._batchers)
+            requests = self.requests
+        lines = ["# HELP advisor_http_requests_total Prediction requests received.",
+                 "# TYPE advisor_http_requests_total counter",
+                 f"advisor_http_requests_total {requests}"]
+        for name, help_text in [("batches", "Micro-batches scored."), ("rows", "Rows scored by micro-batches."),
+                                ("errors", "Single requests that failed inside the micro-batcher.")]:
+            lines += [f"# HELP advisor_batcher_{name}_total {help_text}",
+                      f"# TYPE advisor_batcher_{name}_total counter"]
+            lines += [f'advisor_batcher_{name}_total{{model="{model}"}} {b.stats()[name]}'
+                      for model, b in sorted(batchers.items())]
+        lines += ["# HELP advisor_batcher_max_batch_rows Largest micro-batch so far.",
+                  "# TYPE advisor_batcher_max_batch_rows gauge"]
+        lines += [f'advisor_batcher_max_batch_rows{{model="{model}"}} {b.stats()["max_batch_rows"]}'
+                  for model, b in sorted(batchers.items())]
+        return "\n".join(lines) + "\n" + tracing.prometheus_text()
+
+    def _make_handler(self):
+        service = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status, body, content_type):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _json(self, status, payload):
+                self._send(status, json.dumps(payload, ensure_ascii=False).encode("utf-8"), "application/json")
+
+            def do_GET(self):
+                if self.path == "/healthz":
+                    self._json(200, {"status": "ok"})
+                elif self.path == "/metrics":
+                    self._send(200, service.metrics_text().encode("utf-8"), "text/plain; version=0.0.4")
+                else:
+                    self._json(404, {"error": f"not found: {self.path}"})
+
+            def do_POST(self):
+                routes = {"/predict": service.predict, "/predict/bulk": service.predict_bulk}
+                handler = routes.get(self.path)
+                length = int(self.headers.get("Content-Length", 0))
+                if length > MAX_BODY_BYTES:
+                    self.close_connection = True
+                    self._json(413, {"error": "request body too large"})
+                    return
+                body = self.rfile.read(length)
+                if handler is None:
+                    self._json(404, {"error": f"not found: {self.path}"})
+                    return
+                with service._lock:
+                    service.requests += 1
+                try:
+                    request = json.loads(body or b"{}")
+                    if not isinstance(request, dict):
+                        raise BadRequest("request body must be a JSON object")
+                    with tracing.trace(f"http{self.path}") if service.trace else nullcontext():
+                        response = handler(request)
+                except (BadRequest, json.JSONDecodeError) as e:
+                    self._json(400, {"error": str(e)})
+                    return
+                except Exception as e:
+                    self._json(500, {"error": f"{type(e).__name__}: {e}"})
+                    return
+                try:
+                    self._json(200, response)
+                except ConnectionError:
+                    self.close_connection = True
+
+        return Handler
+
+
+if __name__ == "__main__":
+    from model_registry import preload_all
+
+    parser = argparse.ArgumentParser(description="HTTP prediction service with micro-batching")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--max-batch-size", type=int, default=MAX_BATCH_SIZE,
+                        help="Số dòng tối đa mỗi micro-batch (<= 1: xử lý từng request một)")
+    parser.add_argument("--max-wait-ms", type=float, default=MAX_WAIT_MS,
+                        help="Thời gian chờ gom batch, tính từ request đầu tiên")
+    parser.add_argument("--direct-models", nargs="*", default=list(DIRECT_MODELS), choices=list(MODEL_PATHS),
+                        help="Model luôn được tính ngay, không qua micro-batcher")
+    parser.add_argument("--trace", action="store_true", default=tracing.TRACING,
+                        help="Trace từng request (histogram theo stage trong /metrics)")
+    args = parser.parse_args()
+
+    preload_all()
+    service = PredictionService(args.host, args.port, args.max_batch_size, args.max_wait_ms,
+                                args.direct_models, args.trace)
+    print(f"listening on {service.base_url}", flush=True)
+    try:
+        service.serve_forever()
+    except KeyboardInterrupt:
+        pass
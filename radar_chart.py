@@ -0,0 +1,160 @@
+"""
+Biểu đồ radar "Bạn vs Cộng đồng" cho analyze_user_vs_population.
+
+Lớp cộng đồng (trung bình, lưới, nhãn, legend) giống nhau cho mọi user nên chỉ
+được vẽ một lần vào một template Agg cho mỗi ngôn ngữ; mỗi request chỉ khôi phục
+nền đã cache và vẽ thêm polygon của user. Figure được tạo bằng API hướng đối
+tượng (không qua pyplot) nên không bị giữ lại trong danh sách figure toàn cục.
+
+Ba dạng đầu ra:
+    - create_figure(): Figure matplotlib mới (tương thích code cũ, st.pyplot)
+    - render_png(): PNG bytes, cache LRU theo input
+    - spec(): dict JSON nhẹ để frontend tự vẽ
+"""
+import io
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+from utils import ANALYSIS_NUMERIC_COLS
+
+USER_COLOR = '#3b82f6'
+POP_COLOR = '#ef4444'
+
+
+class RadarChart:
+    def __init__(self, stats, categories=ANALYSIS_NUMERIC_COLS, png_cache_size=1024, dpi=100):
+        self.categories = list(categories)
+        self.pop_means = [stats.mean(col) for col in self.categories]
+        self.max_vals = [stats.max(col) for col in self.categories]
+        self.pop_norm = self.normalize(self.pop_means)
+        self.angles = [n / float(len(self.categories)) * 2 * 3.14159 for n in range(len(self.categories))]
+        self.dpi = dpi
+
+        self._templates = {}
+        self._png_cache = OrderedDict()
+        self._png_cache_size = png_cache_size
+        self._lock = threading.Lock()
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def normalize(self, values):
+        # Normalize values to 0-10 scale for better visualization
+        return [values[i] / self.max_vals[i] * 10 if self.max_vals[i] > 0 else 0 for i in range(len(values))]
+
+    def user_norm(self, user_input):
+        return self.normalize([float(user_input[col]) for col in self.categories])
+
+    def _closed(self, values):
+        return self.angles + self.angles[:1], list(values) + list(values[:1])
+
+    def _draw(self, fig, you_label, avg_label, user_norm=None, animated_user=False):
+        ax = fig.add_subplot(111, polar=True)
+        ax.set_facecolor('#fafbfc')
+
+        angles, pop = self._closed(self.pop_norm)
+        _, user = self._closed(user_norm if user_norm is not None else [0] * len(self.categories))
+
+        # Plot with better styling
+        user_line, = ax.plot(angles, user, linewidth=2.5, linestyle='solid', label=you_label, color=USER_COLOR,
+                             marker='o', markersize=6, animated=animated_user)
+        ax.plot(angles, pop, linewidth=2.5, linestyle='solid', label=avg_label, color=POP_COLOR, marker='s',
+                markersize=6)
+        user_fill, = ax.fill(angles, user, color=USER_COLOR, alpha=0.15, animated=animated_user)
+        ax.fill(angles, pop, color=POP_COLOR, alpha=0.15)
+
+        # Styling
+        ax.set_ylim(0, 10)
+        ax.set_xticks(angles[:-1])
+        ax.set_xticklabels(self.categories, size=10, weight='bold', color='#374151')
+        ax.set_yticks([2, 4, 6, 8, 10])
+        ax.set_yticklabels(['2', '4', '6', '8', '10'], size=9, color='#6b7280')
+        ax.grid(color='#d1d5db', linestyle='--', linewidth=0.7, alpha=0.7)
+        ax.spines['polar'].set_color('#9ca3af')
+        ax.spines['polar'].set_linewidth(1.5)
+
+        ax.legend(loc='upper right', bbox_to_anchor=(1.15, 1.1), frameon=True, shadow=True, fontsize=11)
+        fig.tight_layout()
+        return ax, user_line, user_fill
+
+    def create_figure(self, user_input, you_label="You", avg_label="Community Avg"):
+        """Figure mới, độc lập với pyplot: được thu hồi khi không còn tham chiếu."""
+        fig = Figure(figsize=(8, 8), facecolor='white')
+        FigureCanvasAgg(fig)
+        self._draw(fig, you_label, avg_label, user_norm=self.user_norm(user_input))
+        return fig
+
+    def spec(self, user_input, you_label="You", avg_label="Community Avg"):
+        return {
+            "type": "radar",
+            "categories": self.categories,
+            "scale": [0, 10],
+            "series": [
+                {"name": you_label, "values": self.user_norm(user_input),
+                 "raw": [float(user_input[col]) for col in self.categories], "color": USER_COLOR},
+                {"name": avg_label, "values": self.pop_norm, "raw": self.pop_means, "color": POP_COLOR},
+            ],
+        }
+
+    def _template(self, you_label, avg_label):
+        key = (you_label, avg_label)
+        template = self._templates.get(key)
+        if template is None:
+            fig = Figure(figsize=(8, 8), facecolor='white', dpi=self.dpi)
+            canvas = FigureCanvasAgg(fig)
+            ax, user_line, user_fill = self._draw(fig, you_label, avg_label, animated_user=True)
+            # Static population layer rendered once; animated user artists are skipped here
+            canvas.draw()
+            template = {
+                "canvas": canvas,
+                "ax": ax,
+                "background": canvas.copy_from_bbox(fig.bbox),
+                "user_line": user_line,
+                "user_fill": user_fill,
+            }
+            self._templates[key] = template
+        return template
+
+    def render_png(self, user_input, you_label="You", avg_label="Community Avg"):
+        from PIL import Image
+
+        user_norm = self.user_norm(user_input)
+        key = (you_label, avg_label, tuple(round(v, 9) for v in user_norm))
+        with self._lock:
+            png = self._png_cache.get(key)
+            if png is not None:
+                self._png_cache.move_to_end(key)
+                self.cache_hits += 1
+                return png
+            self.cache_misses += 1
+
+            template = self._template(you_label, avg_label)
+            canvas, ax = template["canvas"], template["ax"]
+            angles, user = self._closed(user_norm)
+            canvas.restore_region(template["background"])
+            template["user_fill"].set_xy(list(zip(angles, user)))
+            template["user_line"].set_data(angles, user)
+            ax.draw_artist(template["user_fill"])
+            ax.draw_artist(template["user_line"])
+
+            buf = io.BytesIO()
+            Image.fromarray(np.asarray(canvas.buffer_rgba())).save(buf, format="PNG", compress_level=1)
+            png = buf.getvalue()
+
+            self._png_cache[key] = png
+            if len(self._png_cache) > self._png_cache_size:
+                self._png_cache.popitem(last=False)
+        return png
+
+    def clear_cache(self):
+        """Bỏ các PNG đã memo; template (lớp cộng đồng) vẫn được giữ."""
+        with self._lock:
+            self._png_cache.clear()
+
+    def cache_stats(self):
+        return {"hits": self.cache_hits, "misses": self.cache_misses, "entries": len(self._png_cache),
+                "templates": len(self._templates)}
+
@@ -0,0 +1,144 @@
+"""
+Score một file CSV/JSONL lớn theo từng chunk, song song trên nhiều process.
+
+    python score_file.py input.csv output.csv --model LR --chunk-size 50000 --workers 4
+
+Mỗi chunk được đọc lười (pandas chunked reader), gửi cho process pool và kết quả
+được ghi ngay ra file output. Số chunk đang xử lý bị giới hạn nên bộ nhớ không
+phụ thuộc vào kích thước input.
+"""
+import argparse
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import pandas as pd
+
+from make_inference import get_estimator, iter_input_chunks, predict_frame
+from model_registry import get_preprocessor
+
+
+def _init_worker(model):
+    # Warm the registry of each worker once instead of on the first chunk
+    get_preprocessor()
+    get_estimator(model)
+
+
+def _score_chunk(model, start, chunk):
+    labels, proba = predict_frame(get_estimator(model), get_preprocessor(), chunk)
+    return pd.DataFrame({
+        "row_id": range(start, start + len(chunk)),
+        "prediction": labels,
+        "probability": proba
+    })
+
+
+class _ResultWriter:
+    def __init__(self, path):
+        self.path = path
+        self.jsonl = path.endswith((".jsonl", ".json"))
+        self._first = True
+        # Truncate once; every chunk is appended afterwards
+        open(path, "w").close()
+
+    def write(self, result):
+        if self.jsonl:
+            with open(self.path, "a", encoding="utf-8") as f:
+                result.to_json(f, orient="records", lines=True)
+        else:
+            result.to_csv(self.path, mode="a", header=self._first, index=False)
+        self._first = False
+
+
+class _Progress:
+    def __init__(self, every_seconds=1.0, stream=sys.stderr):
+        self.start = time.perf_counter()
+        self.last = self.start
+        self.every_seconds = every_seconds
+        self.stream = stream
+        self.rows = 0
+
+    def update(self, n, force=False):
+        self.rows += n
+        now = time.perf_counter()
+        if force or now - self.last >= self.every_seconds:
+            self.last = now
+            elapsed = now - self.start
+            rate = self.rows / elapsed if elapsed > 0 else 0.0
+            print(f"\rscored {self.rows:,} rows | {elapsed:7.1f}s | {rate:,.0f} rows/sec",
+                  end="", file=self.stream, flush=True)
+
+    def finish(self):
+        self.update(0, force=True)
+        print(file=self.stream)
+        return time.perf_counter() - self.start
+
+
+def score_file(input_path, output_path, model="LR", chunk_size=50_000, workers=None,
+               ordered=True, max_pending=None, progress=True):
+    """
+    Score input_path và ghi kết quả (row_id, prediction, probability) ra output_path.
+    ordered=False ghi chunk nào xong trước thì ghi trước (row_id vẫn giữ vị trí gốc).
+    Trả về dict thống kê: rows, seconds, rows_per_sec.
+    """
+    workers = workers or os.cpu_count() or 1
+    max_pending = max_pending or workers * 2
+    writer = _ResultWriter(output_path)
+    tracker = _Progress() if progress else None
+
+    pending = deque()
+    total = 0
+    start_time = time.perf_counter()
+
+    def drain(block_all=False):
+        nonlocal total
+        if ordered:
+            while pending and (block_all or len(pending) >= max_pending or pending[0].done()):
+                result = pending.popleft().result()
+                writer.write(result)
+                total += len(result)
+                if tracker:
+                    tracker.update(len(result))
+        else:
+            while pending and (block_all or len(pending) >= max_pending):
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    pending.remove(future)
+                    result = future.result()
+                    writer.write(result)
+                    total += len(result)
+                    if tracker:
+                        tracker.update(len(result))
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(model,)) as pool:
+        offset = 0
+        for chunk in iter_input_chunks(input_path, chunk_size):
+            pending.append(pool.submit(_score_chunk, model, offset, chunk))
+            offset += len(chunk)
+            drain()
+        drain(block_all=True)
+
+    seconds = tracker.finish() if tracker else time.perf_counter() - start_time
+    return {"rows": total, "seconds": seconds, "rows_per_sec": total / seconds if seconds > 0 else 0.0}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Streaming batch scoring for student profiles")
+    parser.add_argument("input", help="CSV hoặc JSONL (cột như data/clean_df.csv)")
+    parser.add_argument("output", help="File kết quả (.csv hoặc .jsonl)")
+    parser.add_argument("--model", default="LR", choices=["LR", "KNN", "RF"])
+    parser.add_argument("--chunk-size", type=int, default=50_000)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--unordered", action="store_true", help="Ghi kết quả theo thứ tự hoàn thành")
+    parser.add_argument("--quiet", action="store_true")
+    args = parser.parse_args(argv)
+
+    stats = score_file(args.input, args.output, model=args.model, chunk_size=args.chunk_size,
+                       workers=args.workers, ordered=not args.unordered, progress=not args.quiet)
+    print(f"{stats['rows']:,} rows in {stats['seconds']:.2f}s ({stats['rows_per_sec']:,.0f} rows/sec)")
+
+
+if __name__ == "__main__":
+    main()
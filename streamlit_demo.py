@@ -1,15 +1,17 @@
 import streamlit as st
 import streamlit.components.v1 as components
-import pandas as pd
-import pickle
 import os
+import threading
 from dotenv import load_dotenv
-import time
 
-# Import custom modules
-from integrate_llm import chat_llm
-from analysis import analyze_user_vs_population
-from make_inference import make_inference
+# Import custom modules (all light: pandas, matplotlib, sklearn and langchain load on first use)
+from analysis import chart_labels, format_report
+from memo import input_key
+from submit_pipeline import format_timings, start_submit
+import tracing
+from model_registry import available_models, preload_all
+from peer_cube import PeerCube
+from population_stats import PopulationStats
 
 # 1. Load environment variables
 load_dotenv()
@@ -63,17 +65,69 @@ st.markdown("""
 
 
 # --- LOAD DATASET ---
+# Nothing below reads data at startup: dataset, stats, radar chart and peer cube are
+# built on the first submit, so the form renders as soon as Streamlit is up
 @st.cache_data
 def load_data():
+    import pandas as pd
+
+    from dataset_store import load_dataset
+
     try:
-        df = pd.read_csv("data/clean_df.csv")
+        # data/clean_df.parquet when it is up to date, else the CSV (same dtypes either way)
+        df = load_dataset("data/clean_df.csv")
         return df
     except FileNotFoundError:
         st.error("Data file 'data/clean_df.csv' not found.")
         return pd.DataFrame()
 
 
-df = load_data()
+# --- WARM MODELS ---
+# Unpickle the preprocessor and every model once per server process, in the background while
+# the user fills in the form; a prediction made before it finishes waits on the registry lock
+@st.cache_resource
+def warm_models():
+    thread = threading.Thread(target=preload_all, name="warm-models", daemon=True)
+    thread.start()
+    return thread
+
+
+warm_models()
+
+
+# --- POPULATION STATS ---
+# Sorted columns + frequency tables built once, so each analysis is lookups instead of scans
+@st.cache_resource
+def load_population_stats():
+    # data/population_stats.npz (written by clean_data.py) while it matches data/clean_df.csv
+    return PopulationStats.load_fresh() or PopulationStats.from_dataframe(load_data())
+
+
+# --- RADAR CHART ---
+# Population layer drawn once per language; each submit only adds the user polygon (PNG, cached by input)
+@st.cache_resource
+def load_radar_chart():
+    from radar_chart import RadarChart
+    return RadarChart(load_population_stats())
+
+
+# --- PEER CUBE ---
+@st.cache_resource
+def load_peer_cube():
+    # data/peer_cube.npz (written by clean_data.py) while it matches data/clean_df.csv
+    return PeerCube.load_fresh() or PeerCube.build(load_data())
+
+
+PEER_SEGMENTS = ["Degree", "Gender", "Sleep Duration"]
+
+
+def localize_results(lang_code):
+    """Report text và biểu đồ theo ngôn ngữ mới, dựng lại từ số liệu đã lưu (không tính lại so sánh)."""
+    st.session_state.report_text = format_report(st.session_state.comparison_data, lang_code)
+    # RadarChart keeps the PNG per (labels, input), so toggling back and forth is a cache hit
+    st.session_state.fig = load_radar_chart().render_png(st.session_state.user_input, *chart_labels(lang_code))
+    st.session_state.result_language = lang_code
+
 
 # --- SESSION STATE INITIALIZATION ---
 if 'analysis_done' not in st.session_state:
@@ -86,8 +140,21 @@ if 'comparison_data' not in st.session_state:
     st.session_state.comparison_data = None
 if 'fig' not in st.session_state:
     st.session_state.fig = None
+if 'user_input' not in st.session_state:
+    st.session_state.user_input = None
 if 'advice' not in st.session_state:
     st.session_state.advice = ""
+if 'advice_pending' not in st.session_state:
+    st.session_state.advice_pending = False
+if 'advice_metrics' not in st.session_state:
+    st.session_state.advice_metrics = None
+if 'trace' not in st.session_state:
+    st.session_state.trace = None
+# Language the stored report/chart are rendered in, and the input of the last submit
+if 'result_language' not in st.session_state:
+    st.session_state.result_language = None
+if 'submit_key' not in st.session_state:
+    st.session_state.submit_key = None
 
 # --- TEXT RESOURCES ---
 TEXT = {
@@ -106,7 +173,10 @@ TEXT = {
         "loading_pred": "Running prediction model...",
         "model_select": "Select Model",
         "models": {"Random Forest": "RF", "Logistic Regression": "LR", "K-Nearest Neighbors": "KNN"},
+        "models_missing": "Not built on this machine: {models}. Run `python train.py --models {codes}` to enable.",
         "sidebar_info": "This application uses AI to analyze your mental health status based on academic and lifestyle factors.",
+        "debug_toggle": "Debug timings",
+        "debug_title": "🔧 Debug: stage timings",
         "headers": {
             "personal": "Personal Info",
             "lifestyle": "Lifestyle",
@@ -140,6 +210,10 @@ TEXT = {
             "categorical_title": "Categorical Insights",
             "vs_avg": "vs Avg",
             "shared_by": "Shared by",
+            "peer_title": "Compared With Your Peers",
+            "peer_select": "Compare with students of the same",
+            "peer_size": "peers",
+            "fallback_note": "The AI consultant was too slow or unavailable, so these are quick tips based on your results.",
             "submit_prompt": "Please submit your profile in the 'Input Profile' tab first."
         },
         "metric_names": {
@@ -180,7 +254,10 @@ TEXT = {
         "loading_pred": "Đang chạy mô hình dự đoán...",
         "model_select": "Chọn Mô hình",
         "models": {"Random Forest": "RF", "Logistic Regression": "LR", "K-Nearest Neighbors": "KNN"},
+        "models_missing": "Chưa có trên máy này: {models}. Chạy `python train.py --models {codes}` để bật.",
         "sidebar_info": "Ứng dụng này sử dụng AI để phân tích tình trạng sức khỏe tinh thần của bạn dựa trên các yếu tố học tập và lối sống.",
+        "debug_toggle": "Hiển thị thời gian xử lý",
+        "debug_title": "🔧 Debug: thời gian từng bước",
         "headers": {
             "personal": "Thông tin Cá nhân",
             "lifestyle": "Lối sống",
@@ -214,6 +291,10 @@ TEXT = {
             "categorical_title": "Thông tin Định danh",
             "vs_avg": "so với TB",
             "shared_by": "Chia sẻ bởi",
+            "peer_title": "So sánh với Bạn cùng Nhóm",
+            "peer_select": "So sánh với sinh viên cùng",
+            "peer_size": "sinh viên",
+            "fallback_note": "Trợ lý AI đang phản hồi chậm hoặc không khả dụng, đây là các gợi ý nhanh dựa trên kết quả của bạn.",
             "submit_prompt": "Vui lòng nhập hồ sơ ở tab 'Nhập Hồ sơ' trước."
         },
         "metric_names": {
@@ -256,12 +337,21 @@ with st.sidebar:
 
     language = st.selectbox("Language / Ngôn ngữ", ["English", "Tiếng Việt"])
     t = TEXT[language]
+    lang_code = "en" if language == "English" else "vi"
 
-    # Model Selection
-    model_name = st.selectbox(t["model_select"], list(t["models"].keys()))
+    # Model Selection: only offer models that can actually be loaded (RF.pkl is not committed)
+    available = set(available_models())
+    model_name = st.selectbox(t["model_select"], [name for name, code in t["models"].items() if code in available])
     model_code = t["models"][model_name]
+    missing = [name for name, code in t["models"].items() if code not in available]
+    if missing:
+        st.caption(t["models_missing"].format(models=", ".join(missing),
+                                              codes=" ".join(t["models"][name] for name in missing)))
     st.session_state.model_code = model_code
 
+    # Per-session: only submits made with this on are traced
+    debug_timings = st.checkbox(t["debug_toggle"], value=tracing.TRACING, key="debug_timings")
+
     st.info(t["sidebar_info"])
     st.markdown("---")
     st.caption("© 2025 Student Health Project")
@@ -379,37 +469,49 @@ with tab1:
                 'Family History of Mental Illness': yes_no_map[fam_hist]
             }
 
-            # 1. Analysis
-            # Note: We need to map keys to match what analysis.py expects if they differ.
-            # Based on reading analysis.py, it expects keys like 'Suicidal Thoughts' but input might be different.
-            # Let's normalize keys for analysis.py
+            # analysis reads the suicidal-thoughts answer from the dataset column and reports it as 'Suicidal Thoughts'
             analysis_input = user_input.copy()
-            analysis_input['Suicidal Thoughts'] = yes_no_map[suicidal]
-
-            lang_code = "en" if language == "English" else "vi"
-            report_text, fig, comparison_data = analyze_user_vs_population(analysis_input, df, language=lang_code)
-
-            st.session_state.report_text = report_text
-            st.session_state.fig = fig
-            st.session_state.comparison_data = comparison_data
-
-            # 2. Prediction
-            # Map inputs to model expected format
-            # Note: make_inference expects specific feature names.
-            # We'll assume make_inference handles the mapping or we pass the raw dict.
-            # Let's look at make_inference usage in streamlit_demo.py... it just passes user_input.
-            # We need to ensure keys match what the model expects.
-            # For now, we pass user_input.
 
             # Fix key for suicidal thoughts which often has weird spacing in datasets
             user_input['Have you ever had suicidal thoughts ?'] = yes_no_map[suicidal]
 
-            # Use selected model
-            selected_model = st.session_state.get('model_code', 'RF')
-            pred_result = make_inference(selected_model, user_input)
-            st.session_state.prediction_result = pred_result  # 3. LLM Advice
-            advice = chat_llm(report_text, str(pred_result), language=lang_code)
-            st.session_state.advice = advice
+            selected_model = st.session_state.get('model_code', 'LR')
+            submit_key = input_key(dict(analysis_input, model=selected_model, language=lang_code))
+            # Same profile, model and language as the last finished submit: every result is
+            # still in session_state, so only the tab switch below runs
+            repeat = (submit_key == st.session_state.submit_key and st.session_state.analysis_done
+                      and not st.session_state.advice_pending)
+
+            if not repeat:
+                trace = tracing.Trace("submit", model=selected_model, language=lang_code) if debug_timings else None
+                st.session_state.trace = trace
+
+                with tracing.activate(trace):
+                    # Analysis, prediction and chart run in parallel; the LLM starts as soon as the
+                    # report and prediction are ready and streams into the AI Consultant tab.
+                    # Comparison numbers, prediction and chart PNG are memoized by input.
+                    with tracing.span("ui.load_resources"):
+                        stats, renderer = load_population_stats(), load_radar_chart()
+                    run = start_submit(analysis_input, user_input, selected_model, lang_code, stats, renderer=renderer)
+
+                    # 1. Analysis
+                    with tracing.span("ui.wait_report"):
+                        report_text, comparison_data = run.report()
+                    st.session_state.report_text = report_text
+                    st.session_state.comparison_data = comparison_data
+                    st.session_state.user_input = analysis_input
+                    st.session_state.fig = None  # filled from run.chart() by the dashboard
+                    st.session_state.result_language = lang_code
+
+                    # 2. Prediction
+                    with tracing.span("ui.wait_prediction"):
+                        st.session_state.prediction_result = run.prediction()
+
+                # 3. LLM advice (already generating in the background)
+                st.session_state.submit_run = run
+                st.session_state.advice = ""
+                st.session_state.advice_pending = True
+                st.session_state.submit_key = submit_key
 
             st.session_state.analysis_done = True
 
@@ -435,7 +537,12 @@ with tab2:
         col_chart, col_stats = st.columns([1, 1])
 
         with col_chart:
-            st.pyplot(st.session_state.fig)
+            if st.session_state.fig is None and st.session_state.get('submit_run') is not None:
+                with tracing.activate(st.session_state.trace), tracing.span("ui.wait_chart"):
+                    st.session_state.fig = st.session_state.submit_run.chart()
+            if st.session_state.result_language != lang_code:
+                localize_results(lang_code)
+            st.image(st.session_state.fig, use_container_width=True)
 
         with col_stats:
             st.markdown(f"#### {t['dashboard']['metrics_title']}")
@@ -478,6 +585,27 @@ with tab2:
                     st.info(f"{display_value}")
                     st.caption(f"{t['dashboard']['shared_by']} {item['percentage']:.1f}%")
 
+        # Peer comparison from the precomputed cube (no DataFrame filtering per request)
+        if st.session_state.user_input:
+            st.markdown(f"### 👥 {t['dashboard']['peer_title']}")
+            peer_col = st.selectbox(t["dashboard"]["peer_select"], PEER_SEGMENTS,
+                                    format_func=lambda c: t["metric_names"].get(c, c), key="peer_segment")
+            peer = load_peer_cube().compare(st.session_state.user_input, peer_col)
+            if peer:
+                st.caption(f"{peer['size']:,} {t['dashboard']['peer_size']}")
+                peer_cols = st.columns(3)
+                for i, item in enumerate(peer['numerical']):
+                    with peer_cols[i % 3]:
+                        metric_name = t["metric_names"].get(item['metric'], item['metric'])
+                        st.metric(
+                            label=metric_name,
+                            value=f"{item['user']}",
+                            delta=f"{item['user'] - item['avg']:.2f} {t['dashboard']['vs_avg']}",
+                            delta_color="inverse" if item['metric'] in ['Financial Stress',
+                                                                        'Academic Pressure'] else "normal"
+                        )
+                        st.caption(f"{t['percentile']} {item['percentile']:.1f}%")
+
 # --- TAB 3: AI CONSULTANT ---
 with tab3:
     if not st.session_state.analysis_done:
@@ -498,7 +626,26 @@ with tab3:
 
         with col_advice:
             st.markdown(f"### {t['advice_card']}")
-            st.markdown(st.session_state.advice)
+            if st.session_state.advice_pending:
+                # Render chunks as they arrive; write_stream returns the full text for download
+                run = st.session_state.submit_run
+                with tracing.activate(st.session_state.trace), tracing.span("ui.advice_stream"):
+                    st.session_state.advice = st.write_stream(run.advice_stream())
+                st.session_state.advice_metrics = run.llm_metrics
+                st.session_state.submit_timings = run.timings()
+                st.session_state.advice_pending = False
+                if st.session_state.trace is not None:
+                    st.session_state.trace.finish()
+            else:
+                st.markdown(st.session_state.advice)
+
+            metrics = st.session_state.advice_metrics
+            if metrics and metrics.get("source") == "fallback":
+                st.caption(t["dashboard"]["fallback_note"])
+            elif metrics and metrics["time_to_first_token"] is not None:
+                st.caption(f"TTFT {metrics['time_to_first_token']:.2f}s · total {metrics['total_time']:.2f}s")
+            if st.session_state.get('submit_timings'):
+                st.caption(format_timings(st.session_state.submit_timings))
 
             st.download_button(
                 label=t["results"]["download_btn"],
@@ -507,3 +654,14 @@ with tab3:
                 mime="text/plain"
             )
 
+        # Collapsible per-stage timings of the last submit (sidebar "Debug timings")
+        trace = st.session_state.trace
+        if trace is not None and trace.duration is not None:
+            with st.expander(t["debug_title"], expanded=False):
+                st.caption(f"trace {trace.id} · total {trace.duration * 1e3:.0f} ms")
+                st.dataframe(trace.table(), use_container_width=True, hide_index=True)
+                col_jsonl, col_prom = st.columns(2)
+                col_jsonl.download_button("JSON lines", trace.to_json() + "\n", file_name=f"trace-{trace.id}.jsonl",
+                                          mime="application/x-ndjson")
+                col_prom.download_button("Prometheus", tracing.prometheus_text(), file_name="metrics.prom",
+                                         mime="text/plain")
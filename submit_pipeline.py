@@ -0,0 +1,209 @@
+"""
+Chạy song song các bước khi bấm "Analyze Profile".
+
+    report      analyze_user_vs_population (chỉ số + text, không vẽ)   ┐
+    prediction  cached_inference (make_inference)                      ├─► llm (stream_advice_with_deadline)
+    chart       analyze_user_vs_population(chart="png")                ┘   (không phụ thuộc chart)
+
+report, prediction và chart bắt đầu cùng lúc trên một thread pool; LLM được
+khởi động ngay khi report và prediction xong (callback, không chiếm thread để
+chờ), nên việc vẽ biểu đồ chồng lên thời gian sinh lời khuyên. Các đoạn text của
+LLM được giữ lại theo thứ tự nhận, nên UI hiển thị dần và một rerun của Streamlit đọc lại
+từ đầu mà không mất đoạn nào. Nếu LLM không trả token đầu tiên
+trong `advice_budget` giây (hoặc lỗi), lời khuyên theo luật được dùng thay thế.
+Prompt dùng báo cáo rút gọn (compact_report) thay cho report_text đầy đủ.
+
+Số liệu so sánh (analysis.compare_user_vs_population), dự đoán (cached_inference) và
+PNG biểu đồ (RadarChart) đều được memo theo hash chuẩn hóa của input, nên submit lại
+cùng hồ sơ, hoặc cùng hồ sơ với ngôn ngữ khác, chỉ còn bước dựng text theo ngôn ngữ.
+"""
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from analysis import analyze_user_vs_population
+from compact_report import REPORT_FORMAT, llm_report_text
+from integrate_llm import ADVICE_BUDGET, stream_advice_with_deadline
+from make_inference import make_inference
+from memo import LRUCache, input_key
+from tracing import bind, span
+from utils import ANALYSIS_NUMERIC_COLS, MODEL_INPUT_COLS, MODEL_PATHS, PREPROCESSOR_PATH
+
+PREDICTION_CACHE_SIZE = 4096
+_executor = None
+_executor_lock = threading.Lock()
+
+
+_predictions = LRUCache(PREDICTION_CACHE_SIZE)
+
+
+def _model_version(model_code):
+    # A retrained model (new mtime/size) must not be answered from the memo
+    version = []
+    for path in (MODEL_PATHS[model_code], PREPROCESSOR_PATH):
+        try:
+            st = os.stat(path)
+            version.append((st.st_mtime_ns, st.st_size))
+        except OSError:
+            version.append(None)
+    return tuple(version)
+
+
+def cached_inference(model_code, model_input):
+    """make_inference, memo theo (model, phiên bản file model, hash chuẩn hóa của input)."""
+    key = (model_code, _model_version(model_code), input_key(model_input, ANALYSIS_NUMERIC_COLS, MODEL_INPUT_COLS))
+    with span("inference.memo") as sp:
+        prediction = _predictions.get(key)
+        sp.set(cached=prediction is not None)
+    if prediction is None:
+        prediction = _predictions.put(key, make_inference(model_code, model_input))
+    return prediction
+
+
+def cache_stats():
+    return {"predictions": _predictions.stats()}
+
+
+def clear_cache():
+    _predictions.clear()
+
+
+def get_executor(max_workers=16):
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="submit")
+    return _executor
+
+
+class SubmitRun:
+    def __init__(self, analysis_input, model_input, model_code, language, stats, renderer=None,
+                 llm=None, use_cache=True, executor=None, advice_budget=ADVICE_BUDGET,
+                 report_format=REPORT_FORMAT):
+        self.language = language
+        self.llm_metrics = {}
+        self._executor = executor or get_executor()
+        self._t0 = time.perf_counter()
+        self._timings = {}
+        self._timings_lock = threading.Lock()
+        # Advice chunks received so far; readers replay them and wait on the condition for more
+        self._advice_parts = []
+        self._advice_done = False
+        self._advice_cond = threading.Condition()
+        self._llm_args = (llm, use_cache, advice_budget, report_format)
+
+        # Stages run on pool threads; bind() keeps their spans in the caller's trace (if any)
+        self._run_llm_traced = bind(self._run_llm)
+        self._report = self._executor.submit(
+            bind(self._timed), "report", analyze_user_vs_population, analysis_input,
+            language=language, stats=stats, chart=None)
+        self._prediction = self._executor.submit(
+            bind(self._timed), "prediction", cached_inference, model_code, model_input)
+        self._chart = self._executor.submit(
+            bind(self._timed), "chart", analyze_user_vs_population, analysis_input,
+            language=language, stats=stats, chart="png", renderer=renderer)
+
+        # Start the LLM as soon as both of its inputs are ready
+        self._pending_inputs = 2
+        self._report.add_done_callback(self._input_ready)
+        self._prediction.add_done_callback(self._input_ready)
+
+    def _mark(self, stage, start, end):
+        with self._timings_lock:
+            self._timings[stage] = {"start": start - self._t0, "end": end - self._t0, "duration": end - start}
+
+    def _timed(self, stage, fn, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            with span(f"submit.{stage}"):
+                return fn(*args, **kwargs)
+        finally:
+            self._mark(stage, start, time.perf_counter())
+
+    def _input_ready(self, _future):
+        with self._timings_lock:
+            self._pending_inputs -= 1
+            ready = self._pending_inputs == 0
+        if ready:
+            if self._report.exception() or self._prediction.exception():
+                # Nothing to advise on; the UI surfaces the original error from report()/prediction()
+                self._finish_advice()
+                return
+            self._executor.submit(self._run_llm_traced)
+
+    def _run_llm(self):
+        llm, use_cache, budget, report_format = self._llm_args
+        report_text, _, comparison_data = self._report.result()
+        prompt_report = llm_report_text(report_text, comparison_data, self.language, report_format)
+        start = time.perf_counter()
+        try:
+            with span("submit.llm", report_format=report_format):
+                for chunk in stream_advice_with_deadline(prompt_report, str(self._prediction.result()),
+                                                         comparison_data, language=self.language, budget=budget,
+                                                         llm=llm, use_cache=use_cache, metrics=self.llm_metrics):
+                    with self._advice_cond:
+                        self._advice_parts.append(chunk)
+                        self._advice_cond.notify_all()
+        finally:
+            end = time.perf_counter()
+            self._mark("llm", start, end)
+            if self.llm_metrics.get("time_to_first_token") is not None:
+                first = start + self.llm_metrics["time_to_first_token"]
+                self._mark("llm_first_token", start, first)
+            self._finish_advice()
+
+    def _finish_advice(self):
+        with self._advice_cond:
+            self._advice_done = True
+            self._advice_cond.notify_all()
+
+    def report(self):
+        """(report_text, comparison_data), chờ nếu chưa xong."""
+        report_text, _, comparison_data = self._report.result()
+        return report_text, comparison_data
+
+    def prediction(self):
+        return self._prediction.result()
+
+    def chart(self):
+        return self._chart.result()[1]
+
+    def advice_stream(self):
+        """
+        Yield các đoạn lời khuyên theo thứ tự nhận được, từ đoạn đầu tiên. Gọi lại bao nhiêu lần
+        cũng được (kể cả song song, hay khi rerun cắt ngang lần đọc trước): các đoạn đã nhận được
+        phát lại trước, rồi mới chờ đoạn mới.
+        """
+        index = 0
+        while True:
+            with self._advice_cond:
+                self._advice_cond.wait_for(lambda: index < len(self._advice_parts) or self._advice_done)
+                if index == len(self._advice_parts):
+                    return
+                chunk = self._advice_parts[index]
+            index += 1
+            yield chunk
+
+    def advice(self):
+        return "".join(self.advice_stream())
+
+    def timings(self):
+        with self._timings_lock:
+            timings = dict(self._timings)
+        if timings:
+            timings["total"] = {"start": 0.0, "end": max(v["end"] for v in timings.values()),
+                                "duration": max(v["end"] for v in timings.values())}
+        return timings
+
+
+def start_submit(analysis_input, model_input, model_code, language, stats, renderer=None, llm=None,
+                 use_cache=True, executor=None, advice_budget=ADVICE_BUDGET, report_format=REPORT_FORMAT):
+    return SubmitRun(analysis_input, model_input, model_code, language, stats, renderer=renderer,
+                     llm=llm, use_cache=use_cache, executor=executor, advice_budget=advice_budget,
+                     report_format=report_format)
+
+
+def format_timings(timings):
+    order = ["report", "prediction", "chart", "llm_first_token", "llm", "total"]
+    return " · ".join(f"{stage} {timings[stage]['duration']:.2f}s" for stage in order if stage in timings)
@@ -0,0 +1,27 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+# Relative data/ and models/ paths resolve against the repo, wherever pytest is started from
+os.chdir(ROOT)
+
+
+@pytest.fixture(scope="session")
+def population_stats():
+    from population_stats import PopulationStats
+    return PopulationStats.from_csv()
+
+
+@pytest.fixture
+def suicidal_low_risk_profile():
+    """Answered "Yes" to suicidal thoughts, no family history; LR predicts "No" for it."""
+    return {
+        'Gender': 'Female', 'Age': 24, 'City': 'City', 'Profession': 'Student', 'Academic Pressure': 1,
+        'Work Pressure': 0, 'CGPA': 8.5, 'Study Satisfaction': 5, 'Job Satisfaction': 0,
+        'Sleep Duration': '7-8 hours', 'Dietary Habits': 'Healthy', 'Degree': 'BSc',
+        'Have you ever had suicidal thoughts ?': 'Yes', 'Work/Study Hours': 3, 'Financial Stress': 1,
+        'Family History of Mental Illness': 'No',
+    }
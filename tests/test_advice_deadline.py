@@ -0,0 +1,58 @@
+import threading
+import time
+
+import pytest
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessageChunk
+from langchain_core.outputs import ChatGenerationChunk
+
+from analysis import analyze_user_vs_population
+from fallback_advice import TEXTS
+from integrate_llm import advice_stats, stream_advice_with_deadline
+
+RELEASE = threading.Event()
+
+
+class StallingChatModel(BaseChatModel):
+    """Trả một đoạn text rồi đứng (như kết nối bị treo giữa chừng) cho tới khi RELEASE được set."""
+
+    @property
+    def _llm_type(self):
+        return "stalling"
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        raise NotImplementedError
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        yield ChatGenerationChunk(message=AIMessageChunk(content="Hello there. "))
+        RELEASE.wait(30)
+        yield ChatGenerationChunk(message=AIMessageChunk(content="Too late."))
+
+
+@pytest.fixture
+def stalling_llm():
+    RELEASE.clear()
+    yield StallingChatModel()
+    # Let the abandoned attempt finish so it does not hold an advice worker
+    RELEASE.set()
+
+
+def test_stalled_stream_finishes_with_fallback_within_budget(population_stats, suicidal_low_risk_profile,
+                                                             stalling_llm):
+    report_text, _, comparison = analyze_user_vs_population(suicidal_low_risk_profile, language="en",
+                                                            stats=population_stats, chart=None)
+    budget = 0.5
+    before = advice_stats()["timeouts"]
+    metrics = {}
+    start = time.perf_counter()
+    chunks = list(stream_advice_with_deadline(report_text, "No", comparison, language="en", budget=budget,
+                                              hedge_after=None, llm=stalling_llm, use_cache=False,
+                                              metrics=metrics))
+    elapsed = time.perf_counter() - start
+
+    assert elapsed < budget + 0.3
+    assert chunks[0] == "Hello there. "
+    assert TEXTS["en"]["safety"] in chunks[-1]
+    assert "Too late." not in "".join(chunks)
+    assert metrics["timed_out"] and metrics["source"] == "fallback"
+    assert advice_stats()["timeouts"] == before + 1
@@ -0,0 +1,90 @@
+import groq
+import httpx
+import pytest
+
+import cohort_advice
+from cohort_advice import generate_cohort_advice, is_retryable, load_results
+from fake_llm_server import FakeLLMServer
+from integrate_llm import AdvisorClient
+from synthetic import write_synthetic_csv
+
+REQUEST = httpx.Request("POST", "https://api.groq.com/openai/v1/chat/completions")
+
+
+def status_error(status):
+    response = httpx.Response(status, request=REQUEST)
+    return groq.APIStatusError(f"HTTP {status}", response=response, body=None)
+
+
+@pytest.mark.parametrize("error", [
+    status_error(429), status_error(408), status_error(500), status_error(503),
+    groq.APITimeoutError(request=REQUEST),
+    groq.APIConnectionError(request=REQUEST),
+    httpx.ReadTimeout("read timed out", request=REQUEST),
+    httpx.ConnectError("connection refused", request=REQUEST),
+    TimeoutError(),
+    ConnectionResetError(),
+])
+def test_transient_errors_are_retried(error):
+    assert is_retryable(error)
+
+
+@pytest.mark.parametrize("error", [
+    status_error(400), status_error(401), status_error(404), status_error(422),
+    KeyError("report_text"), ValueError("bad prompt"), TypeError(),
+])
+def test_other_errors_fail_fast(error):
+    assert not is_retryable(error)
+
+
+def test_wrapped_transport_error_is_retried():
+    try:
+        try:
+            raise httpx.ReadTimeout("read timed out", request=REQUEST)
+        except httpx.ReadTimeout as e:
+            raise RuntimeError("LLM call failed") from e
+    except RuntimeError as e:
+        assert is_retryable(e)
+
+
+class TrackedAdvisorClient(AdvisorClient):
+    instances = []
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.closed = False
+        TrackedAdvisorClient.instances.append(self)
+
+    def close(self):
+        self.closed = True
+        super().close()
+
+
+def test_batch_against_fake_server_closes_client_and_resumes(population_stats, monkeypatch, tmp_path):
+    rows = 24
+    input_path = write_synthetic_csv(str(tmp_path / "cohort.csv"), rows)
+    output_path = str(tmp_path / "advice.jsonl")
+    monkeypatch.setenv("GROQ_API_KEY", "fake")
+    monkeypatch.setenv("LLM_CACHE_DISABLED", "1")
+    monkeypatch.setattr(cohort_advice, "AdvisorClient", TrackedAdvisorClient)
+    TrackedAdvisorClient.instances = []
+
+    with FakeLLMServer() as server:
+        monkeypatch.setenv("GROQ_API_BASE", server.base_url)
+        kwargs = dict(language="en", stats=population_stats, max_in_flight=4, progress=False)
+        first = generate_cohort_advice(input_path, output_path, limit=rows // 2, **kwargs)
+        assert first["ok"] == rows // 2
+        assert server.stats()["requests"] == rows // 2
+
+        # Resume: finished rows are skipped and never sent to the LLM again
+        second = generate_cohort_advice(input_path, output_path, **kwargs)
+        assert second["skipped"] == rows // 2
+        assert second["ok"] == rows - rows // 2
+        assert server.stats()["requests"] == rows
+
+    results = load_results(output_path)
+    assert sorted(results) == list(range(rows))
+    assert all(r["status"] == "ok" and r["advice"] for r in results.values())
+    # One client per call, each closed by generate_cohort_advice itself
+    assert len(TrackedAdvisorClient.instances) == 2
+    assert all(client.closed for client in TrackedAdvisorClient.instances)
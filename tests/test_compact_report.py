@@ -0,0 +1,24 @@
+import pytest
+
+from analysis import analyze_user_vs_population
+from compact_report import estimate_tokens, llm_report_text, render_compact_report
+
+
+@pytest.fixture
+def comparison(population_stats, suicidal_low_risk_profile):
+    _, _, comparison = analyze_user_vs_population(suicidal_low_risk_profile, language="en",
+                                                  stats=population_stats, chart=None)
+    return comparison
+
+
+def test_suicidal_answer_reaches_the_prompt(comparison):
+    assert "Suicidal Thoughts=Yes" in llm_report_text("", comparison, "en")
+
+
+@pytest.mark.parametrize("budget", [1, 20, 40])
+def test_suicidal_answer_survives_token_budget(comparison, budget):
+    report = render_compact_report(comparison, "en", token_budget=budget)
+    unbounded = render_compact_report(comparison, "en", token_budget=None)
+    # The budget does cut other lines, but never the risk answer
+    assert estimate_tokens(report) < estimate_tokens(unbounded)
+    assert "Suicidal Thoughts=Yes" in report
@@ -0,0 +1,29 @@
+import pytest
+
+from analysis import analyze_user_vs_population
+from fallback_advice import TEXTS, rule_based_advice
+from make_inference import make_inference
+
+
+def test_analysis_reports_suicidal_answer(population_stats, suicidal_low_risk_profile):
+    _, _, comparison = analyze_user_vs_population(suicidal_low_risk_profile, stats=population_stats, chart=None)
+    categorical = {item["feature"]: item["value"] for item in comparison["categorical"]}
+    assert categorical["Suicidal Thoughts"] == "Yes"
+
+
+@pytest.mark.parametrize("language", ["en", "vi"])
+def test_safety_note_for_suicidal_thoughts_with_low_risk_prediction(population_stats, suicidal_low_risk_profile,
+                                                                     language):
+    # The safety note can only come from the suicidal-thoughts answer here
+    prediction = make_inference("LR", suicidal_low_risk_profile)
+    assert prediction == "No"
+    assert suicidal_low_risk_profile["Family History of Mental Illness"] == "No"
+    _, _, comparison = analyze_user_vs_population(suicidal_low_risk_profile, language=language,
+                                                  stats=population_stats, chart=None)
+    assert TEXTS[language]["safety"] in rule_based_advice(comparison, prediction, language)
+
+
+def test_no_safety_note_without_risk_answers(population_stats, suicidal_low_risk_profile):
+    profile = dict(suicidal_low_risk_profile, **{'Have you ever had suicidal thoughts ?': 'No'})
+    _, _, comparison = analyze_user_vs_population(profile, stats=population_stats, chart=None)
+    assert TEXTS["en"]["safety"] not in rule_based_advice(comparison, "No", "en")
@@ -0,0 +1,37 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from fast_lr import CompiledLogisticRegression, get_compiled_lr
+from model_registry import registry
+from utils import MODEL_PATHS, PREPROCESSOR_PATH
+
+
+@pytest.fixture(scope="module")
+def clean_rows():
+    return pd.read_csv("data/clean_df.csv").drop(columns=["Depression"])
+
+
+@pytest.fixture(scope="module")
+def sklearn_lr(clean_rows):
+    """Xác suất và nhãn của LR.pkl (sklearn) trên toàn bộ clean_df."""
+    model = registry.get(MODEL_PATHS["LR"])
+    X = registry.get(PREPROCESSOR_PATH).transform(clean_rows)
+    return model.predict_proba(X)[:, 1], model.predict(X)
+
+
+@pytest.mark.parametrize("source", ["pickle", "served"])
+def test_compiled_lr_matches_sklearn(clean_rows, sklearn_lr, source):
+    if source == "pickle":
+        compiled = CompiledLogisticRegression(registry.get(PREPROCESSOR_PATH), registry.get(MODEL_PATHS["LR"]))
+    else:
+        # Whatever the app serves: built from models/artifacts when exported, else from the pickles
+        compiled = get_compiled_lr()
+    expected_proba, expected_labels = sklearn_lr
+
+    rows = clean_rows.to_dict(orient="records")
+    proba = np.array([compiled.predict_proba_one(row) for row in rows])
+    labels = np.array([compiled.predict_one(row) for row in rows])
+
+    assert np.allclose(proba, expected_proba, rtol=0, atol=1e-12)
+    assert (labels == expected_labels).all()
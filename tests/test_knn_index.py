@@ -0,0 +1,71 @@
+import os
+
+import numpy as np
+import pytest
+
+from dataset_store import source_info
+from knn_index import build_index, get_knn_index
+
+
+def _build(tmp_path, source):
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(200, 4))
+    y = (X[:, 0] > 0).astype(int)
+    index_dir = str(tmp_path / "knn_index")
+    build_index(X, y, index_dir, n_lists=4, n_probe=4, source=source)
+    return index_dir
+
+
+def test_index_served_only_for_the_model_it_was_built_from(tmp_path):
+    model_path = tmp_path / "KNN.pkl"
+    model_path.write_bytes(b"model v1")
+    index_dir = _build(tmp_path, source_info(str(model_path)))
+    assert get_knn_index(index_dir, str(model_path)) is not None
+
+    # Retrained model, index left behind: same size so only the content check can catch it
+    model_path.write_bytes(b"model v2")
+    os.utime(model_path, ns=(0, 0))
+    assert get_knn_index(index_dir, str(model_path)) is None
+
+
+def test_index_without_source_is_ignored(tmp_path):
+    model_path = tmp_path / "KNN.pkl"
+    model_path.write_bytes(b"model v1")
+    index_dir = _build(tmp_path, None)
+    assert get_knn_index(index_dir, str(model_path)) is None
+    assert get_knn_index(index_dir) is not None
+
+
+@pytest.fixture(scope="module")
+def served_index(tmp_path_factory):
+    from knn_index import build_from_knn_pickle
+
+    # Few lists keep the exact scan quick; exact results do not depend on n_lists
+    index_dir = str(tmp_path_factory.mktemp("knn") / "knn_index")
+    build_from_knn_pickle(index_dir, n_lists=16, n_probe=2)
+    return index_dir
+
+
+def test_serving_defaults_to_exact_search(served_index, monkeypatch):
+    import make_inference
+
+    monkeypatch.setattr(make_inference, "KNN_INDEX_DIR", served_index)
+    index = make_inference.get_estimator("KNN")
+    assert index.n_probe == len(index.centroids)
+    monkeypatch.setattr(make_inference, "KNN_SEARCH", "approximate")
+    assert make_inference.get_estimator("KNN").n_probe == 2
+    monkeypatch.setattr(make_inference, "KNN_SEARCH", "off")
+    assert make_inference.get_estimator("KNN") is make_inference.get_model("KNN")
+
+
+def test_served_index_agrees_with_knn_pickle(served_index, monkeypatch):
+    import pandas as pd
+
+    import make_inference
+    from model_registry import get_model, get_preprocessor
+
+    monkeypatch.setattr(make_inference, "KNN_INDEX_DIR", served_index)
+    df = pd.read_csv("data/clean_df.csv").drop(columns=["Depression"])
+    served, _ = make_inference.predict_frame(make_inference.get_estimator("KNN"), get_preprocessor(), df)
+    expected, _ = make_inference.predict_frame(get_model("KNN"), get_preprocessor(), df)
+    assert (served == expected).mean() == 1.0
@@ -0,0 +1,128 @@
+from types import SimpleNamespace
+
+import pytest
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+import llm_cache
+from integrate_llm import chat_llm
+from llm_cache import LLMCache, make_cache_key
+
+REPORT = "Academic Pressure: 4 (avg 3.1)\nSleep Duration: 5-6 hours"
+
+
+class CountingChatModel(BaseChatModel):
+    """Chat model giả lập: trả lời cố định và đếm số lần được gọi."""
+
+    model_name: str = "stub-model"
+    temperature: float = 0.7
+    calls: int = 0
+
+    @property
+    def _llm_type(self):
+        return "counting"
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        self.calls += 1
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=f"advice #{self.calls}"))])
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    # Fake clock for llm_cache only; every reading moves one second forward so last_access is ordered
+    now = [1_000_000.0]
+
+    def tick():
+        now[0] += 1.0
+        return now[0]
+
+    monkeypatch.setattr(llm_cache, "time", SimpleNamespace(time=tick))
+    return now
+
+
+@pytest.fixture
+def shared_cache(monkeypatch, tmp_path):
+    """Cache dùng chung của chat_llm, trỏ vào một file SQLite tạm."""
+    monkeypatch.delenv("LLM_CACHE_DISABLED", raising=False)
+    monkeypatch.setenv("LLM_CACHE_PATH", str(tmp_path / "llm_cache.sqlite"))
+    monkeypatch.setattr(llm_cache, "_default_cache", None)
+    cache = llm_cache.get_llm_cache()
+    yield cache
+    cache.close()
+
+
+def test_miss_then_hit_calls_model_once(shared_cache):
+    llm = CountingChatModel()
+    assert chat_llm(REPORT, "Yes", language="en", llm=llm) == "advice #1"
+    assert chat_llm(REPORT, "Yes", language="en", llm=llm) == "advice #1"
+    assert llm.calls == 1
+    assert shared_cache.stats()["hits"] == 1
+    assert shared_cache.stats()["misses"] == 1
+    assert shared_cache.stats()["entries"] == 1
+
+
+def test_key_depends_on_model_and_prompt(shared_cache):
+    llm = CountingChatModel()
+    chat_llm(REPORT, "Yes", language="en", llm=llm)
+    # Whitespace-only changes to the report map to the same entry
+    chat_llm("  " + REPORT.replace("\n", "\n\n  ") + "\n", "Yes", language="en", llm=llm)
+    assert llm.calls == 1
+
+    chat_llm(REPORT, "No", language="en", llm=llm)
+    chat_llm(REPORT, "Yes", language="vi", llm=llm)
+    chat_llm(REPORT + "\nCGPA: 8.5", "Yes", language="en", llm=llm)
+    chat_llm(REPORT, "Yes", language="en", llm=CountingChatModel(model_name="other-model"))
+    chat_llm(REPORT, "Yes", language="en", llm=CountingChatModel(temperature=0.2))
+    assert llm.calls == 4
+    assert shared_cache.stats()["entries"] == 6
+
+
+def test_bypass_flag_and_disabled_env(shared_cache, monkeypatch):
+    llm = CountingChatModel()
+    chat_llm(REPORT, "Yes", language="en", llm=llm)
+    assert chat_llm(REPORT, "Yes", language="en", llm=llm, use_cache=False) == "advice #2"
+
+    monkeypatch.setenv("LLM_CACHE_DISABLED", "1")
+    assert chat_llm(REPORT, "Yes", language="en", llm=llm) == "advice #3"
+    assert shared_cache.stats()["hits"] == 0
+    assert shared_cache.stats()["entries"] == 1
+
+
+def test_ttl_expiry(tmp_path, clock):
+    cache = LLMCache(str(tmp_path / "ttl.sqlite"), ttl_seconds=10)
+    key = make_cache_key(REPORT, "Yes", "en", "stub-model", 0.7)
+    cache.set(key, "advice")
+    assert cache.get(key) == "advice"
+
+    clock[0] += 60
+    assert cache.get(key) is None
+    assert cache.stats()["expired"] == 1
+    assert cache.stats()["entries"] == 0
+    cache.close()
+
+
+def test_evicts_least_recently_used_by_count(tmp_path, clock):
+    cache = LLMCache(str(tmp_path / "count.sqlite"), max_entries=2)
+    cache.set("a", "1")
+    cache.set("b", "2")
+    assert cache.get("a") == "1"
+    cache.set("c", "3")
+
+    assert cache.get("b") is None
+    assert cache.get("a") == "1"
+    assert cache.get("c") == "3"
+    assert cache.stats()["evictions"] == 1
+    cache.close()
+
+
+def test_evicts_by_size(tmp_path, clock):
+    cache = LLMCache(str(tmp_path / "bytes.sqlite"), max_bytes=10)
+    cache.set("a", "x" * 6)
+    cache.set("b", "y" * 6)
+
+    assert cache.get("a") is None
+    assert cache.get("b") == "y" * 6
+    assert cache.stats()["bytes"] == 6
+    assert cache.stats()["evictions"] == 1
+    cache.close()
@@ -0,0 +1,15 @@
+from analysis import clear_comparison_cache, compare_user_vs_population
+from memo import input_key
+
+
+def test_input_key_is_canonical():
+    assert input_key({"Age": 20, "Gender": "Male"}, ["Age"]) == input_key({"Gender": "Male", "Age": 20.0}, ["Age"])
+    assert input_key({"Age": 20}, ["Age"]) != input_key({"Age": 21}, ["Age"])
+
+
+def test_comparison_memo_hit_and_clear(population_stats, suicidal_low_risk_profile):
+    first = compare_user_vs_population(suicidal_low_risk_profile, population_stats)
+    assert compare_user_vs_population(dict(suicidal_low_risk_profile), population_stats) is first
+    clear_comparison_cache()
+    again = compare_user_vs_population(suicidal_low_risk_profile, population_stats)
+    assert again is not first and again == first
@@ -0,0 +1,30 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from model_artifacts import ArtifactBundle, verify_against_pickles
+from model_registry import registry
+from utils import ARTIFACT_DIR, MODEL_PATHS
+
+
+def test_exported_models_match_pickles():
+    report = verify_against_pickles()
+    for name in ("LR", "KNN"):
+        assert report[name]["label_agreement"] == 1.0
+        assert report[name]["max_abs_diff"] < 1e-12
+
+
+def test_knn_artifact_is_smaller_than_pickle_and_both_search_paths_agree():
+    bundle = ArtifactBundle.load()
+    arrays = bundle.manifest["components"]["KNN"]["arrays"].values()
+    assert sum(os.path.getsize(os.path.join(ARTIFACT_DIR, a["file"])) for a in arrays) < \
+        os.path.getsize(MODEL_PATHS["KNN"])
+
+    knn = bundle.get("KNN")
+    X = bundle.get("preprocessor").transform(pd.read_csv("data/clean_df.csv").drop(columns=["Depression"]).head(300))
+    expected = registry.get(MODEL_PATHS["KNN"]).predict_proba(X)
+    # One row at a time uses the gather path, the batch rebuilds dense chunks of training rows
+    one_by_one = np.vstack([knn.predict_proba(X[i:i + 1]) for i in range(len(X))])
+    assert np.array_equal(one_by_one, expected)
+    assert np.array_equal(knn.predict_proba(X), expected)
@@ -0,0 +1,41 @@
+import pytest
+
+from clean_data import clean_data
+from peer_cube import PeerCube
+from utils import RAW_DATA_PATH
+
+
+@pytest.fixture
+def raw_lines():
+    with open(RAW_DATA_PATH, encoding="utf-8") as f:
+        return [next(f) for _ in range(1201)]
+
+
+def run_stage(tmp_path, raw_lines, rows):
+    raw = tmp_path / "raw.csv"
+    raw.write_text("".join(raw_lines[:rows + 1]), encoding="utf-8")
+    out, cube = tmp_path / "clean.csv", tmp_path / "peer_cube.npz"
+    summary = clean_data([str(raw)], str(out), str(tmp_path / "stats.npz"), workers=1, columnar=False,
+                         cube_path=str(cube))
+    return summary, str(out), str(cube)
+
+
+def test_clean_data_writes_a_fresh_peer_cube(tmp_path, raw_lines):
+    summary, out, cube_path = run_stage(tmp_path, raw_lines, 600)
+    cube = PeerCube.load_fresh(cube_path, out)
+    assert cube is not None
+    assert sum(cube.segment_size("Gender", g) for g in ("Male", "Female")) == summary["total_rows"]
+
+    # Appended raw rows: the incremental run rebuilds the cube for the grown output
+    summary, out, cube_path = run_stage(tmp_path, raw_lines, 1200)
+    assert summary["mode"] == "incremental"
+    cube = PeerCube.load_fresh(cube_path, out)
+    assert sum(cube.segment_size("Gender", g) for g in ("Male", "Female")) == summary["total_rows"]
+
+
+def test_stale_peer_cube_is_ignored(tmp_path, raw_lines):
+    _, out, cube_path = run_stage(tmp_path, raw_lines, 600)
+    with open(out, "a", encoding="utf-8") as f:
+        f.write(open(out, encoding="utf-8").readlines()[1])
+    assert PeerCube.load_fresh(cube_path, out) is None
+    assert PeerCube.load_fresh(str(tmp_path / "missing.npz"), out) is None
@@ -0,0 +1,60 @@
+import json
+import urllib.error
+import urllib.request
+
+import pytest
+
+import model_registry
+from prediction_service import PredictionService
+from utils import MODEL_PATHS
+
+# models/RF.pkl is not committed; a fresh clone only has LR and KNN until `python train.py --models RF`
+MODELS = ["LR", "KNN", pytest.param("RF", marks=pytest.mark.skipif(not model_registry.is_available("RF"),
+                                                                  reason="RF.pkl not built"))]
+
+
+@pytest.fixture(scope="module")
+def service():
+    with PredictionService(port=0, max_wait_ms=1) as service:
+        yield service
+
+
+def post(service, path, payload):
+    request = urllib.request.Request(service.base_url + path, data=json.dumps(payload).encode(),
+                                     headers={"Content-Type": "application/json"})
+    try:
+        with urllib.request.urlopen(request, timeout=30) as response:
+            return response.status, json.load(response)
+    except urllib.error.HTTPError as e:
+        return e.code, json.load(e)
+
+
+@pytest.mark.parametrize("model", MODELS)
+def test_valid_profile(service, suicidal_low_risk_profile, model):
+    status, body = post(service, "/predict", {"model": model, "profile": suicidal_low_risk_profile})
+    assert status == 200
+    assert body["prediction"] in ("Yes", "No")
+
+
+@pytest.mark.parametrize("model", MODELS)
+@pytest.mark.parametrize("field, value", [("Age", "abc"), ("Age", None), ("CGPA", True),
+                                          ("Gender", 1), ("Degree", None)])
+def test_bad_field_type_is_400_for_every_model(service, suicidal_low_risk_profile, model, field, value):
+    profile = dict(suicidal_low_risk_profile, **{field: value})
+    status, body = post(service, "/predict", {"model": model, "profile": profile})
+    assert status == 400
+    assert field in body["error"]
+    status, _ = post(service, "/predict/bulk", {"model": model, "profiles": [suicidal_low_risk_profile, profile]})
+    assert status == 400
+
+
+def test_missing_model_is_hidden_and_400(service, suicidal_low_risk_profile, monkeypatch, tmp_path):
+    monkeypatch.setitem(MODEL_PATHS, "RF", str(tmp_path / "RF.pkl"))
+    assert "RF" not in model_registry.available_models()
+    assert {"LR", "KNN"} <= set(model_registry.available_models())
+    with pytest.raises(model_registry.ModelNotAvailable, match="train.py --models RF"):
+        model_registry.get_model("RF")
+
+    status, body = post(service, "/predict", {"model": "RF", "profile": suicidal_low_risk_profile})
+    assert status == 400
+    assert "train.py --models RF" in body["error"]
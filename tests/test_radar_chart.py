@@ -0,0 +1,55 @@
+import gc
+import os
+
+import matplotlib
+import numpy as np
+import pytest
+
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt  # noqa: E402
+
+from radar_chart import RadarChart  # noqa: E402
+from utils import ANALYSIS_NUMERIC_COLS  # noqa: E402
+
+RENDERS = 300
+WARMUP = 50
+# Same bound as benchmarks/bench_radar_chart.py; a pyplot figure that is never closed costs over 1 MB,
+# so leaking every render would grow by several hundred MB
+MAX_GROWTH_MB = 50
+
+
+def rss_mb():
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+
+
+def random_inputs(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return [{col: float(rng.uniform(0, 10)) for col in ANALYSIS_NUMERIC_COLS} for _ in range(n)]
+
+
+@pytest.fixture(scope="module")
+def chart(population_stats):
+    return RadarChart(population_stats, png_cache_size=32)
+
+
+@pytest.mark.parametrize("mode", ["png", "spec", "figure"])
+def test_repeated_renders_do_not_leak(chart, mode):
+    render = {"png": chart.render_png, "spec": chart.spec, "figure": chart.create_figure}[mode]
+    inputs = random_inputs(RENDERS + WARMUP)
+    # Warm up templates, fonts and the allocator's high-water mark (figures are reference cycles
+    # that pile up until the cyclic GC runs), so only growth that keeps going is measured
+    for user_input in inputs[:WARMUP]:
+        render(user_input)
+    gc.collect()
+    figures_before = plt.get_fignums()
+    before = rss_mb()
+
+    for user_input in inputs[WARMUP:]:
+        render(user_input)
+    gc.collect()
+
+    assert rss_mb() - before < MAX_GROWTH_MB
+    assert plt.get_fignums() == figures_before == []
+    if mode == "png":
+        assert chart.cache_stats()["entries"] <= 32
@@ -0,0 +1,41 @@
+import threading
+
+import pytest
+
+from submit_pipeline import start_submit
+
+ADVICE = "Sleep more, study less. " * 4
+
+
+@pytest.fixture
+def fake_llm():
+    from langchain_core.language_models.fake_chat_models import FakeListChatModel
+    return FakeListChatModel(responses=[ADVICE], sleep=0.002)
+
+
+def test_advice_stream_replays_after_interrupted_read(population_stats, suicidal_low_risk_profile, fake_llm):
+    run = start_submit(suicidal_low_risk_profile, suicidal_low_risk_profile, "LR", "en", population_stats,
+                       llm=fake_llm, use_cache=False, advice_budget=30)
+    # A rerun abandons the first reader part-way through write_stream
+    first = run.advice_stream()
+    partial = [next(first), next(first)]
+    first.close()
+    assert run.advice().startswith("".join(partial))
+    assert run.advice() == "".join(run.advice_stream()) == ADVICE
+    assert run.llm_metrics["source"] == "llm"
+
+
+def test_advice_stream_concurrent_readers(population_stats, suicidal_low_risk_profile, fake_llm):
+    run = start_submit(suicidal_low_risk_profile, suicidal_low_risk_profile, "LR", "en", population_stats,
+                       llm=fake_llm, use_cache=False, advice_budget=30)
+    results = [None] * 3
+
+    def read(i):
+        results[i] = "".join(run.advice_stream())
+
+    threads = [threading.Thread(target=read, args=(i,)) for i in range(len(results))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=30)
+    assert results == [ADVICE] * len(results)
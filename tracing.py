@@ -0,0 +1,307 @@
+"""
+Đo thời gian từng bước (span) của một lần submit: preprocess, predict, tra percentile,
+vẽ biểu đồ, gọi LLM...
+
+Span chỉ được ghi khi có một trace đang hoạt động (Trace(...).activate() hoặc trace()).
+Khi không có trace, span() chỉ đọc một ContextVar rồi trả về span rỗng dùng chung, nên
+chi phí khi tắt tracing gần như bằng không. Trace đi theo ContextVar; khi giao việc cho
+thread pool thì bọc hàm bằng bind() để span trong thread đó vẫn thuộc trace hiện tại.
+
+    with tracing.trace("submit", model="LR") as tr:
+        with tracing.span("inference.predict", model="LR"):
+            ...
+    tr.spans                       # danh sách span (dict)
+    tracing.prometheus_text()      # histogram thời gian theo stage, dạng text của Prometheus
+
+Trace đã kết thúc được giữ trong bộ nhớ (recent_traces) và ghi thêm một dòng JSON vào
+file TRACE_JSONL nếu biến môi trường này được đặt.
+"""
+import contextvars
+import json
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager, nullcontext
+
+# Default for entry points that let the user toggle tracing (Streamlit debug panel, CLIs)
+TRACING = os.getenv("TRACING", "0") == "1"
+TRACE_JSONL = os.getenv("TRACE_JSONL")
+
+# Upper bounds (seconds) of the Prometheus histogram buckets
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_current = contextvars.ContextVar("trace", default=None)  # (Trace, parent span id) or None
+
+
+class _NoopSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **attrs):
+        pass
+
+
+_NOOP = _NoopSpan()
+
+
+class _Span:
+    def __init__(self, trace, name, parent, attrs):
+        self.trace = trace
+        self.name = name
+        self.parent = parent
+        self.attrs = attrs
+        self.id = None
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def __enter__(self):
+        self.id = self.trace._next_id()
+        self._token = _current.set((self.trace, self.id))
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        end = time.perf_counter()
+        _current.reset(self._token)
+        if exc_type is not None:
+            self.attrs["error"] = exc_type.__name__
+        self.trace._record(self.id, self.name, self.parent, self._start, end, self.attrs)
+        return False
+
+
+class Trace:
+    def __init__(self, name, **attrs):
+        self.name = name
+        self.id = uuid.uuid4().hex[:16]
+        self.attrs = attrs
+        self.spans = []
+        self.started_at = time.time()
+        self.duration = None
+        self._t0 = time.perf_counter()
+        self._ids = 0
+        self._lock = threading.Lock()
+
+    def _next_id(self):
+        with self._lock:
+            self._ids += 1
+            return self._ids
+
+    def _record(self, span_id, name, parent, start, end, attrs):
+        with self._lock:
+            self.spans.append({
+                "id": span_id,
+                "parent": parent,
+                "name": name,
+                "start": start - self._t0,
+                "duration": end - start,
+                "thread": threading.current_thread().name,
+                "attrs": attrs,
+            })
+
+    @contextmanager
+    def activate(self, parent=None):
+        """Đặt trace này làm trace hiện tại (span mới là con của `parent` nếu có)."""
+        token = _current.set((self, parent))
+        try:
+            yield self
+        finally:
+            _current.reset(token)
+
+    def add_span(self, name, start, end, parent=None, **attrs):
+        """Ghi một span đã đo sẵn (start/end theo time.perf_counter), ví dụ thời gian của một generator."""
+        self._record(self._next_id(), name, parent, start, end, attrs)
+
+    def finish(self):
+        """Kết thúc trace (chỉ lần gọi đầu có tác dụng): cập nhật metrics, lưu vào recent_traces và TRACE_JSONL."""
+        with self._lock:
+            if self.duration is not None:
+                return self
+            self.duration = time.perf_counter() - self._t0
+            spans = sorted(self.spans, key=lambda s: s["start"])
+            self.spans = spans
+        _metrics.observe(self)
+        _recent.append(self)
+        if TRACE_JSONL:
+            export_jsonl(TRACE_JSONL, [self])
+        return self
+
+    def to_dict(self):
+        return {
+            "trace_id": self.id,
+            "name": self.name,
+            "started_at": self.started_at,
+            "duration": self.duration,
+            "attrs": self.attrs,
+            "spans": self.spans,
+        }
+
+    def to_json(self):
+        """Một dòng JSON (định dạng của export_jsonl)."""
+        return json.dumps(self.to_dict(), ensure_ascii=False, default=str)
+
+    def table(self):
+        """Các span theo thứ tự bắt đầu, tên thụt lề theo độ sâu (để hiển thị)."""
+        depth = {}
+        rows = []
+        for s in self.spans:
+            depth[s["id"]] = depth.get(s["parent"], -1) + 1 if s["parent"] is not None else 0
+            rows.append({
+                "stage": "  " * depth[s["id"]] + s["name"],
+                "start_ms": round(s["start"] * 1e3, 1),
+                "duration_ms": round(s["duration"] * 1e3, 1),
+                "thread": s["thread"],
+                "attrs": ", ".join(f"{k}={v}" for k, v in s["attrs"].items()),
+            })
+        return rows
+
+
+def current_trace():
+    state = _current.get()
+    return state[0] if state is not None else None
+
+
+def span(name, **attrs):
+    """Context manager đo một bước; không làm gì nếu không có trace đang hoạt động."""
+    state = _current.get()
+    if state is None:
+        return _NOOP
+    return _Span(state[0], name, state[1], attrs)
+
+
+def add_span(name, start, end, **attrs):
+    """Như Trace.add_span, trên trace hiện tại (bỏ qua nếu không có)."""
+    state = _current.get()
+    if state is not None:
+        state[0].add_span(name, start, end, parent=state[1], **attrs)
+
+
+def bind(fn):
+    """Bọc `fn` để khi chạy ở thread khác, span vẫn thuộc trace (và span cha) hiện tại."""
+    state = _current.get()
+    if state is None:
+        return fn
+    trace, parent = state
+
+    def bound(*args, **kwargs):
+        with trace.activate(parent):
+            return fn(*args, **kwargs)
+    return bound
+
+
+def activate(tr):
+    """tr.activate(), hoặc không làm gì nếu tr là None (tracing đang tắt)."""
+    return tr.activate() if tr is not None else nullcontext()
+
+
+@contextmanager
+def trace(name, **attrs):
+    """Bắt đầu trace, đặt làm trace hiện tại và finish() khi ra khỏi khối."""
+    tr = Trace(name, **attrs)
+    try:
+        with tr.activate():
+            yield tr
+    finally:
+        tr.finish()
+
+
+# ---------------------------------------------------------
+# Export: JSON lines và Prometheus
+# ---------------------------------------------------------
+_recent = deque(maxlen=200)
+
+
+def recent_traces(n=None):
+    traces = list(_recent)
+    return traces if n is None else traces[-n:]
+
+
+def export_jsonl(path, traces=None):
+    """Ghi thêm mỗi trace một dòng JSON vào `path` (mặc định: các trace gần đây)."""
+    traces = recent_traces() if traces is None else traces
+    with open(path, "a", encoding="utf-8") as f:
+        for tr in traces:
+            f.write(tr.to_json() + "\n")
+
+
+class _StageMetrics:
+    """Histogram thời gian theo tên span và số trace theo tên, cộng dồn trong process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.stages = {}  # name -> {"buckets": [...], "sum": float, "count": int, "errors": int}
+        self.traces = {}  # name -> {"sum": float, "count": int}
+
+    def observe(self, tr):
+        with self._lock:
+            total = self.traces.setdefault(tr.name, {"sum": 0.0, "count": 0})
+            total["sum"] += tr.duration
+            total["count"] += 1
+            for s in tr.spans:
+                stage = self.stages.setdefault(
+                    s["name"], {"buckets": [0] * len(BUCKETS), "sum": 0.0, "count": 0, "errors": 0})
+                for i, bound in enumerate(BUCKETS):
+                    if s["duration"] <= bound:
+                        stage["buckets"][i] += 1
+                stage["sum"] += s["duration"]
+                stage["count"] += 1
+                if s["attrs"].get("error"):
+                    stage["errors"] += 1
+
+    def render(self, prefix):
+        lines = [f"# HELP {prefix}_stage_duration_seconds Duration of traced stages.",
+                 f"# TYPE {prefix}_stage_duration_seconds histogram"]
+        with self._lock:
+            stages = {name: dict(m, buckets=list(m["buckets"])) for name, m in sorted(self.stages.items())}
+            traces = {name: dict(m) for name, m in sorted(self.traces.items())}
+        for name, m in stages.items():
+            label = _label(name)
+            for bound, count in zip(BUCKETS, m["buckets"]):
+                lines.append(f'{prefix}_stage_duration_seconds_bucket{{stage="{label}",le="{bound:g}"}} {count}')
+            lines.append(f'{prefix}_stage_duration_seconds_bucket{{stage="{label}",le="+Inf"}} {m["count"]}')
+            lines.append(f'{prefix}_stage_duration_seconds_sum{{stage="{label}"}} {m["sum"]:.6f}')
+            lines.append(f'{prefix}_stage_duration_seconds_count{{stage="{label}"}} {m["count"]}')
+        lines += [f"# HELP {prefix}_stage_errors_total Traced stages that raised.",
+                  f"# TYPE {prefix}_stage_errors_total counter"]
+        lines += [f'{prefix}_stage_errors_total{{stage="{_label(name)}"}} {m["errors"]}' for name, m in stages.items()]
+        lines += [f"# HELP {prefix}_trace_duration_seconds Duration of whole traces.",
+                  f"# TYPE {prefix}_trace_duration_seconds summary"]
+        for name, m in traces.items():
+            lines.append(f'{prefix}_trace_duration_seconds_sum{{trace="{_label(name)}"}} {m["sum"]:.6f}')
+            lines.append(f'{prefix}_trace_duration_seconds_count{{trace="{_label(name)}"}} {m["count"]}')
+        return "\n".join(lines) + "\n"
+
+    def clear(self):
+        with self._lock:
+            self.stages.clear()
+            self.traces.clear()
+
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+_metrics = _StageMetrics()
+
+
+def prometheus_text(prefix="advisor"):
+    """Metrics của mọi trace đã finish() trong process, theo text exposition format của Prometheus."""
+    return _metrics.render(prefix)
+
+
+def write_prometheus(path, prefix="advisor"):
+    """Ghi prometheus_text() ra file (cho textfile collector của node_exporter), thay thế nguyên tử."""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(prometheus_text(prefix))
+    os.replace(tmp_path, path)
+
+
+def reset_metrics():
+    _metrics.clear()
+    _recent.clear()
@@ -0,0 +1,373 @@
+"""
+Huấn luyện preprocessor và cả ba model (LR, KNN, RF) từ file raw, thay cho các cell
+huấn luyện của notebook.ipynb.
+
+    python train.py                          # mọi model, song song trên mọi core
+    python train.py --models RF --n-jobs 4
+    python train.py --no-export              # không export lại models/artifacts
+
+Các bước:
+  1. clean_data.clean_df + train_test_split(test_size=0.2, random_state=42) như notebook, nên
+     preprocessor và model giống hệt bản notebook tạo ra.
+  2. Preprocessor được fit một lần; nó cùng các ma trận train/test đã transform được
+     cache trong cache/train/<key> (key: sha256 của file raw + cấu hình), lần chạy sau
+     với cùng dữ liệu bỏ qua bước này.
+  3. Mỗi model được fit đúng một lần trong một process riêng (đọc ma trận từ cache),
+     model lâu nhất chạy trước; RF dùng các core còn lại qua n_jobs. Model được đánh
+     giá trên tập test ngay trong process đó.
+  4. Các .pkl được ghi ra file tạm và chỉ thay file cũ khi mọi model đã xong; sau đó ghi
+     models/manifest.json (sha256, tham số, metrics, thời gian từng bước) và export lại
+     models/artifacts. Nếu đã có models/knn_index thì nó được build lại từ KNN.pkl mới
+     (giữ n_lists/n_probe cũ) khi KNN được train.
+"""
+import argparse
+import hashlib
+import json
+import os
+import pickle
+import shutil
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from clean_data import RAW_DROP_COLS, TARGET_COL, clean_df
+from model_artifacts import _sha256
+from utils import KNN_INDEX_DIR, MODEL_PATHS, PREPROCESSOR_PATH, RAW_DATA_PATH, TRAINING_MANIFEST_PATH
+
+
+# Order matters: it fixes the column layout of the transformed matrix
+NUMERIC_FEATURES = ["Age", "Academic Pressure", "CGPA", "Study Satisfaction", "Work/Study Hours", "Financial Stress"]
+CATEGORICAL_FEATURES = ["Gender", "Degree", "Have you ever had suicidal thoughts ?", "Sleep Duration",
+                        "Family History of Mental Illness", "Dietary Habits"]
+
+TEST_SIZE = 0.2
+RANDOM_STATE = 42
+
+DEFAULT_PARAMS = {
+    "LR": {},
+    "KNN": {"n_neighbors": 5},
+    "RF": {"n_estimators": 100, "random_state": RANDOM_STATE},
+}
+# Longest fit first so the pool is not left waiting on RF at the end
+FIT_ORDER = ("RF", "KNN", "LR")
+
+TRAIN_CACHE_DIR = "cache/train"
+CACHE_VERSION = 1
+
+
+def split(df):
+    """X_train, X_test, y_train, y_test như notebook."""
+    from sklearn.model_selection import train_test_split
+
+    X = df.drop(TARGET_COL, axis=1)
+    y = df[TARGET_COL]
+    return train_test_split(X, y, test_size=TEST_SIZE, random_state=RANDOM_STATE)
+
+
+def build_preprocessor():
+    from sklearn.compose import ColumnTransformer
+    from sklearn.impute import SimpleImputer
+    from sklearn.pipeline import Pipeline
+    from sklearn.preprocessing import OneHotEncoder, StandardScaler
+
+    numeric_transformer = Pipeline(steps=[
+        ("imputer", SimpleImputer(strategy="median")),
+        ("scaler", StandardScaler())
+    ])
+    categorical_transformer = Pipeline(steps=[
+        ("imputer", SimpleImputer(strategy="most_frequent")),
+        ("encoder", OneHotEncoder(handle_unknown="ignore"))
+    ])
+    return ColumnTransformer(transformers=[
+        ("num", numeric_transformer, NUMERIC_FEATURES),
+        ("cat", categorical_transformer, CATEGORICAL_FEATURES)
+    ])
+
+
+def make_estimator(name, **params):
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.neighbors import KNeighborsClassifier
+
+    classes = {"LR": LogisticRegression, "KNN": KNeighborsClassifier, "RF": RandomForestClassifier}
+    return classes[name](**{**DEFAULT_PARAMS[name], **params})
+
+
+# ---------------------------------------------------------
+# Cache: preprocessor đã fit + ma trận train/test
+# ---------------------------------------------------------
+def save_matrix(path, X):
+    import scipy.sparse
+
+    if scipy.sparse.issparse(X):
+        scipy.sparse.save_npz(path + ".npz", X, compressed=False)
+    else:
+        np.save(path + ".npy", X)
+
+
+def load_matrix(path):
+    import scipy.sparse
+
+    if os.path.exists(path + ".npz"):
+        return scipy.sparse.load_npz(path + ".npz")
+    return np.load(path + ".npy", mmap_mode="r")
+
+
+def data_key(raw_path):
+    from importlib.metadata import version
+
+    # Package metadata, not `import sklearn`: a cache hit should not pay for the sklearn import
+    config = {
+        "raw_sha256": _sha256(raw_path),
+        "drop": RAW_DROP_COLS,
+        "numeric": NUMERIC_FEATURES,
+        "categorical": CATEGORICAL_FEATURES,
+        "test_size": TEST_SIZE,
+        "random_state": RANDOM_STATE,
+        "sklearn": version("scikit-learn"),
+        "version": CACHE_VERSION,
+    }
+    return hashlib.sha256(json.dumps(config, sort_keys=True).encode()).hexdigest()[:16]
+
+
+def prepare_data(raw_path=RAW_DATA_PATH, cache_dir=TRAIN_CACHE_DIR):
+    """Thư mục cache chứa preprocessor.pkl, X_train/X_test, y_train/y_test và meta.json (tạo nếu chưa có)."""
+    key = data_key(raw_path)
+    data_dir = os.path.join(cache_dir, key)
+    meta_path = os.path.join(data_dir, "meta.json")
+    if os.path.exists(meta_path):
+        with open(meta_path, encoding="utf-8") as f:
+            return data_dir, dict(json.load(f), cached=True)
+
+    from dataset_store import load_dataset
+
+    t0 = time.perf_counter()
+    raw = load_dataset(raw_path)
+    df = clean_df(raw)
+    X_train, X_test, y_train, y_test = split(df)
+    t1 = time.perf_counter()
+
+    preprocessor = build_preprocessor()
+    X_train_processed = preprocessor.fit_transform(X_train)
+    X_test_processed = preprocessor.transform(X_test)
+    t2 = time.perf_counter()
+
+    # Written to a private directory first; the rename publishes the whole entry at once
+    tmp_dir = f"{data_dir}.tmp-{os.getpid()}"
+    os.makedirs(tmp_dir, exist_ok=True)
+    with open(os.path.join(tmp_dir, "preprocessor.pkl"), "wb") as f:
+        pickle.dump(preprocessor, f)
+    save_matrix(os.path.join(tmp_dir, "X_train"), X_train_processed)
+    save_matrix(os.path.join(tmp_dir, "X_test"), X_test_processed)
+    np.save(os.path.join(tmp_dir, "y_train.npy"), y_train.to_numpy())
+    np.save(os.path.join(tmp_dir, "y_test.npy"), y_test.to_numpy())
+    meta = {
+        "key": key,
+        "raw_path": raw_path,
+        "raw_rows": len(raw),
+        "clean_rows": len(df),
+        "n_train": len(y_train),
+        "n_test": len(y_test),
+        "n_features": X_train_processed.shape[1],
+        "seconds": {"clean_split": t1 - t0, "preprocess": t2 - t1},
+    }
+    with open(os.path.join(tmp_dir, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+    try:
+        os.replace(tmp_dir, data_dir)
+    except OSError:
+        # Another run published the same key meanwhile
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    return data_dir, dict(meta, cached=False)
+
+
+# ---------------------------------------------------------
+# Fit (mỗi model một process)
+# ---------------------------------------------------------
+def _fit_one(name, data_dir, out_path, params, n_jobs):
+    from sklearn.metrics import accuracy_score, f1_score, precision_score, recall_score
+
+    X_train, X_test = load_matrix(os.path.join(data_dir, "X_train")), load_matrix(os.path.join(data_dir, "X_test"))
+    y_train, y_test = np.load(os.path.join(data_dir, "y_train.npy")), np.load(os.path.join(data_dir, "y_test.npy"))
+
+    estimator = make_estimator(name, **params)
+    if "n_jobs" in estimator.get_params() and n_jobs > 1:
+        estimator.set_params(n_jobs=n_jobs)
+    t0 = time.perf_counter()
+    estimator.fit(X_train, y_train)
+    fit_seconds = time.perf_counter() - t0
+    if "n_jobs" in estimator.get_params():
+        # Training parallelism must not leak into single-row inference
+        estimator.set_params(n_jobs=None)
+
+    t0 = time.perf_counter()
+    y_pred = estimator.predict(X_test)
+    predict_seconds = time.perf_counter() - t0
+
+    tmp_path = f"{out_path}.tmp-{os.getpid()}"
+    with open(tmp_path, "wb") as f:
+        pickle.dump(estimator, f)
+    return {
+        "tmp_path": tmp_path,
+        "class": type(estimator).__name__,
+        "params": estimator.get_params(),
+        "metrics": {
+            "accuracy": accuracy_score(y_test, y_pred),
+            "precision": precision_score(y_test, y_pred),
+            "recall": recall_score(y_test, y_pred),
+            "f1": f1_score(y_test, y_pred),
+        },
+        "fit_seconds": fit_seconds,
+        "test_predict_seconds": predict_seconds,
+    }
+
+
+def _copy_atomic(src, dst):
+    os.makedirs(os.path.dirname(dst) or ".", exist_ok=True)
+    tmp_path = f"{dst}.tmp-{os.getpid()}"
+    shutil.copyfile(src, tmp_path)
+    os.replace(tmp_path, dst)
+
+
+def _file_info(path):
+    return {"path": path, "sha256": _sha256(path), "size": os.path.getsize(path)}
+
+
+def _environment(n_jobs):
+    import sklearn
+
+    return {"python": sys.version.split()[0], "sklearn": sklearn.__version__, "numpy": np.__version__,
+            "cpu_count": os.cpu_count(), "n_jobs": n_jobs}
+
+
+def rebuild_knn_index(index_dir=KNN_INDEX_DIR):
+    """Build lại index KNN đã có từ KNN.pkl hiện tại, cùng n_lists/n_probe; trả về meta hoặc None nếu chưa có index."""
+    from knn_index import build_from_knn_pickle
+
+    meta_path = os.path.join(index_dir, "meta.json")
+    if not os.path.exists(meta_path):
+        return None
+    with open(meta_path) as f:
+        meta = json.load(f)
+    return build_from_knn_pickle(index_dir, n_lists=meta.get("n_lists"), n_probe=meta.get("n_probe")).meta
+
+
+def load_training_manifest(path=TRAINING_MANIFEST_PATH):
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def train(models=None, raw_path=RAW_DATA_PATH, n_jobs=None, cache_dir=TRAIN_CACHE_DIR, params=None, export=True):
+    """
+    Train `models` (mặc định cả ba) và ghi preprocessor, .pkl, manifest; trả về manifest.
+    params: {model: {tham số}} ghi đè DEFAULT_PARAMS.
+    """
+    models = [name for name in FIT_ORDER if models is None or name in models]
+    n_jobs = n_jobs or os.cpu_count() or 1
+    params = params or {}
+    timings = {}
+    start = time.perf_counter()
+
+    data_dir, data = prepare_data(raw_path, cache_dir)
+    timings["prepare_data"] = time.perf_counter() - start
+
+    previous = load_training_manifest()
+    if len(models) < len(FIT_ORDER) and previous and previous["data"]["key"] != data["key"]:
+        raise ValueError("The data or preprocessing changed since the last training run; "
+                         "retrain every model so they share the new preprocessor")
+
+    # RF (first in FIT_ORDER) gets the cores not taken by the other workers
+    workers = min(n_jobs, len(models))
+    model_jobs = {name: max(1, n_jobs - workers + 1) if name == "RF" else 1 for name in models}
+    t0 = time.perf_counter()
+    jobs = [(name, data_dir, MODEL_PATHS[name], params.get(name, {}), model_jobs[name]) for name in models]
+    results = {}
+    try:
+        if workers > 1:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = {job[0]: pool.submit(_fit_one, *job) for job in jobs}
+                for name, future in futures.items():
+                    results[name] = future.result()
+        else:
+            for job in jobs:
+                results[job[0]] = _fit_one(*job)
+    except BaseException:
+        for result in results.values():
+            if os.path.exists(result["tmp_path"]):
+                os.remove(result["tmp_path"])
+        raise
+    timings["fit"] = time.perf_counter() - t0
+
+    # Publish: preprocessor and every model together, only once all fits succeeded
+    t0 = time.perf_counter()
+    _copy_atomic(os.path.join(data_dir, "preprocessor.pkl"), PREPROCESSOR_PATH)
+    manifest_models = dict(previous["models"]) if previous and previous["data"]["key"] == data["key"] else {}
+    for name in models:
+        result = results[name]
+        os.replace(result.pop("tmp_path"), MODEL_PATHS[name])
+        manifest_models[name] = dict(_file_info(MODEL_PATHS[name]), **result)
+    timings["write"] = time.perf_counter() - t0
+
+    if "KNN" in models:
+        t0 = time.perf_counter()
+        if rebuild_knn_index() is not None:
+            timings["knn_index"] = time.perf_counter() - t0
+
+    if export:
+        from model_artifacts import export_artifacts
+
+        t0 = time.perf_counter()
+        export_artifacts()
+        timings["export"] = time.perf_counter() - t0
+    timings["total"] = time.perf_counter() - start
+
+    manifest = {
+        "created_at": time.time(),
+        "data": {k: v for k, v in data.items() if k != "seconds"},
+        "split": {"test_size": TEST_SIZE, "random_state": RANDOM_STATE},
+        "preprocessor": dict(_file_info(PREPROCESSOR_PATH), numeric=NUMERIC_FEATURES,
+                             categorical=CATEGORICAL_FEATURES, seconds=data["seconds"]),
+        "models": {name: manifest_models[name] for name in FIT_ORDER if name in manifest_models},
+        "trained": models,
+        "timings": timings,
+        "environment": _environment(n_jobs),
+    }
+    tmp_path = TRAINING_MANIFEST_PATH + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False, default=str)
+    os.replace(tmp_path, TRAINING_MANIFEST_PATH)
+    return manifest
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Train the preprocessor and the LR/KNN/RF models")
+    parser.add_argument("--models", nargs="+", default=None, choices=list(FIT_ORDER))
+    parser.add_argument("--raw", default=RAW_DATA_PATH, help="File CSV raw (như data/Student Depression Dataset.csv)")
+    parser.add_argument("--n-jobs", type=int, default=None, help="Số core dùng để train (mặc định: tất cả)")
+    parser.add_argument("--cache-dir", default=TRAIN_CACHE_DIR)
+    parser.add_argument("--params", default=None,
+                        help='File JSON {"RF": {"max_depth": 24}, ...} ghi đè tham số mặc định (xem tune.py --best-params)')
+    parser.add_argument("--no-export", action="store_true", help="Không export lại models/artifacts")
+    args = parser.parse_args(argv)
+
+    params = None
+    if args.params:
+        with open(args.params, encoding="utf-8") as f:
+            params = json.load(f)
+    manifest = train(args.models, args.raw, args.n_jobs, args.cache_dir, params, export=not args.no_export)
+    data = manifest["data"]
+    print(f"data {data['key']} ({'cached' if data['cached'] else 'fitted'}): {data['clean_rows']:,} rows, "
+          f"{data['n_train']:,} train / {data['n_test']:,} test, {data['n_features']} features")
+    for name in manifest["trained"]:
+        m = manifest["models"][name]
+        print(f"{name:<4} fit {m['fit_seconds']:7.2f}s | accuracy {m['metrics']['accuracy']:.4f} | "
+              f"f1 {m['metrics']['f1']:.4f} | {m['size'] / 2**20:6.1f} MB -> {m['path']}")
+    print(" | ".join(f"{stage} {seconds:.2f}s" for stage, seconds in manifest["timings"].items()))
+
+
+if __name__ == "__main__":
+    main()
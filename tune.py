@@ -0,0 +1,282 @@
+"""
+Tìm tham số cho LR/KNN/RF bằng cross-validation + successive halving, song song trên
+nhiều process.
+
+    python tune.py                                   # cả ba họ model, 5 fold
+    python tune.py --families KNN RF --folds 3 --n-jobs 4
+    python tune.py --best-params cache/tune/best_params.json
+    python train.py --params cache/tune/best_params.json
+
+Chỉ dùng phần train của split trong train.py (tập test để dành cho train.py). Preprocessor
+được fit một lần cho mỗi fold, trên phần train của fold; ma trận đã transform được cache
+trong cache/tune/<key>/fold<k> và mọi ứng viên ở mọi vòng dùng lại chúng.
+
+Successive halving (mỗi họ model riêng): vòng đầu mọi ứng viên được train trên một phần
+nhỏ dữ liệu của fold, mỗi vòng sau chỉ giữ 1/factor ứng viên tốt nhất (theo --scoring,
+trung bình các fold) và tăng số dòng lên factor lần. Vòng cuối (không quá `factor` ứng
+viên mỗi họ) dùng toàn bộ phần train của fold. Phần train của mỗi fold được xáo trộn sẵn,
+nên các tập con của các vòng lồng nhau.
+
+Leaderboard: mỗi ứng viên với accuracy/F1 (CV) ở vòng cuối nó đạt tới, thời gian fit,
+latency predict_proba một dòng và thời gian mỗi dòng khi dự đoán theo batch. Cột frontier
+đánh dấu ứng viên ở vòng cuối mà không ứng viên nào khác vừa có điểm cao hơn vừa nhanh
+hơn. Latency đo trong worker; với --n-jobs > 1 các worker chạy cùng lúc nên số liệu nhiễu
+hơn, hãy so sánh với --n-jobs 1 khi cần chính xác.
+"""
+import argparse
+import hashlib
+import itertools
+import json
+import math
+import os
+import shutil
+import statistics
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from train import (FIT_ORDER, RANDOM_STATE, build_preprocessor, clean_df, data_key, load_matrix, make_estimator,
+                   save_matrix, split)
+from utils import RAW_DATA_PATH
+
+# The notebook defaults (train.DEFAULT_PARAMS) are one point of every grid
+SEARCH_SPACE = {
+    "LR": {"C": [0.01, 0.1, 1.0, 10.0], "class_weight": [None, "balanced"]},
+    "KNN": {"n_neighbors": [5, 15, 31, 51], "weights": ["uniform", "distance"]},
+    "RF": {"max_depth": [None, 12, 24], "min_samples_leaf": [1, 4], "max_features": ["sqrt", 0.3]},
+}
+
+N_FOLDS = 5
+FACTOR = 3
+MIN_RESOURCES = 200
+LATENCY_SAMPLES = 30
+
+TUNE_CACHE_DIR = "cache/tune"
+CACHE_VERSION = 1
+
+
+def candidates(family):
+    space = SEARCH_SPACE[family]
+    return [dict(zip(space, values)) for values in itertools.product(*space.values())]
+
+
+def n_rounds(n_candidates, factor=FACTOR):
+    """Số vòng để còn không quá `factor` ứng viên ở vòng cuối."""
+    if n_candidates <= factor:
+        return 1
+    return 1 + math.ceil(math.log(n_candidates / factor, factor) - 1e-9)
+
+
+# ---------------------------------------------------------
+# Fold cache
+# ---------------------------------------------------------
+def prepare_folds(raw_path=RAW_DATA_PATH, n_folds=N_FOLDS, cache_dir=TUNE_CACHE_DIR):
+    """Các thư mục fold (X_train/X_val đã transform, y_train/y_val), tạo nếu chưa có trong cache."""
+    config = {"data": data_key(raw_path), "folds": n_folds, "random_state": RANDOM_STATE, "version": CACHE_VERSION}
+    key = hashlib.sha256(json.dumps(config, sort_keys=True).encode()).hexdigest()[:16]
+    root = os.path.join(cache_dir, key)
+    fold_dirs = [os.path.join(root, f"fold{k}") for k in range(n_folds)]
+    if os.path.exists(os.path.join(root, "meta.json")):
+        return fold_dirs
+
+    from sklearn.model_selection import StratifiedKFold
+
+    from dataset_store import load_dataset
+
+    X_train, _, y_train, _ = split(clean_df(load_dataset(raw_path)))
+    folds = StratifiedKFold(n_splits=n_folds, shuffle=True, random_state=RANDOM_STATE)
+    rng = np.random.default_rng(RANDOM_STATE)
+
+    tmp_root = f"{root}.tmp-{os.getpid()}"
+    for k, (train_idx, val_idx) in enumerate(folds.split(X_train, y_train)):
+        # Shuffled once, so every prefix is a random subsample and the rounds are nested
+        train_idx = rng.permutation(train_idx)
+        preprocessor = build_preprocessor()
+        fold_X_train = preprocessor.fit_transform(X_train.iloc[train_idx])
+        fold_X_val = preprocessor.transform(X_train.iloc[val_idx])
+
+        fold_dir = os.path.join(tmp_root, f"fold{k}")
+        os.makedirs(fold_dir, exist_ok=True)
+        save_matrix(os.path.join(fold_dir, "X_train"), fold_X_train)
+        save_matrix(os.path.join(fold_dir, "X_val"), fold_X_val)
+        np.save(os.path.join(fold_dir, "y_train.npy"), y_train.to_numpy()[train_idx])
+        np.save(os.path.join(fold_dir, "y_val.npy"), y_train.to_numpy()[val_idx])
+    with open(os.path.join(tmp_root, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(dict(config, n_train=len(y_train)), f, indent=2)
+    try:
+        os.replace(tmp_root, root)
+    except OSError:
+        # Another run published the same key meanwhile
+        shutil.rmtree(tmp_root, ignore_errors=True)
+    return fold_dirs
+
+
+# ---------------------------------------------------------
+# Đánh giá một ứng viên trên một fold (chạy trong worker)
+# ---------------------------------------------------------
+def _evaluate(family, params, fold_dir, n_rows):
+    from sklearn.exceptions import ConvergenceWarning
+    from sklearn.metrics import accuracy_score, f1_score
+
+    X_train = load_matrix(os.path.join(fold_dir, "X_train"))[:n_rows]
+    y_train = np.load(os.path.join(fold_dir, "y_train.npy"))[:n_rows]
+    X_val = load_matrix(os.path.join(fold_dir, "X_val"))
+    y_val = np.load(os.path.join(fold_dir, "y_val.npy"))
+
+    estimator = make_estimator(family, **params)
+    with warnings.catch_warnings():
+        # Small C / few rows: lbfgs may stop at max_iter; the score reflects it
+        warnings.simplefilter("ignore", ConvergenceWarning)
+        t0 = time.perf_counter()
+        estimator.fit(X_train, y_train)
+        fit_seconds = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    y_pred = estimator.predict(X_val)
+    batch_seconds = time.perf_counter() - t0
+
+    single = []
+    for i in range(min(LATENCY_SAMPLES, X_val.shape[0])):
+        row = X_val[i:i + 1]
+        t0 = time.perf_counter()
+        estimator.predict_proba(row)
+        single.append(time.perf_counter() - t0)
+
+    return {
+        "accuracy": accuracy_score(y_val, y_pred),
+        "f1": f1_score(y_val, y_pred),
+        "fit_seconds": fit_seconds,
+        "batch_us_per_row": batch_seconds / len(y_val) * 1e6,
+        "latency_ms": statistics.median(single) * 1e3,
+    }
+
+
+def _frontier(rows, scoring):
+    """Đánh dấu các dòng không bị dòng khác vừa có điểm >= vừa có latency <= (chặt ở ít nhất một bên)."""
+    for row in rows:
+        row["frontier"] = not any(
+            other[scoring] >= row[scoring] and other["latency_ms"] <= row["latency_ms"]
+            and (other[scoring] > row[scoring] or other["latency_ms"] < row["latency_ms"])
+            for other in rows if other is not row)
+
+
+def tune(families=None, raw_path=RAW_DATA_PATH, n_folds=N_FOLDS, factor=FACTOR, scoring="f1", n_jobs=None,
+         cache_dir=TUNE_CACHE_DIR, log=print):
+    """Chạy successive halving; trả về (leaderboard, meta). Leaderboard: list dict, tốt nhất trước."""
+    families = [f for f in FIT_ORDER if families is None or f in families]
+    n_jobs = n_jobs or os.cpu_count() or 1
+    start = time.perf_counter()
+
+    fold_dirs = prepare_folds(raw_path, n_folds, cache_dir)
+    with open(os.path.join(os.path.dirname(fold_dirs[0]), "meta.json"), encoding="utf-8") as f:
+        # Smallest fold train part: n_train * (1 - 1/n_folds), rounded down
+        full = json.load(f)["n_train"] * (n_folds - 1) // n_folds
+    prepare_seconds = time.perf_counter() - start
+
+    alive = {family: [{"id": f"{family}-{i}", "family": family, "params": params, "rounds": []}
+                      for i, params in enumerate(candidates(family))] for family in families}
+    everyone = [c for family in families for c in alive[family]]
+    rounds = {family: n_rounds(len(alive[family]), factor) for family in families}
+    n_steps = max(rounds.values())
+
+    pool = ProcessPoolExecutor(max_workers=n_jobs) if n_jobs > 1 else None
+    try:
+        for step in range(n_steps):
+            n_rows = max(MIN_RESOURCES, full // factor ** (n_steps - 1 - step))
+            # Families with fewer rounds start later, so every family ends on the full fold
+            active = [c for family in families if step >= n_steps - rounds[family] for c in alive[family]]
+            t0 = time.perf_counter()
+            tasks = [(c, (c["family"], c["params"], fold_dir, n_rows)) for c in active for fold_dir in fold_dirs]
+            if pool is not None:
+                futures = [(c, pool.submit(_evaluate, *args)) for c, args in tasks]
+                results = [(c, future.result()) for c, future in futures]
+            else:
+                results = [(c, _evaluate(*args)) for c, args in tasks]
+
+            per_candidate = {}
+            for c, result in results:
+                per_candidate.setdefault(c["id"], (c, []))[1].append(result)
+            for c, fold_results in per_candidate.values():
+                c["rounds"].append(dict({k: statistics.fmean(r[k] for r in fold_results) for k in fold_results[0]},
+                                        step=step, n_rows=n_rows))
+
+            if step < n_steps - 1:
+                for family in families:
+                    if step >= n_steps - rounds[family]:
+                        ranked = sorted(alive[family], key=lambda c: c["rounds"][-1][scoring], reverse=True)
+                        alive[family] = ranked[:math.ceil(len(ranked) / factor)]
+            log(f"round {step}: {len(active)} candidates x {n_folds} folds on {n_rows:,} rows "
+                f"({time.perf_counter() - t0:.1f}s)")
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    leaderboard = []
+    for c in everyone:
+        last = c["rounds"][-1]
+        leaderboard.append(dict(
+            {"id": c["id"], "family": c["family"], "params": c["params"], "final": last["step"] == n_steps - 1,
+             "rounds": len(c["rounds"])}, **last))
+    finals = [row for row in leaderboard if row["final"]]
+    _frontier(finals, scoring)
+    for row in leaderboard:
+        row.setdefault("frontier", False)
+    leaderboard.sort(key=lambda row: (row["final"], row["n_rows"], row[scoring]), reverse=True)
+
+    meta = {"families": families, "folds": n_folds, "factor": factor, "scoring": scoring, "n_jobs": n_jobs,
+            "fold_train_rows": full, "prepare_seconds": prepare_seconds,
+            "total_seconds": time.perf_counter() - start,
+            "fits": sum(len(c["rounds"]) for c in everyone) * n_folds}
+    return leaderboard, meta
+
+
+def best_params(leaderboard, scoring="f1"):
+    """{family: params} của ứng viên tốt nhất ở vòng cuối của mỗi họ (dùng cho train.py --params)."""
+    best = {}
+    for row in leaderboard:
+        if row["final"] and (row["family"] not in best or row[scoring] > best[row["family"]][scoring]):
+            best[row["family"]] = row
+    return {family: row["params"] for family, row in best.items()}
+
+
+def format_leaderboard(leaderboard):
+    lines = [f"{'id':<7} {'params':<58} {'rows':>6} {'acc':>7} {'f1':>7} {'fit s':>7} "
+             f"{'1-row ms':>9} {'us/row':>8}  frontier"]
+    for row in leaderboard:
+        params = ", ".join(f"{k}={v}" for k, v in row["params"].items())
+        lines.append(f"{row['id']:<7} {params:<58} {row['n_rows']:>6} {row['accuracy']:7.4f} {row['f1']:7.4f} "
+                     f"{row['fit_seconds']:7.2f} {row['latency_ms']:9.3f} {row['batch_us_per_row']:8.1f}  "
+                     f"{'*' if row['frontier'] else ''}")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Cross-validated successive-halving search for LR/KNN/RF")
+    parser.add_argument("--families", nargs="+", default=None, choices=list(FIT_ORDER))
+    parser.add_argument("--raw", default=RAW_DATA_PATH)
+    parser.add_argument("--folds", type=int, default=N_FOLDS)
+    parser.add_argument("--factor", type=int, default=FACTOR, help="Tỉ lệ loại ứng viên / tăng số dòng mỗi vòng")
+    parser.add_argument("--scoring", default="f1", choices=["f1", "accuracy"])
+    parser.add_argument("--n-jobs", type=int, default=None, help="Số worker process (mặc định: số core)")
+    parser.add_argument("--cache-dir", default=TUNE_CACHE_DIR)
+    parser.add_argument("--output", default=os.path.join(TUNE_CACHE_DIR, "leaderboard.json"))
+    parser.add_argument("--best-params", default=None, help="Ghi tham số tốt nhất mỗi họ ra file JSON cho train.py")
+    args = parser.parse_args(argv)
+
+    leaderboard, meta = tune(args.families, args.raw, args.folds, args.factor, args.scoring, args.n_jobs,
+                             args.cache_dir)
+    print(format_leaderboard(leaderboard))
+    print(f"{meta['fits']} fits in {meta['total_seconds']:.1f}s (fold preprocessing {meta['prepare_seconds']:.1f}s)")
+
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump({"meta": meta, "leaderboard": leaderboard}, f, indent=2)
+    if args.best_params:
+        with open(args.best_params, "w", encoding="utf-8") as f:
+            json.dump(best_params(leaderboard, args.scoring), f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
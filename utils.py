@@ -0,0 +1,38 @@
+PREPROCESSOR_PATH = "preprocessor/preprocessor.pkl"
+
+RAW_DATA_PATH = "data/Student Depression Dataset.csv"
+# Written by clean_data.py from the raw file(s)
+CLEAN_DATA_PATH = "data/clean_df.csv"
+POPULATION_STATS_PATH = "data/population_stats.npz"
+PEER_CUBE_PATH = "data/peer_cube.npz"
+# Written by train.py: data key, metrics, params and sha256 of every trained model
+TRAINING_MANIFEST_PATH = "models/manifest.json"
+
+MODEL_PATHS = {
+    "LR": "models/LR.pkl",
+    "KNN": "models/KNN.pkl",
+    "RF": "models/RF.pkl"
+}
+
+ID2LABEL = {
+    "1": "Yes",
+    "0": "No"
+}
+
+KNN_INDEX_DIR = "models/knn_index"
+
+# Columns compared against the population in analysis.analyze_user_vs_population
+ANALYSIS_NUMERIC_COLS = ['Age', 'Academic Pressure', 'CGPA', 'Study Satisfaction',
+                         'Work/Study Hours', 'Financial Stress']
+ANALYSIS_CATEGORICAL_COLS = ['Gender', 'Sleep Duration', 'Dietary Habits', 'Degree',
+                             'Suicidal Thoughts', 'Family History of Mental Illness']
+# Analysis key -> column it is read from in data/clean_df.csv (and in a model input row)
+ANALYSIS_COLUMN_SOURCES = {'Suicidal Thoughts': 'Have you ever had suicidal thoughts ?'}
+
+# Exported (pickle-free, mmap-able) models; see model_artifacts.py
+ARTIFACT_DIR = "models/artifacts"
+
+# Raw input columns the preprocessor (and so every model) expects
+MODEL_INPUT_COLS = ['Gender', 'Age', 'Academic Pressure', 'CGPA', 'Study Satisfaction', 'Sleep Duration',
+                    'Dietary Habits', 'Degree', 'Have you ever had suicidal thoughts ?', 'Work/Study Hours',
+                    'Financial Stress', 'Family History of Mental Illness']